@@ -0,0 +1,463 @@
+# -*- coding: utf-8 -*-
+"""kyra_bench.py
+
+Synthetic data generator and micro-benchmarks for the dashboard's data-access helpers.
+
+Usage:
+    python kyra_bench.py seed --scale 100000 --db bench.db
+    python kyra_bench.py run --scales 10000 100000 1000000 --output bench_results.json
+    python kyra_bench.py compare baseline.json bench_results.json --threshold 0.2
+    python kyra_bench.py coldstart --max-ms 150
+
+``run`` seeds a fresh database per scale (one subprocess each, so every
+scale gets its own connection pool and caches) and records p50/p95
+latency, ops/sec and rows/sec per helper as JSON, plus the cold-start
+import time of kyra_data. The snapshot-backed reads are timed in a
+further subprocess started with ``KYRA_READ_SNAPSHOT=1``, since kyra_data
+reads that setting at import. ``coldstart`` checks that import on its own.
+"""
+
+import argparse
+import itertools
+import json
+import os
+import platform
+import random
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+FIRST_NAMES = ["Aarav", "Diya", "Ishaan", "Ananya", "Vihaan", "Saanvi", "Arjun", "Myra", "Kabir", "Anika",
+               "Rohan", "Meera", "Aditya", "Kiara", "Reyansh", "Zara", "Vivaan", "Tara", "Krish", "Nisha"]
+LAST_NAMES = ["Sharma", "Ghosh", "Patel", "Reddy", "Iyer", "Khan", "Das", "Nair", "Singh", "Gupta",
+              "Mehta", "Rao", "Bose", "Joshi", "Kapoor", "Menon", "Verma", "Pillai", "Sen", "Chopra"]
+DURATIONS = ["1 month", "2 months", "3 months", "6 months"]
+PROMPTS = ["How do I log my internship?", "What is MSME digitalization?", "Suggest a project on {topic}",
+           "How can I improve my {topic} skills?", "Which MSMEs need help with {topic}?"]
+TOPICS = ["web design", "CRM setup", "digital payments", "inventory tracking", "social media", "accounting"]
+FEEDBACK = ["Great mentor support", "Learned a lot about CRM", "Needed more guidance", "", "Excellent exposure"]
+
+# Role mix of the users table; students dominate as they do in production.
+ROLE_WEIGHTS = {"student": 0.90, "mentor": 0.03, "msme": 0.05, "college": 0.015, "government": 0.005}
+
+N_REGIONS = 28
+SEED_CHUNK_ROWS = 50000
+
+# kyra_data must import none of these at module load.
+HEAVY_MODULES = ("streamlit", "pandas", "pyarrow", "numpy", "requests")
+COLD_START_PROBE = """
+import sys, time
+start = time.perf_counter()
+import kyra_data
+print(time.perf_counter() - start)
+print(" ".join(m for m in {heavy!r} if m in sys.modules))
+"""
+
+
+def _chunks(rows, size=SEED_CHUNK_ROWS):
+    rows = iter(rows)
+    while True:
+        chunk = list(itertools.islice(rows, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def generate_dataset(kyra, scale, seed=42):
+    """Populate an empty database with ``scale`` internships and proportional other tables.
+
+    Users are scale/4 (mostly students spread over Zipf-sized colleges),
+    projects and feedback scale/2 each, and queries one per internship.
+    The same ``scale`` and ``seed`` always produce the same rows. Raises
+    ValueError if the database already has users.
+    """
+    rng = random.Random(seed)
+    with kyra.db_connection() as conn:
+        if conn.execute("SELECT COUNT(*) FROM users").fetchone()[0]:
+            raise ValueError("seed needs an empty database")
+
+    n_users = max(100, scale // 4)
+    n_colleges = max(5, int(n_users * ROLE_WEIGHTS["college"]))
+    colleges = [f"College {i:04d}" for i in range(n_colleges)]
+    regions = [f"Region {i:02d}" for i in range(N_REGIONS)]
+    college_weights = [1 / (rank + 1) ** 1.1 for rank in range(n_colleges)]
+    roles = rng.choices(list(ROLE_WEIGHTS), weights=list(ROLE_WEIGHTS.values()), k=n_users)
+    student_ids = [i + 1 for i, role in enumerate(roles) if role == "student"]
+    msme_names = [f"MSME {i:05d}" for i, role in enumerate(roles) if role == "msme"] or ["MSME 00000"]
+
+    def users():
+        for i, role in enumerate(roles):
+            if role == "msme":
+                org, region = f"MSME {i:05d}", rng.choice(regions)
+            elif role == "government":
+                org = region = regions[i % N_REGIONS]
+            else:
+                college = rng.choices(range(n_colleges), weights=college_weights)[0]
+                org, region = colleges[college], regions[college % N_REGIONS]
+            name = f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}"
+            yield name, f"{role}{i + 1}@kyra.test", role, org, region
+
+    # Squaring the uniform draw skews activity towards a minority of very active students.
+    def student():
+        return student_ids[int(len(student_ids) * rng.random() ** 2)]
+
+    start = datetime(2024, 1, 1)
+
+    def stamp():
+        return (start + timedelta(seconds=rng.randrange(365 * 24 * 3600))).isoformat()
+
+    def internships():
+        for _ in range(scale):
+            yield (student(), rng.choice(msme_names), rng.choice(DURATIONS), rng.choice(FEEDBACK),
+                   rng.choices([0, 1, 2, 3], weights=[50, 30, 15, 5])[0], stamp())
+
+    def projects():
+        for i in range(scale // 2):
+            topic = rng.choice(TOPICS)
+            if rng.random() < 0.4:
+                yield None, f"{topic.title()} for {rng.choice(msme_names)}", f"Help needed with {topic}", "Open", stamp()
+            else:
+                yield student(), f"{topic.title()} project {i}", f"Student project on {topic}", "Submitted", stamp()
+
+    def feedback():
+        for _ in range(scale // 2):
+            yield (student(), rng.choices([1, 2, 3, 4, 5], weights=[5, 10, 25, 35, 25])[0], rng.choice(FEEDBACK),
+                   stamp())
+
+    def queries():
+        for i in range(scale):
+            prompt = rng.choice(PROMPTS).format(topic=rng.choice(TOPICS))
+            yield (rng.randint(1, n_users), prompt, f"Ky'ra response to: {prompt}", stamp(),
+                   round(rng.lognormvariate(5, 0.6), 1), int(rng.random() < 0.3))
+
+    tables = [
+        ("INSERT INTO users (name, email, role, org, region) VALUES (?, ?, ?, ?, ?)", users()),
+        ("""INSERT INTO internships (student_id, company_name, duration, feedback, msme_digitalized, created_at)
+            VALUES (?, ?, ?, ?, ?, ?)""", internships()),
+        ("INSERT INTO projects (student_id, title, description, status, created_at) VALUES (?, ?, ?, ?, ?)",
+         projects()),
+        ("INSERT INTO feedback (student_id, rating, comments, created_at) VALUES (?, ?, ?, ?)", feedback()),
+        ("""INSERT INTO queries (user_id, prompt, response, timestamp, latency_ms, cache_hit)
+            VALUES (?, ?, ?, ?, ?, ?)""", queries()),
+    ]
+    for sql, rows in tables:
+        for chunk in _chunks(rows):
+            with kyra.db_connection() as conn:
+                conn.executemany(sql, chunk)
+    with kyra.db_connection() as conn:
+        conn.execute("ANALYZE")
+    return {"users": n_users, "students": len(student_ids), "colleges": n_colleges, "internships": scale,
+            "projects": scale // 2, "feedback": scale // 2, "queries": scale}
+
+
+def _percentile(samples, pct):
+    return samples[min(len(samples) - 1, round(pct / 100 * (len(samples) - 1)))]
+
+
+def measure(fn, iterations, count_rows=None):
+    """Call ``fn(i)`` ``iterations`` times and summarize its latency."""
+    samples = []
+    rows = 0
+    for i in range(iterations):
+        start = time.perf_counter()
+        result = fn(i)
+        samples.append(time.perf_counter() - start)
+        rows += count_rows(result) if count_rows else 1
+    total = sum(samples)
+    samples.sort()
+    return {
+        "iterations": iterations,
+        "p50_ms": _percentile(samples, 50) * 1000,
+        "p95_ms": _percentile(samples, 95) * 1000,
+        "mean_ms": total / iterations * 1000,
+        "ops_per_sec": iterations / total if total else 0.0,
+        "rows_per_sec": rows / total if total else 0.0,
+    }
+
+
+def measure_cold_start(runs=10):
+    """Import kyra_data in ``runs`` fresh interpreters; return timings and any heavy modules it loaded."""
+    probe = COLD_START_PROBE.format(heavy=HEAVY_MODULES)
+    samples, heavy = [], set()
+    for _ in range(runs):
+        out = subprocess.run([sys.executable, "-c", probe], cwd=os.path.dirname(os.path.abspath(__file__)),
+                             check=True, capture_output=True, text=True).stdout.splitlines()
+        samples.append(float(out[0]))
+        heavy.update(out[1].split() if len(out) > 1 else [])
+    samples.sort()
+    return {
+        "runs": runs,
+        "p50_ms": _percentile(samples, 50) * 1000,
+        "max_ms": samples[-1] * 1000,
+        "heavy_modules": sorted(heavy),
+    }
+
+
+def uncached(cache_factory, fn):
+    """Wrap ``fn`` so each call starts with the cache from ``cache_factory`` empty."""
+    def call(i):
+        cache_factory().clear()
+        return fn(i)
+    return call
+
+
+def run_benchmarks(kyra, iterations=200, seed=7):
+    rng = random.Random(seed)
+    with kyra.db_connection(readonly=True) as conn:
+        students = conn.execute("SELECT id, email FROM users WHERE role = 'student'").fetchall()
+        max_user_id = conn.execute("SELECT MAX(id) FROM users").fetchone()[0]
+    picks = [rng.choice(students) for _ in range(iterations)]
+
+    results = {}
+    for role in kyra.VALID_ROLES:
+        results[f"fetch_metrics[{role}]"] = measure(
+            uncached(kyra._metrics_cache, lambda i, role=role: kyra.fetch_metrics(role)), iterations)
+    results["fetch_metrics[cached]"] = measure(lambda i: kyra.fetch_metrics("student"), iterations)
+    results["rebuild_metrics"] = measure(lambda i: kyra.rebuild_metrics(), max(3, iterations // 50))
+    results["fetch_user_data"] = measure(lambda i: kyra.fetch_user_data(picks[i][1]), iterations)
+    results["fetch_user_internships"] = measure(
+        uncached(kyra._profile_cache, lambda i: kyra.fetch_user_internships(picks[i][0])[0]), iterations, len)
+    results["fetch_students_page[first]"] = measure(
+        uncached(kyra._student_page_cache, lambda i: kyra.fetch_students_page()[0]), iterations, len)
+    results["fetch_students_page[deep]"] = measure(
+        uncached(kyra._student_page_cache,
+                 lambda i: kyra.fetch_students_page("", rng.randrange(max_user_id))[0]), iterations, len)
+    results["fetch_students_page[search]"] = measure(
+        uncached(kyra._student_page_cache,
+                 lambda i: kyra.fetch_students_page(rng.choice(FIRST_NAMES))[0]), iterations, len)
+    kyra.fetch_rollups("monthly")  # pay the lazy pandas import outside the timings
+    results["fetch_rollups[monthly]"] = measure(
+        uncached(kyra._rollup_cache, lambda i: kyra.fetch_rollups("monthly")), max(3, iterations // 10), len)
+    results["fetch_rollups[daily]"] = measure(
+        uncached(kyra._rollup_cache, lambda i: kyra.fetch_rollups("daily")), max(3, iterations // 10), len)
+    results["rebuild_student_summaries"] = measure(lambda i: kyra.rebuild_student_summaries(), 3)
+    results["fetch_leaderboard[first]"] = measure(
+        uncached(kyra._leaderboard_cache, lambda i: kyra.fetch_leaderboard("avg_rating")[0]), iterations, len)
+    deep_after = None
+    for _ in range(50):
+        deep_after = kyra.fetch_leaderboard("internships", after=deep_after)[1] or deep_after
+    results["fetch_leaderboard[deep]"] = measure(
+        uncached(kyra._leaderboard_cache, lambda i: kyra.fetch_leaderboard("internships", after=deep_after)[0]),
+        iterations, len)
+    results["fetch_leaderboard_percentiles"] = measure(
+        uncached(kyra._leaderboard_cache, lambda i: kyra.fetch_leaderboard_percentiles("avg_rating")), iterations)
+    results["search_text[selective]"] = measure(
+        uncached(kyra._search_cache, lambda i: kyra.search_text(f"project {i}")[0]), iterations, len)
+    results["search_text[common]"] = measure(
+        uncached(kyra._search_cache, lambda i: kyra.search_text(rng.choice(TOPICS))[0]), iterations, len)
+    with kyra.db_connection(readonly=True) as conn:
+        open_ids = [r[0] for r in conn.execute(
+            "SELECT project_id FROM projects WHERE status = 'Open' AND student_id IS NULL LIMIT 1000")]
+    results["match_index_build"] = measure(
+        lambda i: kyra.get_match_index.clear() or kyra.match_students(open_ids[:1]), 1)
+    pages = [open_ids[j:j + kyra.OPEN_PROJECT_PAGE_SIZE] for j in range(0, len(open_ids), kyra.OPEN_PROJECT_PAGE_SIZE)]
+    results["match_students[page]"] = measure(lambda i: kyra.match_students(pages[i % len(pages)]), iterations, len)
+    results["match_projects"] = measure(lambda i: kyra.match_projects(picks[i][0]), iterations, len)
+    results["fetch_query_history[hot]"] = measure(
+        lambda i: kyra.fetch_query_history(picks[i][0])[0], iterations, len)
+    results["archive_queries"] = measure(lambda i: kyra.archive_queries(), 1)
+    results["fetch_query_history[archived]"] = measure(
+        lambda i: kyra.fetch_query_history(picks[i][0])[0], iterations, len)
+    results["resolve_users[batch]"] = measure(
+        lambda i: kyra.resolve_users([email for _, email in picks]), max(3, iterations // 10), len)
+    run_tag = time.time_ns()
+    results["resolve_user[new]"] = measure(
+        lambda i: kyra.resolve_user(f"bench-{run_tag}-{i}@example.com"), iterations)
+    results["log_internship"] = measure(
+        lambda i: kyra.log_internship(picks[i][1], "Bench MSME", "3 months", "", 1), iterations)
+    results["log_feedback"] = measure(lambda i: kyra.log_feedback(picks[i][0], 4, "bench", sync=True), iterations)
+    results["log_query"] = measure(
+        lambda i: kyra.log_query(picks[i][0], "bench prompt", "bench response", 1.0, False, sync=True), iterations)
+    return results
+
+
+def run_snapshot_benchmarks(kyra, iterations=200, seed=7):
+    """Time the reads served from the in-memory snapshot; needs KYRA_READ_SNAPSHOT=1."""
+    snapshot = kyra.get_read_snapshot()
+    if snapshot is None:
+        raise ValueError("snapshot benchmarks need kyra_data imported with KYRA_READ_SNAPSHOT=1")
+    rng = random.Random(seed)
+    with kyra.db_connection(readonly=True) as conn:
+        max_user_id = conn.execute("SELECT MAX(id) FROM users").fetchone()[0]
+    results = {}
+    results["snapshot_refresh"] = measure(lambda i: snapshot.refresh(force=True), 3)
+    results["fetch_metrics[snapshot]"] = measure(
+        uncached(kyra._metrics_cache, lambda i: kyra.fetch_metrics("college")), iterations)
+    results["fetch_students_page[snapshot]"] = measure(
+        uncached(kyra._student_page_cache,
+                 lambda i: kyra.fetch_students_page("", rng.randrange(max_user_id))[0]), iterations, len)
+    results["fetch_rollups[snapshot]"] = measure(
+        uncached(kyra._rollup_cache, lambda i: kyra.fetch_rollups("monthly")), max(3, iterations // 10), len)
+    return results
+
+
+def _load_kyra(db_path, read_snapshot=False):
+    # kyra_data reads its configuration at import, so each mode runs in its own process.
+    os.environ["KYRA_DB_PATH"] = db_path
+    os.environ["KYRA_READ_SNAPSHOT"] = "1" if read_snapshot else "0"
+    os.environ.setdefault("KYRA_WRITE_BEHIND", "0")
+    import kyra_data as kyra
+    kyra.initialize_database()
+    return kyra
+
+
+def cmd_seed(args):
+    kyra = _load_kyra(os.path.abspath(args.db))
+    start = time.perf_counter()
+    try:
+        counts = generate_dataset(kyra, args.scale, args.seed)
+    except ValueError as e:
+        raise SystemExit(f"Seed failed: {e}")
+    print(f"Seeded {args.db} in {time.perf_counter() - start:.1f}s: "
+          + ", ".join(f"{n} {table}" for table, n in counts.items()))
+
+
+def cmd_run_scale(args):
+    db = os.path.abspath(args.db)
+    kyra = _load_kyra(db)
+    start = time.perf_counter()
+    try:
+        dataset = generate_dataset(kyra, args.scale, args.seed)
+    except ValueError as e:
+        raise SystemExit(f"Seed failed: {e}")
+    seed_seconds = time.perf_counter() - start
+    # Snapshot reads run first, against the freshly seeded rows, in a process of their own.
+    snapshot_out = args.output + ".snapshot"
+    subprocess.run([sys.executable, os.path.abspath(__file__), "run-snapshot", "--iterations", str(args.iterations),
+                    "--db", db, "--output", snapshot_out], check=True)
+    with open(snapshot_out) as f:
+        snapshot_results = json.load(f)
+    results = run_benchmarks(kyra, args.iterations)
+    results.update(snapshot_results)
+    with open(args.output, "w") as f:
+        json.dump({"scale": args.scale, "dataset": dataset, "seed_seconds": seed_seconds, "results": results}, f)
+
+
+def cmd_run_snapshot(args):
+    kyra = _load_kyra(os.path.abspath(args.db), read_snapshot=True)
+    results = run_snapshot_benchmarks(kyra, args.iterations)
+    with open(args.output, "w") as f:
+        json.dump(results, f)
+
+
+def cmd_run(args):
+    report = {
+        "meta": {
+            "created": datetime.utcnow().isoformat(),
+            "python": platform.python_version(),
+            "sqlite": sqlite3.sqlite_version,
+            "seed": args.seed,
+            "iterations": args.iterations,
+        },
+        "cold_start": measure_cold_start(),
+        "scales": {},
+    }
+    with tempfile.TemporaryDirectory() as tmp:
+        for scale in args.scales:
+            db, out = os.path.join(tmp, f"bench_{scale}.db"), os.path.join(tmp, f"bench_{scale}.json")
+            print(f"Benchmarking scale {scale}...", flush=True)
+            subprocess.run([sys.executable, os.path.abspath(__file__), "run-scale", "--scale", str(scale),
+                            "--seed", str(args.seed), "--iterations", str(args.iterations),
+                            "--db", db, "--output", out], check=True)
+            with open(out) as f:
+                result = json.load(f)
+            report["scales"][str(scale)] = result
+            for name, stats in result["results"].items():
+                print(f"  {name:<32} p50 {stats['p50_ms']:8.3f} ms  p95 {stats['p95_ms']:8.3f} ms  "
+                      f"{stats['rows_per_sec']:12.0f} rows/s")
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"Wrote {args.output}")
+
+
+def cmd_coldstart(args):
+    result = measure_cold_start(args.runs)
+    print(f"import kyra_data: p50 {result['p50_ms']:.1f} ms, max {result['max_ms']:.1f} ms over {result['runs']} runs")
+    if result["heavy_modules"]:
+        raise SystemExit(f"kyra_data imported {', '.join(result['heavy_modules'])} at load time")
+    if args.max_ms and result["p50_ms"] > args.max_ms:
+        raise SystemExit(f"Cold start p50 {result['p50_ms']:.1f} ms exceeds the {args.max_ms:.0f} ms budget")
+
+
+def cmd_compare(args):
+    with open(args.baseline) as f:
+        baseline_report = json.load(f)
+    with open(args.current) as f:
+        current_report = json.load(f)
+    baseline, current = baseline_report["scales"], current_report["scales"]
+    regressions = 0
+    if "cold_start" in baseline_report and "cold_start" in current_report:
+        before, after = baseline_report["cold_start"]["p50_ms"], current_report["cold_start"]["p50_ms"]
+        change = after / before - 1
+        flag = "REGRESSION" if change > args.threshold else ""
+        regressions += bool(flag)
+        print(f"Cold start p50 {before:8.3f} -> {after:8.3f} ms ({change:+.0%}) {flag}")
+    for scale in sorted(set(baseline) & set(current), key=int):
+        print(f"Scale {scale}")
+        for name, stats in current[scale]["results"].items():
+            before = baseline[scale]["results"].get(name)
+            if not before or not before["p95_ms"]:
+                continue
+            change = stats["p95_ms"] / before["p95_ms"] - 1
+            flag = "REGRESSION" if change > args.threshold else ""
+            regressions += bool(flag)
+            print(f"  {name:<32} p95 {before['p95_ms']:8.3f} -> {stats['p95_ms']:8.3f} ms ({change:+.0%}) {flag}")
+    if regressions:
+        raise SystemExit(f"{regressions} benchmark(s) regressed by more than {args.threshold:.0%}")
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="kyra_bench", description="Ky'ra data-access benchmarks")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    seed = sub.add_parser("seed", help="fill an empty database with synthetic data")
+    seed.add_argument("--scale", type=int, default=10000, help="number of internships to generate")
+    seed.add_argument("--seed", type=int, default=42)
+    seed.add_argument("--db", default="internship_tracking.db")
+    seed.set_defaults(func=cmd_seed)
+
+    run = sub.add_parser("run", help="seed fresh databases and benchmark each scale")
+    run.add_argument("--scales", type=int, nargs="+", default=[10000, 100000])
+    run.add_argument("--seed", type=int, default=42)
+    run.add_argument("--iterations", type=int, default=200)
+    run.add_argument("--output", default="bench_results.json")
+    run.set_defaults(func=cmd_run)
+
+    run_scale = sub.add_parser("run-scale", help=argparse.SUPPRESS)
+    run_scale.add_argument("--scale", type=int, required=True)
+    run_scale.add_argument("--seed", type=int, default=42)
+    run_scale.add_argument("--iterations", type=int, default=200)
+    run_scale.add_argument("--db", required=True)
+    run_scale.add_argument("--output", required=True)
+    run_scale.set_defaults(func=cmd_run_scale)
+
+    run_snapshot = sub.add_parser("run-snapshot", help=argparse.SUPPRESS)
+    run_snapshot.add_argument("--iterations", type=int, default=200)
+    run_snapshot.add_argument("--db", required=True)
+    run_snapshot.add_argument("--output", required=True)
+    run_snapshot.set_defaults(func=cmd_run_snapshot)
+
+    compare = sub.add_parser("compare", help="compare two result files and flag p95 regressions")
+    compare.add_argument("baseline")
+    compare.add_argument("current")
+    compare.add_argument("--threshold", type=float, default=0.2, help="allowed relative p95 increase")
+    compare.set_defaults(func=cmd_compare)
+
+    coldstart = sub.add_parser("coldstart", help="time a fresh import of kyra_data")
+    coldstart.add_argument("--runs", type=int, default=10)
+    coldstart.add_argument("--max-ms", type=float, help="fail if the median import takes longer")
+    coldstart.set_defaults(func=cmd_coldstart)
+
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,202 @@
+# -*- coding: utf-8 -*-
+"""kyra_cli.py
+
+Command-line reporting and maintenance for the Ky'ra Internship Dashboard
+database. Built on kyra_data only, so it never imports Streamlit.
+
+Usage:
+    python kyra_cli.py report --role student
+    python kyra_cli.py migrate
+    python kyra_cli.py rebuild-metrics
+    python kyra_cli.py rebuild-search
+    python kyra_cli.py rebuild-summaries
+    python kyra_cli.py leaderboard --metric internships --org "College 0001"
+    python kyra_cli.py search "crm setup" --kind projects
+    python kyra_cli.py archive-queries --days 90 --vacuum
+    python kyra_cli.py import internships internships.csv --rejects rejected.csv
+    python kyra_cli.py export queries queries.csv.gz --role student --start 2024-01-01
+"""
+
+import argparse
+import csv
+import json
+
+import kyra_data as kyra
+
+
+def cmd_report(args):
+    kyra.initialize_database()
+    roles = [args.role] if args.role else kyra.VALID_ROLES
+    with kyra.db_connection(readonly=True) as conn:
+        tables = {t: conn.execute(f"SELECT COUNT(*) FROM {t}").fetchone()[0]
+                  for t in ("users", "internships", "projects", "feedback", "queries")}
+        version = kyra.schema_version(conn)
+    metrics = {role: kyra.fetch_metrics(role) for role in roles}
+    if args.json:
+        print(json.dumps({"schema_version": version, "rows": tables, "metrics": metrics}, indent=2))
+        return
+    print(f"Schema version {version}")
+    for table, n in tables.items():
+        print(f"{table:<12} {n} rows")
+    for role, values in metrics.items():
+        for name, value in values.items():
+            print(f"{role:<12} {name:<24} {value}")
+
+
+def cmd_migrate(args):
+    before, after = kyra.migrate_database(args.target)
+    if before == after:
+        print(f"Schema already at version {after}")
+    else:
+        print(f"Migrated schema from version {before} to {after}")
+
+
+def cmd_rebuild_metrics(args):
+    kyra.initialize_database()
+    for (role, name), value in kyra.rebuild_metrics().items():
+        print(f"{role:<12} {name:<24} {value}")
+
+
+def cmd_rebuild_search(args):
+    kyra.initialize_database()
+    for kind, n in kyra.rebuild_search_index().items():
+        print(f"Indexed {n} {kind}")
+
+
+def cmd_rebuild_summaries(args):
+    kyra.initialize_database()
+    print(f"Summarized {kyra.rebuild_student_summaries()} students")
+
+
+def cmd_leaderboard(args):
+    kyra.initialize_database()
+    rows, _ = kyra.fetch_leaderboard(args.metric, args.org, page_size=args.limit)
+    for r in rows:
+        avg = f"{r['avg_rating']:.2f}" if r["avg_rating"] is not None else "-"
+        print(f"{r['rank']:>4}  {r['name']:<24} {r['org']:<20} avg {avg:>5}  ratings {r['ratings']:>4}  "
+              f"internships {r['internships']:>4}  msmes {r['msmes_digitalized']:>4}")
+    percentiles = kyra.fetch_leaderboard_percentiles(args.metric, args.org)
+    if percentiles:
+        print(" ".join(f"p{pct} {value:.3g}" for pct, value in percentiles.items() if pct != "students")
+              + f" across {percentiles['students']} students")
+    else:
+        print("No students to rank")
+
+
+def cmd_search(args):
+    kyra.initialize_database()
+    results, _ = kyra.search_text(args.text, kinds=args.kind, page_size=args.limit, owner_id=args.owner_id)
+    for r in results:
+        print(f"{r['kind']:<12} {r['id']:>8}  {r['title']}\n{'':<22}{r['snippet']}")
+    if not results:
+        print("No matches")
+
+
+def cmd_archive_queries(args):
+    kyra.initialize_database()
+    moved = kyra.archive_queries(args.days, args.batch_rows, args.vacuum)
+    for month, n in sorted(moved.items()):
+        print(f"Archived {n} queries to {kyra.archive_path(month)}")
+    if not moved:
+        print("No queries past the retention window")
+
+
+def cmd_import(args):
+    kyra.initialize_database()
+    try:
+        report = kyra.bulk_import(args.table, args.file, chunk_rows=args.chunk_rows)
+    except ValueError as e:
+        raise SystemExit(f"Import failed: {e}")
+    print(f"Read {report['rows_read']} rows, loaded {report['rows_loaded']}, "
+          f"skipped {report['rows_skipped']}, rejected {report['rows_rejected']}, "
+          f"created {report['users_created']} and updated {report['users_updated']} users "
+          f"in {report['seconds']:.1f}s ({report['rows_per_second']:.0f} rows/s)")
+    if args.rejects and report["rejected"]:
+        with open(args.rejects, "w", newline="") as f:
+            writer = csv.DictWriter(f, fieldnames=["row", "reason"])
+            writer.writeheader()
+            writer.writerows(report["rejected"])
+        print(f"Wrote {len(report['rejected'])} rejected rows to {args.rejects}")
+
+
+def cmd_export(args):
+    kyra.initialize_database()
+    fmt = args.format or next((f for f, ext in kyra.EXPORT_FORMATS.items() if args.output.endswith(ext)), "csv")
+    try:
+        rows = kyra.export_table(args.table, args.output, fmt, chunk_rows=args.chunk_rows,
+                                 role=args.role, org=args.org, start=args.start, end=args.end)
+    except ValueError as e:
+        raise SystemExit(f"Export failed: {e}")
+    print(f"Wrote {rows} rows to {args.output}")
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="kyra_cli", description="Ky'ra dashboard maintenance")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    report = sub.add_parser("report", help="print table sizes and dashboard metrics")
+    report.add_argument("--role", choices=kyra.VALID_ROLES, help="only this role's metrics")
+    report.add_argument("--json", action="store_true", help="print JSON instead of text")
+    report.set_defaults(func=cmd_report)
+
+    migrate = sub.add_parser("migrate", help="apply pending schema migrations")
+    migrate.add_argument("--target", type=int, help="stop at this schema version (default: latest)")
+    migrate.set_defaults(func=cmd_migrate)
+
+    rebuild = sub.add_parser("rebuild-metrics", help="recompute the metric counters from the base tables")
+    rebuild.set_defaults(func=cmd_rebuild_metrics)
+
+    rebuild_search = sub.add_parser("rebuild-search", help="backfill the full-text search indexes")
+    rebuild_search.set_defaults(func=cmd_rebuild_search)
+
+    rebuild_summaries = sub.add_parser("rebuild-summaries", help="recompute the per-student summaries")
+    rebuild_summaries.set_defaults(func=cmd_rebuild_summaries)
+
+    board = sub.add_parser("leaderboard", help="print the top students by a summary metric")
+    board.add_argument("--metric", choices=list(kyra.LEADERBOARD_METRICS), default="avg_rating")
+    board.add_argument("--org", help="only students of this org")
+    board.add_argument("--limit", type=int, default=kyra.LEADERBOARD_PAGE_SIZE)
+    board.set_defaults(func=cmd_leaderboard)
+
+    search = sub.add_parser("search", help="full-text search projects, internship feedback and queries")
+    search.add_argument("text")
+    search.add_argument("--kind", action="append", choices=sorted(kyra.SEARCH_SOURCES),
+                        help="limit to this kind (repeatable)")
+    search.add_argument("--limit", type=int, default=kyra.SEARCH_PAGE_SIZE)
+    search.add_argument("--owner-id", type=int, help="only match this user's queries")
+    search.set_defaults(func=cmd_search)
+
+    archive = sub.add_parser("archive-queries", help="move old Ky'ra queries into compressed monthly archives")
+    archive.add_argument("--days", type=int, default=kyra.QUERY_RETENTION_DAYS, help="keep this many days hot")
+    archive.add_argument("--batch-rows", type=int, default=kyra.ARCHIVE_BATCH_ROWS, help="rows moved per transaction")
+    archive.add_argument("--vacuum", action="store_true", help="shrink the database file afterwards")
+    archive.set_defaults(func=cmd_archive_queries)
+
+    imp = sub.add_parser("import", help="bulk-load a CSV or Parquet file")
+    imp.add_argument("table", choices=sorted(kyra.IMPORT_SPECS))
+    imp.add_argument("file", help="path to a .csv or .parquet file")
+    imp.add_argument("--chunk-rows", type=int, default=kyra.IMPORT_CHUNK_ROWS, help="rows per transaction")
+    imp.add_argument("--rejects", help="write rejected row numbers and reasons to this CSV file")
+    imp.set_defaults(func=cmd_import)
+
+    exp = sub.add_parser("export", help="stream a table to CSV, gzip CSV or Parquet")
+    exp.add_argument("table", choices=sorted(kyra.EXPORT_SPECS))
+    exp.add_argument("output", help="destination file; the format is inferred from its extension")
+    exp.add_argument("--format", choices=sorted(kyra.EXPORT_FORMATS))
+    exp.add_argument("--role", help="only rows owned by users with this role")
+    exp.add_argument("--org", help="only rows owned by users in this org")
+    exp.add_argument("--start", help="ISO date/time, inclusive (timestamped tables only)")
+    exp.add_argument("--end", help="ISO date/time, exclusive (timestamped tables only)")
+    exp.add_argument("--chunk-rows", type=int, default=kyra.EXPORT_CHUNK_ROWS, help="rows fetched per chunk")
+    exp.set_defaults(func=cmd_export)
+
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
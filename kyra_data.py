@@ -0,0 +1,2451 @@
+# -*- coding: utf-8 -*-
+"""kyra_data.py
+
+Schema, connection pool, metrics store and data-access helpers for the
+Ky'ra Internship Dashboard. Imports no UI code, so CLI tools, batch jobs
+and benchmarks can use it without starting Streamlit; pandas, pyarrow and
+requests are imported lazily by the features that need them.
+"""
+
+# --- Imports ---
+import atexit
+import csv
+import functools
+import gzip
+import hmac
+import io
+import json
+import logging
+import os
+import queue
+import re
+import sqlite3
+import sys
+import threading
+import time
+import zlib
+from collections import OrderedDict, deque
+from contextlib import ExitStack, closing, contextmanager, nullcontext
+from datetime import datetime, timedelta
+
+# --- Process-wide Resources ---
+def process_resource(func):
+    """Memoize ``func`` per argument tuple for the life of the process.
+
+    This module is imported once per process (Streamlit only re-executes
+    the app script on rerun), so pools, caches and the writer thread
+    built here are shared by every session.
+    """
+    memo = {}
+    lock = threading.RLock()
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        key = (args, tuple(sorted(kwargs.items())))
+        with lock:
+            if key not in memo:
+                memo[key] = func(*args, **kwargs)
+            return memo[key]
+
+    wrapper.clear = memo.clear
+    return wrapper
+
+# --- Instrumentation ---
+INSTRUMENT = os.environ.get("KYRA_INSTRUMENT", "0") == "1"
+INSTRUMENT_RING_SIZE = int(os.environ.get("KYRA_INSTRUMENT_RING_SIZE", "5000"))
+INSTRUMENT_MAX_SESSIONS = 1000
+METRICS_FILE = os.environ.get("KYRA_METRICS_FILE", "")
+METRICS_FILE_INTERVAL = float(os.environ.get("KYRA_METRICS_FILE_INTERVAL", "15"))
+METRICS_PORT = int(os.environ.get("KYRA_METRICS_PORT", "0"))
+LATENCY_BUCKETS = (0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 5.0)
+
+_NO_SECTION = nullcontext()
+
+def current_session_id():
+    """Streamlit session of the calling script thread, else the thread name."""
+    ctx = None
+    if "streamlit" in sys.modules:
+        from streamlit.runtime.scriptrunner import get_script_run_ctx
+        ctx = get_script_run_ctx(suppress_warning=True)
+    return ctx.session_id if ctx else threading.current_thread().name
+
+def _new_span_stats():
+    return {"count": 0, "seconds": 0.0, "max_seconds": 0.0, "statements": 0, "buckets": [0] * len(LATENCY_BUCKETS)}
+
+def _add_span(stats, seconds, statements):
+    stats["count"] += 1
+    stats["seconds"] += seconds
+    stats["max_seconds"] = max(stats["max_seconds"], seconds)
+    stats["statements"] += statements
+    for i, bound in enumerate(LATENCY_BUCKETS):
+        if seconds <= bound:
+            stats["buckets"][i] += 1
+
+class Instrumentation:
+    """Timings and SQL statement counts per named section.
+
+    Totals are kept globally and per Streamlit session; the most recent
+    individual events are kept in a fixed-size ring buffer. SQLite errors
+    raised inside pooled connections are counted by message, since most
+    helpers swallow them.
+    """
+
+    def __init__(self, ring_size=INSTRUMENT_RING_SIZE, max_sessions=INSTRUMENT_MAX_SESSIONS):
+        self._lock = threading.Lock()
+        self._spans = {}
+        self._sessions = OrderedDict()
+        self._max_sessions = max_sessions
+        self.recent = deque(maxlen=ring_size)
+        self._errors = {}
+        self._thread = threading.local()
+
+    def count_statement(self, statement):
+        """SQLite trace callback; counts statements run on the calling thread."""
+        # Trigger bodies are reported as "-- TRIGGER name"; count only top-level statements.
+        if not statement.startswith("--"):
+            self._thread.statements = getattr(self._thread, "statements", 0) + 1
+
+    def statements(self):
+        return getattr(self._thread, "statements", 0)
+
+    def record(self, name, seconds, statements, session_id):
+        with self._lock:
+            _add_span(self._spans.setdefault(name, _new_span_stats()), seconds, statements)
+            session = self._sessions.setdefault(session_id, {})
+            self._sessions.move_to_end(session_id)
+            while len(self._sessions) > self._max_sessions:
+                self._sessions.popitem(last=False)
+            _add_span(session.setdefault(name, _new_span_stats()), seconds, statements)
+            self.recent.append((time.time(), session_id, name, seconds, statements))
+
+    def record_error(self, exc):
+        key = f"{type(exc).__name__}: {exc}"
+        with self._lock:
+            self._errors[key] = self._errors.get(key, 0) + 1
+
+    def errors(self):
+        """``{"ErrorType: message": count}`` for database errors seen so far."""
+        with self._lock:
+            return dict(self._errors)
+
+    def summary(self, session_id=None):
+        """One row per section: calls, mean/p95/max latency and SQL statements per call."""
+        with self._lock:
+            spans = self._spans if session_id is None else self._sessions.get(session_id, {})
+            spans = {name: dict(stats) for name, stats in spans.items()}
+            recent = [e for e in self.recent if session_id is None or e[1] == session_id]
+        samples = {}
+        for _, _, name, seconds, _ in recent:
+            samples.setdefault(name, []).append(seconds)
+        rows = []
+        for name, stats in sorted(spans.items(), key=lambda item: -item[1]["seconds"]):
+            recent_sorted = sorted(samples.get(name, [0.0]))
+            rows.append({
+                "section": name,
+                "calls": stats["count"],
+                "mean_ms": stats["seconds"] / stats["count"] * 1000,
+                "p95_ms": recent_sorted[int(0.95 * (len(recent_sorted) - 1))] * 1000,
+                "max_ms": stats["max_seconds"] * 1000,
+                "sql_per_call": stats["statements"] / stats["count"],
+            })
+        return rows
+
+    def prometheus(self):
+        """Render global totals (and write-behind and snapshot stats) in Prometheus text format."""
+        with self._lock:
+            spans = {name: dict(stats, buckets=list(stats["buckets"])) for name, stats in self._spans.items()}
+        lines = [
+            "# HELP kyra_section_seconds Time spent in instrumented sections.",
+            "# TYPE kyra_section_seconds histogram",
+        ]
+        for name, stats in sorted(spans.items()):
+            label = name.replace("\\", "\\\\").replace('"', '\\"')
+            for bound, count in zip(LATENCY_BUCKETS, stats["buckets"]):
+                lines.append(f'kyra_section_seconds_bucket{{section="{label}",le="{bound}"}} {count}')
+            lines.append(f'kyra_section_seconds_bucket{{section="{label}",le="+Inf"}} {stats["count"]}')
+            lines.append(f'kyra_section_seconds_sum{{section="{label}"}} {stats["seconds"]}')
+            lines.append(f'kyra_section_seconds_count{{section="{label}"}} {stats["count"]}')
+        lines += ["# HELP kyra_section_sql_statements_total SQL statements executed inside each section.",
+                  "# TYPE kyra_section_sql_statements_total counter"]
+        for name, stats in sorted(spans.items()):
+            label = name.replace("\\", "\\\\").replace('"', '\\"')
+            lines.append(f'kyra_section_sql_statements_total{{section="{label}"}} {stats["statements"]}')
+        lines += ["# HELP kyra_db_errors_total SQLite errors raised inside pooled connections.",
+                  "# TYPE kyra_db_errors_total counter"]
+        for error, count in sorted(self.errors().items()):
+            label = error.replace("\\", "\\\\").replace('"', '\\"').replace("\n", " ")
+            lines.append(f'kyra_db_errors_total{{error="{label}"}} {count}')
+        writer = get_writer()
+        if writer is not None:
+            stats = writer.stats()
+            lines += [
+                "# TYPE kyra_write_queue_depth gauge", f"kyra_write_queue_depth {stats['queue_depth']}",
+                "# TYPE kyra_write_batches_total counter", f"kyra_write_batches_total {stats['batches']}",
+                "# TYPE kyra_write_rows_total counter", f"kyra_write_rows_total {stats['rows']}",
+                "# TYPE kyra_write_failed_rows_total counter", f"kyra_write_failed_rows_total {stats['failed_rows']}",
+                "# TYPE kyra_write_requeued_rows_total counter",
+                f"kyra_write_requeued_rows_total {stats['requeued_rows']}",
+                "# TYPE kyra_write_last_batch_size gauge", f"kyra_write_last_batch_size {stats['last_batch_size']}",
+            ]
+        snapshot = get_read_snapshot()
+        if snapshot is not None:
+            stats = snapshot.stats()
+            lines += [
+                "# TYPE kyra_snapshot_refreshes_total counter", f"kyra_snapshot_refreshes_total {stats['refreshes']}",
+                "# TYPE kyra_snapshot_last_refresh_seconds gauge",
+                f"kyra_snapshot_last_refresh_seconds {stats['last_refresh_ms'] / 1000}",
+                "# TYPE kyra_snapshot_staleness_seconds gauge",
+                f"kyra_snapshot_staleness_seconds {stats['staleness_seconds']}",
+                "# TYPE kyra_snapshot_size_bytes gauge", f"kyra_snapshot_size_bytes {stats['size_bytes']}",
+            ]
+        return "\n".join(lines) + "\n"
+
+    def write_prometheus_file(self, path):
+        tmp = f"{path}.tmp"
+        with open(tmp, "w") as f:
+            f.write(self.prometheus())
+        os.replace(tmp, path)
+
+def _serve_prometheus(instrumentation, port):
+    import http.server
+
+    class MetricsHandler(http.server.BaseHTTPRequestHandler):
+        def do_GET(self):
+            body = instrumentation.prometheus().encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = http.server.ThreadingHTTPServer(("127.0.0.1", port), MetricsHandler)
+    threading.Thread(target=server.serve_forever, name="kyra-metrics-http", daemon=True).start()
+
+def _write_prometheus_periodically(instrumentation, path, interval):
+    while True:
+        time.sleep(interval)
+        try:
+            instrumentation.write_prometheus_file(path)
+        except OSError:
+            pass
+
+@process_resource
+def get_instrumentation():
+    instrumentation = Instrumentation()
+    if METRICS_PORT:
+        _serve_prometheus(instrumentation, METRICS_PORT)
+    if METRICS_FILE:
+        threading.Thread(target=_write_prometheus_periodically, name="kyra-metrics-file", daemon=True,
+                         args=(instrumentation, METRICS_FILE, METRICS_FILE_INTERVAL)).start()
+        atexit.register(instrumentation.write_prometheus_file, METRICS_FILE)
+    return instrumentation
+
+@contextmanager
+def _timed_section(name):
+    instrumentation = get_instrumentation()
+    statements = instrumentation.statements()
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        instrumentation.record(name, elapsed, instrumentation.statements() - statements, current_session_id())
+
+def perf_section(name):
+    """Time a block under ``name``; a shared no-op context when instrumentation is off."""
+    return _timed_section(name) if INSTRUMENT else _NO_SECTION
+
+def instrumented(func):
+    """Time every call of ``func``; returns ``func`` untouched when instrumentation is off."""
+    if not INSTRUMENT:
+        return func
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        with _timed_section(func.__name__):
+            return func(*args, **kwargs)
+
+    return wrapper
+
+# --- Database Connection Pool (SQLite) ---
+DB_PATH = os.environ.get("KYRA_DB_PATH", os.path.join(os.getcwd(), "internship_tracking.db"))
+DB_POOL_SIZE = int(os.environ.get("KYRA_DB_POOL_SIZE", "8"))
+DB_BUSY_TIMEOUT_MS = int(os.environ.get("KYRA_DB_BUSY_TIMEOUT_MS", "5000"))
+DB_SYNCHRONOUS = os.environ.get("KYRA_DB_SYNCHRONOUS", "NORMAL")
+
+class ConnectionPool:
+    """Bounded pool of SQLite connections.
+
+    Each thread checks out its own connection for the duration of a
+    ``with pool.connection()`` block, so sessions never share transaction
+    state. Nested checkouts on the same thread reuse the outer connection
+    and only the outermost block commits or rolls back.
+    """
+
+    def __init__(self, db_path, size=DB_POOL_SIZE, readonly=False):
+        self.db_path = db_path
+        self.size = size
+        self.readonly = readonly
+        self._idle = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(size)
+        self._local = threading.local()
+
+    def _connect(self):
+        timeout = DB_BUSY_TIMEOUT_MS / 1000
+        if self.readonly:
+            from urllib.request import pathname2url
+            uri = f"file:{pathname2url(self.db_path)}?mode=ro"
+            conn = sqlite3.connect(uri, uri=True, timeout=timeout, check_same_thread=False)
+            conn.execute("PRAGMA query_only = ON")
+        else:
+            conn = sqlite3.connect(self.db_path, timeout=timeout, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode = WAL")
+        conn.execute(f"PRAGMA busy_timeout = {DB_BUSY_TIMEOUT_MS}")
+        conn.execute(f"PRAGMA synchronous = {DB_SYNCHRONOUS}")
+        if INSTRUMENT:
+            conn.set_trace_callback(get_instrumentation().count_statement)
+        return conn
+
+    def held(self):
+        return getattr(self._local, "conn", None)
+
+    @contextmanager
+    def connection(self):
+        conn = self.held()
+        if conn is not None:
+            yield conn
+            return
+        if not self._slots.acquire(timeout=DB_BUSY_TIMEOUT_MS / 1000):
+            exc = sqlite3.OperationalError("database connection pool exhausted")
+            if INSTRUMENT:
+                get_instrumentation().record_error(exc)
+            raise exc
+        try:
+            try:
+                conn = self._idle.get_nowait()
+            except queue.Empty:
+                conn = self._connect()
+            self._local.conn = conn
+            try:
+                yield conn
+                conn.commit()
+            except BaseException as exc:
+                conn.rollback()
+                if INSTRUMENT and isinstance(exc, sqlite3.Error):
+                    get_instrumentation().record_error(exc)
+                raise
+            finally:
+                self._local.conn = None
+                self._idle.put(conn)
+        finally:
+            self._slots.release()
+
+@process_resource
+def get_connection_pools():
+    return {
+        "write": ConnectionPool(DB_PATH),
+        "read": ConnectionPool(DB_PATH, readonly=True),
+    }
+
+@contextmanager
+def db_connection(readonly=False):
+    """Check out a pooled connection; commits on success, rolls back on error.
+
+    Read-only checkouts reuse this thread's write connection if one is
+    already held, so reads inside a write block see its uncommitted rows.
+    """
+    pools = get_connection_pools()
+    pool = pools["write"]
+    if readonly and pool.held() is None:
+        pool = pools["read"]
+    with pool.connection() as conn:
+        yield conn
+
+# --- Read Snapshot ---
+READ_SNAPSHOT = os.environ.get("KYRA_READ_SNAPSHOT", "0") == "1"
+READ_SNAPSHOT_MAX_AGE = float(os.environ.get("KYRA_READ_SNAPSHOT_MAX_AGE", "5"))
+
+class ReadSnapshot:
+    """In-memory copy of the database, refreshed in the background.
+
+    Every ``max_age`` seconds a thread checks ``PRAGMA data_version`` on
+    its own disk connection and, if another connection has committed
+    since the last copy, takes a fresh one with the backup API and swaps
+    it in. Readers keep whichever copy they started with, so a refresh
+    never blocks them; old copies close when their last reader is done.
+    """
+
+    def __init__(self, db_path, max_age=READ_SNAPSHOT_MAX_AGE):
+        from urllib.request import pathname2url
+        self.max_age = max_age
+        self._source = sqlite3.connect(f"file:{pathname2url(db_path)}?mode=ro", uri=True,
+                                       timeout=DB_BUSY_TIMEOUT_MS / 1000, check_same_thread=False)
+        self._lock = threading.Lock()
+        self._data_version = None
+        self._stats = {"refreshes": 0, "unchanged_checks": 0, "failed_refreshes": 0,
+                       "last_refresh_ms": 0.0, "max_refresh_ms": 0.0, "size_bytes": 0}
+        self._checked = 0.0
+        self._conn = None
+        self.refresh()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="kyra-read-snapshot", daemon=True)
+        self._thread.start()
+
+    def connection(self):
+        return self._conn
+
+    def refresh(self, force=False):
+        """Copy the database into memory if it changed; returns True if a new copy was taken."""
+        with self._lock:
+            checked = time.monotonic()
+            version = self._source.execute("PRAGMA data_version").fetchone()[0]
+            if version == self._data_version and not force:
+                self._checked = checked
+                self._stats["unchanged_checks"] += 1
+                return False
+            with perf_section("snapshot_refresh"):
+                start = time.perf_counter()
+                # sqlite3.threadsafety == 3 (serialized), so one copy serves every thread.
+                conn = sqlite3.connect(":memory:", check_same_thread=False)
+                self._source.backup(conn)
+                conn.execute("PRAGMA query_only = ON")
+                if INSTRUMENT:
+                    conn.set_trace_callback(get_instrumentation().count_statement)
+                elapsed_ms = (time.perf_counter() - start) * 1000
+            page_count = conn.execute("PRAGMA page_count").fetchone()[0]
+            page_size = conn.execute("PRAGMA page_size").fetchone()[0]
+            self._conn, self._data_version, self._checked = conn, version, checked
+            self._stats["refreshes"] += 1
+            self._stats["last_refresh_ms"] = elapsed_ms
+            self._stats["max_refresh_ms"] = max(self._stats["max_refresh_ms"], elapsed_ms)
+            self._stats["size_bytes"] = page_count * page_size
+        for cache in _snapshot_caches():
+            cache.clear()
+        return True
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+            stats["staleness_seconds"] = time.monotonic() - self._checked
+        stats["max_age_seconds"] = self.max_age
+        return stats
+
+    def close(self):
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        while not self._stop.wait(self.max_age):
+            try:
+                self.refresh()
+            except sqlite3.Error:
+                with self._lock:
+                    self._stats["failed_refreshes"] += 1
+
+def _snapshot_caches():
+    # Cached results read from the snapshot; cleared when a new copy is swapped in.
+    return [_metrics_cache(), _student_page_cache(), _rollup_cache(), _leaderboard_cache()]
+
+@process_resource
+def get_read_snapshot():
+    """Return the process-wide read snapshot, or None when KYRA_READ_SNAPSHOT is off."""
+    if not READ_SNAPSHOT:
+        return None
+    snapshot = ReadSnapshot(DB_PATH)
+    atexit.register(snapshot.close)
+    return snapshot
+
+@contextmanager
+def snapshot_connection():
+    """Connection for dashboard reads that tolerate READ_SNAPSHOT_MAX_AGE seconds of staleness.
+
+    Yields the in-memory snapshot when KYRA_READ_SNAPSHOT=1, otherwise a
+    pooled read-only connection. A thread holding a write connection reads
+    from it instead, so it always sees its own writes.
+    """
+    snapshot = get_read_snapshot()
+    if snapshot is None or get_connection_pools()["write"].held() is not None:
+        with db_connection(readonly=True) as conn:
+            yield conn
+    else:
+        yield snapshot.connection()
+
+# --- Database Initialization ---
+@process_resource
+def initialize_database():
+    """Bring the database up to the latest schema version once per process."""
+    migrate_database()
+
+def schema_version(conn):
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+@instrumented
+def migrate_database(target=None):
+    """Apply pending migrations in order, one transaction per version.
+
+    The version is recorded in ``PRAGMA user_version`` and re-read under
+    ``BEGIN IMMEDIATE`` so concurrent processes never apply a step twice.
+    Returns ``(version_before, version_after)``.
+    """
+    target = len(MIGRATIONS) if target is None else target
+    with db_connection() as conn:
+        start = schema_version(conn)
+        while True:
+            conn.execute("BEGIN IMMEDIATE")
+            version = schema_version(conn)
+            if version >= target:
+                conn.rollback()
+                return start, version
+            MIGRATIONS[version](conn)
+            conn.execute(f"PRAGMA user_version = {version + 1}")
+            conn.commit()
+
+def _migrate_metrics_store(conn):
+    install_metrics_store(conn)
+
+def _add_lookup_indexes(conn):
+    # idx_internships_student_msme also covers the SUM(msme_digitalized) rebuild scan,
+    # and idx_projects_student_id the COUNT(DISTINCT student_id) one.
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_internships_student_msme ON internships (student_id, msme_digitalized)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_projects_student_id ON projects (student_id)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_feedback_student_id ON feedback (student_id)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_queries_user_id ON queries (user_id)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_users_role ON users (role)")
+    conn.execute("ANALYZE")
+
+def _add_query_latency_columns(conn):
+    conn.execute("ALTER TABLE queries ADD COLUMN latency_ms REAL")
+    conn.execute("ALTER TABLE queries ADD COLUMN cache_hit INTEGER DEFAULT 0")
+
+def _add_regional_rollups(conn):
+    conn.execute("ALTER TABLE users ADD COLUMN region TEXT")
+    for table in ROLLUP_SOURCES:
+        for column in ("created_at", "org", "region"):
+            conn.execute(f"ALTER TABLE {table} ADD COLUMN {column} TEXT")
+        conn.execute(f"CREATE INDEX IF NOT EXISTS idx_{table}_created_at ON {table} (created_at)")
+    install_rollup_store(conn)
+
+def _add_search_index(conn):
+    install_search_index(conn)
+
+def _add_query_time_indexes(conn):
+    # (user_id, timestamp) serves history pages and supersedes the plain user_id index;
+    # (timestamp) lets the archiver find the oldest rows without a scan.
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_queries_user_timestamp ON queries (user_id, timestamp)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_queries_timestamp ON queries (timestamp)")
+    conn.execute("DROP INDEX IF EXISTS idx_queries_user_id")
+
+def _add_student_summaries(conn):
+    install_student_summaries(conn)
+
+def _create_tables(conn):
+    cur = conn.cursor()
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS users (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT NOT NULL,
+            email TEXT UNIQUE NOT NULL,
+            role TEXT NOT NULL,
+            org TEXT
+        )
+    """)
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS projects (
+            project_id INTEGER PRIMARY KEY AUTOINCREMENT,
+            student_id INTEGER,
+            title TEXT NOT NULL,
+            description TEXT,
+            status TEXT,
+            FOREIGN KEY (student_id) REFERENCES users (id)
+        )
+    """)
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS queries (
+            query_id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id INTEGER,
+            prompt TEXT,
+            response TEXT,
+            timestamp TEXT,
+            FOREIGN KEY (user_id) REFERENCES users (id)
+        )
+    """)
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS metrics (
+            metric_id INTEGER PRIMARY KEY AUTOINCREMENT,
+            role TEXT,
+            metric_name TEXT,
+            value INTEGER
+        )
+    """)
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS internships (
+            internship_id INTEGER PRIMARY KEY AUTOINCREMENT,
+            student_id INTEGER,
+            company_name TEXT NOT NULL,
+            duration TEXT NOT NULL,
+            feedback TEXT,
+            msme_digitalized INTEGER DEFAULT 0,
+            FOREIGN KEY (student_id) REFERENCES users (id)
+        )
+    """)
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS feedback (
+            feedback_id INTEGER PRIMARY KEY AUTOINCREMENT,
+            student_id INTEGER,
+            rating INTEGER,
+            comments TEXT,
+            FOREIGN KEY (student_id) REFERENCES users (id)
+        )
+    """)
+    cur.close()
+
+# Schema version N is reached by applying MIGRATIONS[N - 1]; only ever append.
+MIGRATIONS = [
+    _create_tables,
+    _migrate_metrics_store,
+    _add_lookup_indexes,
+    _add_query_latency_columns,
+    _add_regional_rollups,
+    _add_search_index,
+    _add_query_time_indexes,
+    _add_student_summaries,
+]
+
+# --- Metrics Store ---
+METRICS_CACHE_TTL = float(os.environ.get("KYRA_METRICS_CACHE_TTL", "5"))
+
+# (role, metric_name, full-scan query used to seed and rebuild the counter)
+METRIC_DEFINITIONS = [
+    ("student", "total_internships", "SELECT COUNT(*) FROM internships"),
+    ("student", "total_msmes", "SELECT COALESCE(SUM(msme_digitalized), 0) FROM internships"),
+    ("student", "certifications_issued", "SELECT COUNT(*) FROM internships"),
+    ("college", "students_participating", "SELECT COUNT(*) FROM users WHERE role = 'student'"),
+    ("college", "projects_submitted", "SELECT COUNT(*) FROM projects"),
+    ("mentor", "sessions_conducted", "SELECT COUNT(*) FROM feedback"),
+    ("mentor", "feedback_logged", "SELECT COUNT(*) FROM feedback"),
+    ("msme", "projects_received", "SELECT COUNT(*) FROM projects"),
+    ("msme", "students_matched", "SELECT COUNT(DISTINCT student_id) FROM projects WHERE student_id IS NOT NULL"),
+    ("government", "colleges_onboarded", "SELECT COUNT(*) FROM users WHERE role = 'college'"),
+    ("government", "total_engagement", "SELECT COUNT(*) FROM internships"),
+]
+
+def _bump(metrics, delta):
+    return "".join(
+        f"UPDATE metrics SET value = value + ({delta}) WHERE role = '{role}' AND metric_name = '{name}';\n"
+        for role, name in metrics
+    )
+
+_INTERNSHIP_COUNTERS = [("student", "total_internships"), ("student", "certifications_issued"), ("government", "total_engagement")]
+_PROJECT_COUNTERS = [("college", "projects_submitted"), ("msme", "projects_received")]
+_FEEDBACK_COUNTERS = [("mentor", "sessions_conducted"), ("mentor", "feedback_logged")]
+_MSME_TOTAL = [("student", "total_msmes")]
+_STUDENTS = [("college", "students_participating")]
+_COLLEGES = [("government", "colleges_onboarded")]
+_MATCHED = [("msme", "students_matched")]
+
+# A project adds a matched student only if no other project already references that student.
+_NEW_MATCH = "NEW.student_id IS NOT NULL AND NOT EXISTS (SELECT 1 FROM projects WHERE student_id = NEW.student_id AND project_id != NEW.project_id)"
+_LOST_MATCH = "OLD.student_id IS NOT NULL AND NOT EXISTS (SELECT 1 FROM projects WHERE student_id = OLD.student_id)"
+
+METRIC_TRIGGERS = {
+    "metrics_internships_insert": "AFTER INSERT ON internships",
+    "metrics_internships_delete": "AFTER DELETE ON internships",
+    "metrics_internships_update": "AFTER UPDATE OF msme_digitalized ON internships",
+    "metrics_users_insert": "AFTER INSERT ON users",
+    "metrics_users_delete": "AFTER DELETE ON users",
+    "metrics_users_update": "AFTER UPDATE OF role ON users",
+    "metrics_projects_insert": "AFTER INSERT ON projects",
+    "metrics_projects_delete": "AFTER DELETE ON projects",
+    "metrics_projects_update": "AFTER UPDATE OF student_id ON projects WHEN OLD.student_id IS NOT NEW.student_id",
+    "metrics_feedback_insert": "AFTER INSERT ON feedback",
+    "metrics_feedback_delete": "AFTER DELETE ON feedback",
+}
+
+METRIC_TRIGGER_BODIES = {
+    "metrics_internships_insert": _bump(_INTERNSHIP_COUNTERS, "1") + _bump(_MSME_TOTAL, "COALESCE(NEW.msme_digitalized, 0)"),
+    "metrics_internships_delete": _bump(_INTERNSHIP_COUNTERS, "-1") + _bump(_MSME_TOTAL, "-COALESCE(OLD.msme_digitalized, 0)"),
+    "metrics_internships_update": _bump(_MSME_TOTAL, "COALESCE(NEW.msme_digitalized, 0) - COALESCE(OLD.msme_digitalized, 0)"),
+    "metrics_users_insert": _bump(_STUDENTS, "NEW.role = 'student'") + _bump(_COLLEGES, "NEW.role = 'college'"),
+    "metrics_users_delete": _bump(_STUDENTS, "-(OLD.role = 'student')") + _bump(_COLLEGES, "-(OLD.role = 'college')"),
+    "metrics_users_update": (_bump(_STUDENTS, "(NEW.role = 'student') - (OLD.role = 'student')")
+                             + _bump(_COLLEGES, "(NEW.role = 'college') - (OLD.role = 'college')")),
+    "metrics_projects_insert": _bump(_PROJECT_COUNTERS, "1") + _bump(_MATCHED, _NEW_MATCH),
+    "metrics_projects_delete": _bump(_PROJECT_COUNTERS, "-1") + _bump(_MATCHED, f"-({_LOST_MATCH})"),
+    "metrics_projects_update": _bump(_MATCHED, f"({_NEW_MATCH}) - ({_LOST_MATCH})"),
+    "metrics_feedback_insert": _bump(_FEEDBACK_COUNTERS, "1"),
+    "metrics_feedback_delete": _bump(_FEEDBACK_COUNTERS, "-1"),
+}
+
+class TTLCache:
+    """Small thread-safe LRU cache whose entries expire after ``ttl`` seconds."""
+
+    def __init__(self, ttl, maxsize=1024):
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return default
+            expires, value = item
+            if expires < time.monotonic():
+                del self._data[key]
+                return default
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._data[key] = (time.monotonic() + self.ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def pop(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+# One cache per name for the whole process, shared by every session.
+@process_resource
+def get_cache(name, ttl, maxsize=1024):
+    return TTLCache(ttl, maxsize)
+
+def _metrics_cache():
+    return get_cache("metrics", METRICS_CACHE_TTL, maxsize=len({role for role, _, _ in METRIC_DEFINITIONS}))
+
+def install_metrics_store(conn):
+    """Create the metric counters and the triggers that keep them current.
+
+    Counters are seeded from a full rebuild the first time, after which every
+    insert, delete or relevant update adjusts them inside the writer's own
+    transaction.
+    """
+    conn.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_metrics_role_name ON metrics (role, metric_name)")
+    for name, event in METRIC_TRIGGERS.items():
+        conn.execute(f"CREATE TRIGGER IF NOT EXISTS {name} {event} BEGIN\n{METRIC_TRIGGER_BODIES[name]}END")
+    seeded = conn.execute("SELECT COUNT(*) FROM metrics").fetchone()[0]
+    if seeded != len(METRIC_DEFINITIONS):
+        rebuild_metrics(conn)
+
+@instrumented
+def rebuild_metrics(conn=None):
+    """Recompute every counter from the base tables to recover from drift."""
+    if conn is None:
+        with db_connection() as conn:
+            return _rebuild_metrics(conn)
+    return _rebuild_metrics(conn)
+
+def _rebuild_metrics(conn):
+    conn.execute("DELETE FROM metrics")
+    for role, name, query in METRIC_DEFINITIONS:
+        value = conn.execute(query).fetchone()[0]
+        conn.execute("INSERT INTO metrics (role, metric_name, value) VALUES (?, ?, ?)", (role, name, value))
+    _metrics_cache().clear()
+    return {(role, name): value for role, name, value in
+            conn.execute("SELECT role, metric_name, value FROM metrics ORDER BY metric_id")}
+
+# --- Regional Rollups ---
+ROLLUP_CACHE_TTL = float(os.environ.get("KYRA_ROLLUP_CACHE_TTL", "60"))
+UNKNOWN_TAG = "Unknown"
+# Same shape as datetime.utcnow().isoformat() (millisecond precision), so ranges compare as text.
+SQL_NOW = "strftime('%Y-%m-%dT%H:%M:%f', 'now')"
+
+# grain -> (rollup table, bucket column, SQL truncating a timestamp {ts} to its bucket)
+ROLLUP_GRAINS = {
+    "daily": ("daily_rollups", "day", "date({ts})"),
+    "monthly": ("monthly_rollups", "month", "date({ts}, 'start of month')"),
+}
+# source table -> (primary key, {rollup column: per-row value, columns prefixed with {row}})
+ROLLUP_SOURCES = {
+    "internships": ("internship_id", {"internships": "1", "msmes_digitalized": "COALESCE({row}msme_digitalized, 0)"}),
+    "projects": ("project_id", {"projects": "1"}),
+    "feedback": ("feedback_id", {"feedback": "1", "rating_sum": "COALESCE({row}rating, 0)",
+                                 "ratings": "({row}rating IS NOT NULL)"}),
+}
+ROLLUP_COLUMNS = [column for _, deltas in ROLLUP_SOURCES.values() for column in deltas]
+
+def _tag_rows(table, key, row_filter):
+    """UPDATE stamping created_at and the owning user's org/region on rows that lack them."""
+    owner = f"(SELECT {{col}} FROM users WHERE id = {table}.student_id)"
+    return (f"UPDATE {table} SET created_at = COALESCE(created_at, {SQL_NOW}), "
+            f"org = COALESCE(org, {owner.format(col='org')}, '{UNKNOWN_TAG}'), "
+            f"region = COALESCE(region, {owner.format(col='region')}, '{UNKNOWN_TAG}') "
+            f"WHERE {row_filter} AND (created_at IS NULL OR org IS NULL OR region IS NULL)")
+
+def _rollup_upserts(source, row, tail, sign="1", aggregate=False):
+    """Statements adding ``source``'s per-row values (times ``sign``) into both rollup grains.
+
+    ``row`` prefixes column references (``"NEW."``, ``"OLD."`` or ``""``) and
+    ``tail`` completes the SELECT; it must contain a WHERE clause.
+    """
+    _, deltas = ROLLUP_SOURCES[source]
+    columns = ", ".join(deltas)
+    updates = ", ".join(f"{c} = {c} + excluded.{c}" for c in deltas)
+    values = [f"{sign} * {expr.format(row=row)}" for expr in deltas.values()]
+    if aggregate:
+        values = [f"SUM({value})" for value in values]
+    return [
+        f"INSERT INTO {table} ({bucket}, org, region, {columns})\n"
+        f"SELECT {trunc.format(ts=row + 'created_at')}, {row}org, {row}region, {', '.join(values)} {tail}\n"
+        f"ON CONFLICT ({bucket}, org, region) DO UPDATE SET {updates}"
+        for table, bucket, trunc in ROLLUP_GRAINS.values()
+    ]
+
+def _rollup_triggers():
+    triggers = {}
+    for source, (key, _) in ROLLUP_SOURCES.items():
+        # Inserted rows are tagged first, then counted from their stored tags.
+        triggers[(f"rollup_{source}_insert", f"AFTER INSERT ON {source}")] = (
+            [_tag_rows(source, key, f"{key} = NEW.{key}")]
+            + _rollup_upserts(source, "", f"FROM {source} WHERE {key} = NEW.{key}"))
+        triggers[(f"rollup_{source}_delete", f"AFTER DELETE ON {source}")] = (
+            _rollup_upserts(source, "OLD.", "WHERE OLD.created_at IS NOT NULL", sign="-1"))
+    for source, column in (("internships", "msme_digitalized"), ("feedback", "rating")):
+        triggers[(f"rollup_{source}_update",
+                  f"AFTER UPDATE OF {column} ON {source} WHEN OLD.{column} IS NOT NEW.{column}")] = (
+            _rollup_upserts(source, "OLD.", "WHERE OLD.created_at IS NOT NULL", sign="-1")
+            + _rollup_upserts(source, "NEW.", "WHERE NEW.created_at IS NOT NULL"))
+    return triggers
+
+# (trigger name, event) -> statements in the trigger body
+ROLLUP_TRIGGERS = _rollup_triggers()
+
+def install_rollup_store(conn):
+    """Create the daily/monthly rollup tables and the triggers that keep them current.
+
+    Existing rows are tagged (created_at defaults to now, org/region to the
+    owner's) and the rollups rebuilt once; afterwards each insert, delete or
+    value update adjusts its day and month bucket in the writer's transaction.
+    """
+    for table, bucket, _ in ROLLUP_GRAINS.values():
+        counters = ", ".join(f"{column} INTEGER NOT NULL DEFAULT 0" for column in ROLLUP_COLUMNS)
+        conn.execute(f"""
+            CREATE TABLE IF NOT EXISTS {table} (
+                {bucket} TEXT NOT NULL, org TEXT NOT NULL, region TEXT NOT NULL, {counters},
+                PRIMARY KEY ({bucket}, org, region)
+            ) WITHOUT ROWID
+        """)
+    for source, (key, _) in ROLLUP_SOURCES.items():
+        conn.execute(_tag_rows(source, key, "1"))
+    for (name, event), statements in ROLLUP_TRIGGERS.items():
+        body = "".join(f"{statement};\n" for statement in statements)
+        conn.execute(f"CREATE TRIGGER IF NOT EXISTS {name} {event} BEGIN\n{body}END")
+    rebuild_rollups(conn)
+
+@instrumented
+def rebuild_rollups(conn=None):
+    """Recompute both rollup tables from the tagged base rows; returns rows per grain."""
+    if conn is None:
+        with db_connection() as conn:
+            return _rebuild_rollups(conn)
+    return _rebuild_rollups(conn)
+
+def _rebuild_rollups(conn):
+    for table, _, _ in ROLLUP_GRAINS.values():
+        conn.execute(f"DELETE FROM {table}")
+    for source in ROLLUP_SOURCES:
+        tail = f"FROM {source} WHERE created_at IS NOT NULL GROUP BY 1, 2, 3"
+        for statement in _rollup_upserts(source, "", tail, aggregate=True):
+            conn.execute(statement)
+    _rollup_cache().clear()
+    return {grain: conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+            for grain, (table, _, _) in ROLLUP_GRAINS.items()}
+
+def _rollup_cache():
+    return get_cache("rollups", ROLLUP_CACHE_TTL, maxsize=64)
+
+@instrumented
+def fetch_rollups(grain="monthly", start=None, end=None):
+    """Rollup rows of ``grain`` ("daily" or "monthly") as a DataFrame.
+
+    One row per bucket, org and region with a ``bucket`` datetime column and
+    the ROLLUP_COLUMNS counters. ``start`` (inclusive) and ``end`` (exclusive)
+    are ISO dates. Results are cached for ROLLUP_CACHE_TTL seconds; callers
+    must not modify the returned frame.
+    """
+    import pandas as pd
+    table, bucket, _ = ROLLUP_GRAINS[grain]
+    key = (grain, str(start) if start else None, str(end) if end else None)
+    rollups = _rollup_cache().get(key)
+    if rollups is None:
+        where, params = [], []
+        if start:
+            where.append(f"{bucket} >= ?")
+            params.append(key[1])
+        if end:
+            where.append(f"{bucket} < ?")
+            params.append(key[2])
+        sql = f"SELECT {bucket} AS bucket, org, region, {', '.join(ROLLUP_COLUMNS)} FROM {table}"
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        try:
+            with snapshot_connection() as conn:
+                rollups = pd.read_sql_query(sql, conn, params=params)
+        except sqlite3.Error:
+            return pd.DataFrame(columns=["bucket", "org", "region"] + ROLLUP_COLUMNS)
+        rollups["bucket"] = pd.to_datetime(rollups["bucket"])
+        _rollup_cache().set(key, rollups)
+    return rollups
+
+def summarize_rollups(rollups, by):
+    """Sum the rollup counters grouped by ``by`` and add ``avg_rating``."""
+    summary = rollups.groupby(by, as_index=False)[ROLLUP_COLUMNS].sum()
+    summary["avg_rating"] = (summary["rating_sum"] / summary["ratings"].where(summary["ratings"] > 0)).round(2)
+    return summary
+
+# --- Student Summaries ---
+LEADERBOARD_PAGE_SIZE = 10
+LEADERBOARD_MIN_RATINGS = int(os.environ.get("KYRA_LEADERBOARD_MIN_RATINGS", "3"))
+LEADERBOARD_CACHE_TTL = float(os.environ.get("KYRA_LEADERBOARD_CACHE_TTL", "30"))
+LEADERBOARD_PERCENTILES = (50, 75, 90, 99)
+
+# source table -> {summary column: per-row value, columns prefixed with {row}}
+SUMMARY_SOURCES = {
+    "internships": {"internships": "1", "msmes_digitalized": "COALESCE({row}msme_digitalized, 0)"},
+    "feedback": {"ratings": "({row}rating IS NOT NULL)", "rating_sum": "COALESCE({row}rating, 0)"},
+}
+SUMMARY_COLUMNS = ["ratings", "rating_sum", "avg_rating", "internships", "msmes_digitalized"]
+# metric -> (label, sort columns); student_id breaks the remaining ties.
+LEADERBOARD_METRICS = {
+    "avg_rating": ("Average rating", ("avg_rating", "ratings")),
+    "ratings": ("Ratings received", ("ratings",)),
+    "internships": ("Internships", ("internships",)),
+    "msmes_digitalized": ("MSMEs digitalized", ("msmes_digitalized",)),
+}
+
+def _student_org(row):
+    return f"COALESCE((SELECT org FROM users WHERE id = {row}student_id), '{UNKNOWN_TAG}')"
+
+def _is_student(row):
+    # Feedback and internships can point at mentors or colleges; only students are summarized.
+    return f"(SELECT role FROM users WHERE id = {row}student_id) = 'student'"
+
+def _summary_upsert(source, row, tail, sign="1", aggregate=False):
+    """Statement adding ``source``'s per-row values (times ``sign``) into its student's summary.
+
+    ``row`` prefixes column references (``"NEW."``, ``"OLD."`` or ``""``) and
+    ``tail`` completes the SELECT; it must contain a WHERE clause.
+    """
+    deltas = SUMMARY_SOURCES[source]
+    values = [f"{sign} * {expr.format(row=row)}" for expr in deltas.values()]
+    if aggregate:
+        values = [f"SUM({value})" for value in values]
+    return (f"INSERT INTO student_summaries (student_id, org, {', '.join(deltas)})\n"
+            f"SELECT {row}student_id, {_student_org(row)}, {', '.join(values)} {tail}\n"
+            f"ON CONFLICT (student_id) DO UPDATE SET {', '.join(f'{c} = {c} + excluded.{c}' for c in deltas)}")
+
+def _summary_triggers():
+    triggers = {
+        ("summary_users_insert", "AFTER INSERT ON users WHEN NEW.role = 'student'"): [
+            f"INSERT INTO student_summaries (student_id, org) VALUES (NEW.id, COALESCE(NEW.org, '{UNKNOWN_TAG}'))\n"
+            "ON CONFLICT (student_id) DO NOTHING"],
+        ("summary_users_update",
+         "AFTER UPDATE OF org, role ON users WHEN OLD.role = 'student' AND NEW.role = 'student'"): [
+            f"INSERT INTO student_summaries (student_id, org) VALUES (NEW.id, COALESCE(NEW.org, '{UNKNOWN_TAG}'))\n"
+            "ON CONFLICT (student_id) DO UPDATE SET org = excluded.org"],
+        # A user becoming a student brings along any feedback and internships already filed for them.
+        ("summary_users_promote",
+         "AFTER UPDATE OF role ON users WHEN OLD.role IS NOT 'student' AND NEW.role = 'student'"): [
+            "DELETE FROM student_summaries WHERE student_id = NEW.id",
+            f"INSERT INTO student_summaries (student_id, org) VALUES (NEW.id, COALESCE(NEW.org, '{UNKNOWN_TAG}'))",
+        ] + [_summary_upsert(source, "", f"FROM {source} WHERE student_id = NEW.id GROUP BY student_id",
+                             aggregate=True)
+             for source in SUMMARY_SOURCES],
+        ("summary_users_demote",
+         "AFTER UPDATE OF role ON users WHEN OLD.role = 'student' AND NEW.role IS NOT 'student'"): [
+            "DELETE FROM student_summaries WHERE student_id = NEW.id"],
+        ("summary_users_delete", "AFTER DELETE ON users"): [
+            "DELETE FROM student_summaries WHERE student_id = OLD.id"],
+    }
+    for source, column in (("internships", "msme_digitalized"), ("feedback", "rating")):
+        insert = _summary_upsert(source, "NEW.", f"WHERE {_is_student('NEW.')}")
+        delete = _summary_upsert(source, "OLD.", f"WHERE {_is_student('OLD.')}", sign="-1")
+        triggers[(f"summary_{source}_insert", f"AFTER INSERT ON {source}")] = [insert]
+        triggers[(f"summary_{source}_delete", f"AFTER DELETE ON {source}")] = [delete]
+        triggers[(f"summary_{source}_update",
+                  f"AFTER UPDATE OF student_id, {column} ON {source} "
+                  f"WHEN OLD.student_id IS NOT NEW.student_id OR OLD.{column} IS NOT NEW.{column}")] = [delete, insert]
+    return triggers
+
+# (trigger name, event) -> statements in the trigger body
+SUMMARY_TRIGGERS = _summary_triggers()
+
+def install_student_summaries(conn):
+    """Create the per-student summary table, its leaderboard indexes and the triggers that keep it current.
+
+    Every student gets a row holding the count, sum and mean of their
+    feedback ratings, their internship count and total MSMEs digitalized.
+    It is rebuilt once here; afterwards each feedback or internship
+    insert, delete or update adjusts its student's row in the writer's
+    own transaction, so log_feedback and log_internship keep it current.
+    """
+    conn.execute(f"""
+        CREATE TABLE IF NOT EXISTS student_summaries (
+            student_id INTEGER PRIMARY KEY,
+            org TEXT NOT NULL DEFAULT '{UNKNOWN_TAG}',
+            ratings INTEGER NOT NULL DEFAULT 0,
+            rating_sum INTEGER NOT NULL DEFAULT 0,
+            avg_rating REAL GENERATED ALWAYS AS (CASE WHEN ratings > 0 THEN 1.0 * rating_sum / ratings END),
+            internships INTEGER NOT NULL DEFAULT 0,
+            msmes_digitalized INTEGER NOT NULL DEFAULT 0
+        )
+    """)
+    # One global and one per-org index per metric, each in its leaderboard order.
+    for metric, (_, order) in LEADERBOARD_METRICS.items():
+        columns = ", ".join(order)
+        conn.execute(f"CREATE INDEX IF NOT EXISTS idx_student_summaries_{metric} ON student_summaries ({columns})")
+        conn.execute(f"CREATE INDEX IF NOT EXISTS idx_student_summaries_org_{metric} "
+                     f"ON student_summaries (org, {columns})")
+    for (name, event), statements in SUMMARY_TRIGGERS.items():
+        body = "".join(f"{statement};\n" for statement in statements)
+        conn.execute(f"CREATE TRIGGER IF NOT EXISTS {name} {event} BEGIN\n{body}END")
+    rebuild_student_summaries(conn)
+
+@instrumented
+def rebuild_student_summaries(conn=None):
+    """Recompute every student summary from the base tables; returns the number of rows."""
+    if conn is None:
+        with db_connection() as conn:
+            return _rebuild_student_summaries(conn)
+    return _rebuild_student_summaries(conn)
+
+def _rebuild_student_summaries(conn):
+    conn.execute("DELETE FROM student_summaries")
+    conn.execute(f"INSERT INTO student_summaries (student_id, org) "
+                 f"SELECT id, COALESCE(org, '{UNKNOWN_TAG}') FROM users WHERE role = 'student'")
+    for source in SUMMARY_SOURCES:
+        tail = f"FROM {source} WHERE {_is_student('')} GROUP BY student_id"
+        conn.execute(_summary_upsert(source, "", tail, aggregate=True))
+    _leaderboard_cache().clear()
+    return conn.execute("SELECT COUNT(*) FROM student_summaries").fetchone()[0]
+
+def _leaderboard_cache():
+    return get_cache("leaderboards", LEADERBOARD_CACHE_TTL, maxsize=256)
+
+def _leaderboard_source(metric, org):
+    """FROM clause walking ``metric``'s index, plus WHERE terms and params for the board's population.
+
+    The index is named because the planner otherwise prefers scanning
+    users, or the ratings index for the minimum-ratings filter, and sorts.
+    """
+    index = f"idx_student_summaries_{'org_' if org is not None else ''}{metric}"
+    where, params = [], []
+    if org is not None:
+        where.append("s.org = ?")
+        params.append(org)
+    if metric == "avg_rating":
+        where.append("s.ratings >= ?")
+        params.append(LEADERBOARD_MIN_RATINGS)
+    return f"student_summaries s INDEXED BY {index}", where, params
+
+@instrumented
+def fetch_leaderboard(metric="avg_rating", org=None, after=None, page_size=LEADERBOARD_PAGE_SIZE):
+    """Return one keyset page of students ranked by ``metric``, highest first, as ``(rows, next_after)``.
+
+    Rows are dicts with rank, id, name, email, org and the SUMMARY_COLUMNS;
+    pass ``next_after`` back for the following page (None on the last).
+    ``org`` limits the board to one college. Ranking by average rating
+    skips students with fewer than LEADERBOARD_MIN_RATINGS ratings. Each
+    page is one walk of the metric's index, cached for LEADERBOARD_CACHE_TTL.
+    """
+    if metric not in LEADERBOARD_METRICS:
+        raise ValueError(f"Unknown leaderboard metric {metric!r}")
+    key = (metric, org, tuple(after) if after else None, page_size)
+    page = _leaderboard_cache().get(key)
+    if page is not None:
+        return page
+    order = [f"s.{column}" for column in LEADERBOARD_METRICS[metric][1]] + ["s.student_id"]
+    source, where, params = _leaderboard_source(metric, org)
+    rank = 0
+    if after:
+        *position, rank = after
+        where.append(f"({', '.join(order)}) < ({', '.join('?' * len(order))})")
+        params += position
+    sql = (f"SELECT s.student_id, u.name, u.email, s.org, {', '.join(f's.{c}' for c in SUMMARY_COLUMNS)} "
+           f"FROM {source} CROSS JOIN users u ON u.id = s.student_id"
+           + (" WHERE " + " AND ".join(where) if where else "")
+           + f" ORDER BY {', '.join(f'{column} DESC' for column in order)} LIMIT ?")
+    params.append(page_size + 1)
+    try:
+        with snapshot_connection() as conn:
+            rows = conn.execute(sql, params).fetchall()
+    except sqlite3.Error:
+        return [], None
+    columns = ("id", "name", "email", "org", *SUMMARY_COLUMNS)
+    board = [dict(zip(columns, row), rank=rank + i + 1) for i, row in enumerate(rows[:page_size])]
+    next_after = None
+    if len(rows) > page_size:
+        last = board[-1]
+        next_after = (*(last[column] for column in LEADERBOARD_METRICS[metric][1]), last["id"], last["rank"])
+    page = (board, next_after)
+    _leaderboard_cache().set(key, page)
+    return page
+
+@instrumented
+def fetch_leaderboard_percentiles(metric="avg_rating", org=None, percentiles=LEADERBOARD_PERCENTILES):
+    """Value of ``metric`` at each percentile of the students on its leaderboard.
+
+    Returns ``{"students": n, 50: value, ...}``, read from the metric's
+    index with the same ``org`` and minimum-ratings rules as
+    fetch_leaderboard; ``{}`` when no student qualifies.
+    """
+    if metric not in LEADERBOARD_METRICS:
+        raise ValueError(f"Unknown leaderboard metric {metric!r}")
+    key = ("percentiles", metric, org, tuple(percentiles))
+    summary = _leaderboard_cache().get(key)
+    if summary is not None:
+        return summary
+    source, where, params = _leaderboard_source(metric, org)
+    table = source + (" WHERE " + " AND ".join(where) if where else "")
+    try:
+        with snapshot_connection() as conn:
+            n = conn.execute(f"SELECT COUNT(*) FROM {table}", params).fetchone()[0]
+            summary = {"students": n} if n else {}
+            for pct in percentiles if n else ():
+                offset = min(n - 1, round(pct / 100 * (n - 1)))
+                summary[pct] = conn.execute(f"SELECT s.{metric} FROM {table} ORDER BY s.{metric} LIMIT 1 OFFSET ?",
+                                            params + [offset]).fetchone()[0]
+    except sqlite3.Error:
+        return {}
+    _leaderboard_cache().set(key, summary)
+    return summary
+
+# --- Full-Text Search ---
+SEARCH_PAGE_SIZE = 20
+SEARCH_MAX_RESULTS = 500
+SEARCH_SNIPPET_TOKENS = 16
+SEARCH_CACHE_TTL = float(os.environ.get("KYRA_SEARCH_CACHE_TTL", "30"))
+
+# kind -> (base table, key column, indexed columns, bm25 column weights, title SQL);
+# each kind gets an external-content FTS5 table named <table>_fts.
+SEARCH_SOURCES = {
+    "projects": ("projects", "project_id", ("title", "description"), (4.0, 1.0), "title"),
+    "internships": ("internships", "internship_id", ("company_name", "feedback"), (2.0, 1.0), "company_name"),
+    "queries": ("queries", "query_id", ("prompt", "response"), (2.0, 1.0), "prompt"),
+}
+# Private kinds -> owner column; search_text only matches the caller's own rows of these.
+SEARCH_OWNERS = {"queries": "user_id"}
+
+def _search_triggers():
+    triggers = {}
+    for table, key, columns, _, _ in SEARCH_SOURCES.values():
+        fts = f"{table}_fts"
+        names = ", ".join(columns)
+        insert = f"INSERT INTO {fts} (rowid, {names}) VALUES (NEW.{key}, {', '.join('NEW.' + c for c in columns)});\n"
+        delete = (f"INSERT INTO {fts} ({fts}, rowid, {names}) "
+                  f"VALUES ('delete', OLD.{key}, {', '.join('OLD.' + c for c in columns)});\n")
+        triggers[(f"search_{table}_insert", f"AFTER INSERT ON {table}")] = insert
+        triggers[(f"search_{table}_delete", f"AFTER DELETE ON {table}")] = delete
+        triggers[(f"search_{table}_update", f"AFTER UPDATE OF {names} ON {table}")] = delete + insert
+    return triggers
+
+# (trigger name, event) -> trigger body
+SEARCH_TRIGGERS = _search_triggers()
+
+def install_search_index(conn):
+    """Create the FTS5 indexes and their sync triggers, then backfill them."""
+    for table, key, columns, _, _ in SEARCH_SOURCES.values():
+        conn.execute(f"""
+            CREATE VIRTUAL TABLE IF NOT EXISTS {table}_fts USING fts5(
+                {', '.join(columns)}, content='{table}', content_rowid='{key}',
+                tokenize='unicode61 remove_diacritics 2', prefix='2 3'
+            )
+        """)
+    for (name, event), body in SEARCH_TRIGGERS.items():
+        conn.execute(f"CREATE TRIGGER IF NOT EXISTS {name} {event} BEGIN\n{body}END")
+    rebuild_search_index(conn)
+
+@instrumented
+def rebuild_search_index(conn=None):
+    """Re-read every indexed row from the base tables and optimize the indexes."""
+    if conn is None:
+        with db_connection() as conn:
+            return _rebuild_search_index(conn)
+    return _rebuild_search_index(conn)
+
+def _rebuild_search_index(conn):
+    counts = {}
+    for kind, (table, _, _, _, _) in SEARCH_SOURCES.items():
+        conn.execute(f"INSERT INTO {table}_fts ({table}_fts) VALUES ('rebuild')")
+        conn.execute(f"INSERT INTO {table}_fts ({table}_fts) VALUES ('optimize')")
+        counts[kind] = conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+    return counts
+
+def fts_query(text):
+    """Turn free text into an FTS5 query: every word must match, the last one as a prefix.
+
+    Words are quoted, so FTS5 operators and punctuation typed by users are
+    treated as plain text. Returns '' if ``text`` has no searchable words.
+    """
+    words = re.findall(r"\w+", text.lower())
+    if not words:
+        return ""
+    return " ".join(f'"{word}"' for word in words) + "*"
+
+def _search_cache():
+    return get_cache("search", SEARCH_CACHE_TTL, maxsize=256)
+
+@instrumented
+def search_text(text, kinds=None, offset=0, page_size=SEARCH_PAGE_SIZE, owner_id=None):
+    """Ranked full-text search; returns ``(results, next_offset)``.
+
+    Each result is a dict with ``kind``, ``id``, ``title``, ``snippet`` (hits
+    wrapped in ``**``) and ``score`` (bm25; lower is better). ``kinds``
+    restricts the search to some SEARCH_SOURCES. ``next_offset`` is None on
+    the last page. With ``owner_id`` the SEARCH_OWNERS kinds only match that
+    user's rows; without it they match everyone's, which is for admins and
+    command-line tools only.
+
+    The best SEARCH_MAX_RESULTS matches are ranked once and cached, so
+    paging only builds snippets for the rows on the requested page.
+    """
+    query = fts_query(text)
+    if not query:
+        return [], None
+    kinds = tuple(kinds or SEARCH_SOURCES)
+    try:
+        with db_connection(readonly=True) as conn:
+            ranked = _search_cache().get((query, kinds, owner_id))
+            if ranked is None:
+                selects, params = [], []
+                for kind in kinds:
+                    table, key, _, weights, _ = SEARCH_SOURCES[kind]
+                    select = (f"SELECT '{kind}' AS kind, rowid AS id, "
+                              f"bm25({table}_fts, {', '.join(map(str, weights))}) AS score "
+                              f"FROM {table}_fts WHERE {table}_fts MATCH ?")
+                    params.append(query)
+                    if kind in SEARCH_OWNERS and owner_id is not None:
+                        select += f" AND rowid IN (SELECT {key} FROM {table} WHERE {SEARCH_OWNERS[kind]} = ?)"
+                        params.append(owner_id)
+                    selects.append(select)
+                ranked = conn.execute(" UNION ALL ".join(selects) + " ORDER BY score LIMIT ?",
+                                      params + [SEARCH_MAX_RESULTS]).fetchall()
+                _search_cache().set((query, kinds, owner_id), ranked)
+            page = ranked[offset:offset + page_size]
+            details = {}
+            for kind in {kind for kind, _, _ in page}:
+                table, key, _, _, title = SEARCH_SOURCES[kind]
+                ids = [row_id for row_kind, row_id, _ in page if row_kind == kind]
+                details.update(((kind, row_id), (row_title, snippet)) for row_id, row_title, snippet in conn.execute(f"""
+                    SELECT {table}_fts.rowid, t.{title}, snippet({table}_fts, -1, '**', '**', '…', {SEARCH_SNIPPET_TOKENS})
+                    FROM {table}_fts JOIN {table} t ON t.{key} = {table}_fts.rowid
+                    WHERE {table}_fts MATCH ? AND {table}_fts.rowid IN ({', '.join('?' * len(ids))})
+                """, [query] + ids))
+    except sqlite3.Error:
+        return [], None
+    # Rows deleted since the ranking was cached have no details and are skipped.
+    results = [{"kind": kind, "id": row_id, "title": details[kind, row_id][0],
+                "snippet": details[kind, row_id][1], "score": score}
+               for kind, row_id, score in page if (kind, row_id) in details]
+    return results, offset + page_size if len(ranked) > offset + page_size else None
+
+# --- Write-Behind Group Commit ---
+WRITE_BEHIND = os.environ.get("KYRA_WRITE_BEHIND", "0") == "1"
+WRITE_BEHIND_INTERVAL_MS = int(os.environ.get("KYRA_WRITE_BEHIND_INTERVAL_MS", "50"))
+WRITE_BEHIND_BATCH_ROWS = int(os.environ.get("KYRA_WRITE_BEHIND_BATCH_ROWS", "500"))
+WRITE_BEHIND_QUEUE_SIZE = int(os.environ.get("KYRA_WRITE_BEHIND_QUEUE_SIZE", "10000"))
+WRITE_BEHIND_RETRIES = int(os.environ.get("KYRA_WRITE_BEHIND_RETRIES", "3"))
+# Errors worth another attempt in a later batch: lock waits that outlasted busy_timeout.
+TRANSIENT_WRITE_ERRORS = ("database is locked", "database table is locked", "pool exhausted")
+
+_STOP = object()
+logger = logging.getLogger(__name__)
+
+class GroupCommitWriter:
+    """Background thread that commits queued INSERTs in batches.
+
+    A batch closes after ``batch_rows`` statements or ``interval_ms`` after its
+    first statement, whichever comes first, and is written in one transaction
+    (one fsync). If a batch fails, its statements are retried one by one so a
+    single bad row cannot drop the rest. A row that still hits a lock timeout
+    is re-queued for a later batch, up to WRITE_BEHIND_RETRIES times; rows
+    that fail for good are logged with their error and counted.
+    """
+
+    def __init__(self, interval_ms=WRITE_BEHIND_INTERVAL_MS, batch_rows=WRITE_BEHIND_BATCH_ROWS,
+                 queue_size=WRITE_BEHIND_QUEUE_SIZE):
+        self.interval = interval_ms / 1000
+        self.batch_rows = batch_rows
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._lock = threading.Lock()
+        self._closed = False
+        self._stats = {"batches": 0, "rows": 0, "failed_rows": 0, "requeued_rows": 0, "last_batch_size": 0,
+                       "max_batch_size": 0, "sync_fallbacks": 0}
+        self._thread = threading.Thread(target=self._run, name="kyra-group-commit", daemon=True)
+        self._thread.start()
+
+    def submit(self, sql, params, on_commit=None):
+        """Queue one write. Returns False if the caller must write synchronously.
+
+        ``on_commit`` is called from the writer thread once the row is committed.
+        """
+        with self._lock:
+            if not self._closed:
+                try:
+                    self._queue.put_nowait((sql, params, on_commit, 0))
+                    return True
+                except queue.Full:
+                    pass
+            self._stats["sync_fallbacks"] += 1
+            return False
+
+    def flush(self):
+        """Block until every write queued so far has been committed."""
+        self._queue.join()
+
+    def close(self):
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+        self._queue.put(_STOP)
+        self._thread.join()
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+        stats["queue_depth"] = self._queue.qsize()
+        stats["mean_batch_size"] = stats["rows"] / stats["batches"] if stats["batches"] else 0
+        return stats
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            batch = []
+            deadline = time.monotonic() + self.interval
+            while item is not _STOP:
+                batch.append(item)
+                remaining = deadline - time.monotonic()
+                if len(batch) >= self.batch_rows or remaining <= 0:
+                    item = None
+                    break
+                try:
+                    item = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    item = None
+                    break
+            if batch:
+                self._commit(batch)
+                for _ in batch:
+                    self._queue.task_done()
+            if item is _STOP:
+                self._queue.task_done()
+                return
+
+    def _commit(self, batch):
+        with perf_section("group_commit"):
+            self._commit_batch(batch)
+
+    def _commit_batch(self, batch):
+        committed, requeued, failed = [], 0, 0
+        try:
+            with db_connection() as conn:
+                for sql, params, _, _ in batch:
+                    conn.execute(sql, params)
+            committed = batch
+        except sqlite3.Error:
+            for item in batch:
+                try:
+                    with db_connection() as conn:
+                        conn.execute(item[0], item[1])
+                    committed.append(item)
+                except sqlite3.Error as e:
+                    if self._requeue(item, e):
+                        requeued += 1
+                    else:
+                        failed += 1
+                        logger.error("Dropped write-behind row after %d attempts (%s): %s %r",
+                                     item[3] + 1, e, item[0].strip(), item[1])
+        _metrics_cache().clear()
+        for _, _, on_commit, _ in committed:
+            if on_commit is not None:
+                on_commit()
+        with self._lock:
+            self._stats["batches"] += 1
+            self._stats["rows"] += len(committed)
+            self._stats["failed_rows"] += failed
+            self._stats["requeued_rows"] += requeued
+            self._stats["last_batch_size"] = len(batch)
+            self._stats["max_batch_size"] = max(self._stats["max_batch_size"], len(batch))
+
+    def _requeue(self, item, error):
+        """Queue ``item`` again for a transient ``error``; False if it must be dropped."""
+        sql, params, on_commit, attempts = item
+        if attempts >= WRITE_BEHIND_RETRIES or not any(t in str(error) for t in TRANSIENT_WRITE_ERRORS):
+            return False
+        with self._lock:
+            if self._closed:
+                return False
+            try:
+                self._queue.put_nowait((sql, params, on_commit, attempts + 1))
+            except queue.Full:
+                return False
+        return True
+
+@process_resource
+def get_writer():
+    """Return the process-wide group-commit writer, or None when write-behind is off."""
+    if not WRITE_BEHIND:
+        return None
+    writer = GroupCommitWriter()
+    atexit.register(writer.close)
+    return writer
+
+def _execute_write(sql, params, sync=True, on_commit=None):
+    writer = get_writer()
+    if sync or writer is None or not writer.submit(sql, params, on_commit):
+        with db_connection() as conn:
+            conn.execute(sql, params)
+        if on_commit is not None:
+            on_commit()
+
+# --- Helper Functions ---
+HISTORY_PAGE_SIZE = 10
+PROFILE_CACHE_TTL = float(os.environ.get("KYRA_PROFILE_CACHE_TTL", "300"))
+
+def _profile_cache():
+    return get_cache("profiles", PROFILE_CACHE_TTL, maxsize=4096)
+
+def invalidate_user_cache(user_id):
+    """Drop every cached history page for ``user_id``; called by the log_* writers."""
+    if user_id is not None:
+        _profile_cache().pop(user_id)
+
+USER_COLUMNS = ("id", "name", "email", "role", "org")
+# New users bind 4 parameters each; keeps a chunk well under SQLite's variable limit.
+USER_RESOLVE_CHUNK = 500
+
+def _resolve_users(conn, emails, role, org, create):
+    """``{email: user row}`` for ``emails`` on ``conn``, inserting the missing ones if ``create``.
+
+    Known emails cost one SELECT per chunk and new ones one
+    ``INSERT ... ON CONFLICT DO NOTHING RETURNING``. An email another
+    connection inserted since the SELECT returns nothing from the INSERT
+    and is re-read, so concurrent first logins never hit the UNIQUE
+    constraint.
+    """
+    columns = ", ".join(USER_COLUMNS)
+    users = {}
+    for start in range(0, len(emails), USER_RESOLVE_CHUNK):
+        chunk = emails[start:start + USER_RESOLVE_CHUNK]
+        users.update((row[2], row) for row in conn.execute(
+            f"SELECT {columns} FROM users WHERE email IN ({', '.join('?' * len(chunk))})", chunk))
+        missing = [email for email in chunk if email not in users]
+        if not create or not missing:
+            continue
+        params = [value for email in missing for value in (email.split("@")[0].capitalize(), email, role, org)]
+        users.update((row[2], row) for row in conn.execute(f"""
+            INSERT INTO users (name, email, role, org) VALUES {', '.join(['(?, ?, ?, ?)'] * len(missing))}
+            ON CONFLICT (email) DO NOTHING RETURNING {columns}
+        """, params).fetchall())
+        lost = [email for email in missing if email not in users]
+        if lost:
+            users.update((row[2], row) for row in conn.execute(
+                f"SELECT {columns} FROM users WHERE email IN ({', '.join('?' * len(lost))})", lost))
+    return users
+
+@instrumented
+def resolve_users(emails, role="student", org=UNKNOWN_TAG, create=True):
+    """Batched user lookup as ``{email: user dict}``, creating unknown emails if ``create``.
+
+    New users get ``role``, ``org`` and a name derived from the email.
+    Everything happens in one transaction; emails that are unknown with
+    ``create=False`` (or on a database error) are missing from the result.
+    """
+    emails = list(dict.fromkeys(emails))
+    try:
+        with db_connection(readonly=not create) as conn:
+            users = _resolve_users(conn, emails, role, org, create)
+    except sqlite3.Error:
+        return {}
+    return {email: dict(zip(USER_COLUMNS, row)) for email, row in users.items()}
+
+def resolve_user(email, role="student", org=UNKNOWN_TAG, create=True):
+    """The user for ``email`` as a dict, created on first login if ``create``; None if unknown."""
+    return resolve_users([email], role, org, create).get(email)
+
+@instrumented
+def fetch_user_data(email):
+    """Return the user row as a dict, or None. History is loaded separately."""
+    return resolve_user(email, create=False)
+
+# kind -> (keyset page query, column names); the first column is the cursor.
+USER_HISTORY_QUERIES = {
+    "internships": (
+        """SELECT internship_id, company_name, duration, feedback, msme_digitalized FROM internships
+           WHERE student_id = ? AND internship_id > ? ORDER BY internship_id LIMIT ?""",
+        ("internship_id", "company_name", "duration", "feedback", "msme_digitalized"),
+    ),
+    "projects": (
+        """SELECT project_id, title, description, status FROM projects
+           WHERE student_id = ? AND project_id > ? ORDER BY project_id LIMIT ?""",
+        ("project_id", "title", "description", "status"),
+    ),
+}
+
+def _fetch_user_history(kind, user_id, after_id, page_size):
+    cache = _profile_cache()
+    pages = cache.get(user_id)
+    if pages is None:
+        pages = {}
+        cache.set(user_id, pages)
+    key = (kind, after_id, page_size)
+    if key not in pages:
+        sql, columns = USER_HISTORY_QUERIES[kind]
+        with db_connection(readonly=True) as conn:
+            rows = conn.execute(sql, (user_id, after_id, page_size + 1)).fetchall()
+        next_after_id = rows[page_size - 1][0] if len(rows) > page_size else None
+        pages[key] = ([dict(zip(columns, row)) for row in rows[:page_size]], next_after_id)
+    return pages[key]
+
+@instrumented
+def fetch_user_internships(user_id, after_id=0, page_size=HISTORY_PAGE_SIZE):
+    """Return one keyset page of a student's internships as ``(rows, next_after_id)``."""
+    return _fetch_user_history("internships", user_id, after_id, page_size)
+
+@instrumented
+def fetch_user_projects(user_id, after_id=0, page_size=HISTORY_PAGE_SIZE):
+    """Return one keyset page of a student's projects as ``(rows, next_after_id)``."""
+    return _fetch_user_history("projects", user_id, after_id, page_size)
+
+@instrumented
+def log_internship(email, company, duration, feedback, msme_digitalized):
+    try:
+        with db_connection() as conn:
+            user_id = _resolve_users(conn, [email], "student", UNKNOWN_TAG, create=True)[email][0]
+            conn.execute("""
+                INSERT INTO internships (student_id, company_name, duration, feedback, msme_digitalized)
+                VALUES (?, ?, ?, ?, ?)
+            """, (user_id, company, duration, feedback, msme_digitalized))
+        invalidate_user_cache(user_id)
+        _metrics_cache().clear()
+        return True
+    except sqlite3.Error:
+        return False
+
+@instrumented
+def log_project(student_id, title, description, status, sync=False):
+    try:
+        _execute_write("INSERT INTO projects (student_id, title, description, status) VALUES (?, ?, ?, ?)",
+                       (student_id, title, description, status), sync,
+                       on_commit=lambda: invalidate_user_cache(student_id))
+        _metrics_cache().clear()
+        return True
+    except sqlite3.Error:
+        return False
+
+@instrumented
+def log_query(user_id, prompt, response, latency_ms=None, cache_hit=False, sync=False):
+    try:
+        _execute_write("""
+            INSERT INTO queries (user_id, prompt, response, timestamp, latency_ms, cache_hit)
+            VALUES (?, ?, ?, ?, ?, ?)
+        """, (user_id, prompt, response, datetime.utcnow().isoformat(), latency_ms, int(cache_hit)), sync)
+        return True
+    except sqlite3.Error:
+        return False
+
+@instrumented
+def fetch_metrics(role):
+    metrics = _metrics_cache().get(role)
+    if metrics is None:
+        try:
+            with snapshot_connection() as conn:
+                rows = conn.execute("SELECT metric_name, value FROM metrics WHERE role = ? ORDER BY metric_id",
+                                    (role,)).fetchall()
+        except sqlite3.Error:
+            return {}
+        metrics = dict(rows)
+        _metrics_cache().set(role, metrics)
+    return dict(metrics)
+
+STUDENT_PAGE_SIZE = 25
+STUDENT_PAGE_CACHE_TTL = float(os.environ.get("KYRA_STUDENT_PAGE_CACHE_TTL", "30"))
+
+def _student_page_cache():
+    return get_cache("student_pages", STUDENT_PAGE_CACHE_TTL, maxsize=256)
+
+@instrumented
+def fetch_students_page(search="", after_id=0, page_size=STUDENT_PAGE_SIZE):
+    """Return one keyset page of students as ``(rows, next_after_id)``.
+
+    Rows are ``(id, name, email, org)`` ordered by id; ``next_after_id`` is
+    None on the last page. ``search`` matches name, email or org.
+    """
+    search = search.strip()
+    key = (search.lower(), after_id, page_size)
+    page = _student_page_cache().get(key)
+    if page is not None:
+        return page
+    sql = "SELECT id, name, email, org FROM users WHERE role = 'student' AND id > ?"
+    params = [after_id]
+    if search:
+        pattern = "%" + search.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"
+        sql += " AND (name LIKE ? ESCAPE '\\' OR email LIKE ? ESCAPE '\\' OR org LIKE ? ESCAPE '\\')"
+        params += [pattern] * 3
+    sql += " ORDER BY id LIMIT ?"
+    params.append(page_size + 1)
+    try:
+        with snapshot_connection() as conn:
+            rows = conn.execute(sql, params).fetchall()
+    except sqlite3.Error:
+        return [], None
+    next_after_id = rows[page_size - 1][0] if len(rows) > page_size else None
+    page = (rows[:page_size], next_after_id)
+    _student_page_cache().set(key, page)
+    return page
+
+@instrumented
+def log_feedback(student_id, rating, comments, sync=False):
+    try:
+        _execute_write("INSERT INTO feedback (student_id, rating, comments) VALUES (?, ?, ?)",
+                       (student_id, rating, comments), sync)
+        _metrics_cache().clear()
+        return True
+    except sqlite3.Error:
+        return False
+
+# --- Matching Engine ---
+MATCH_DIMS = int(os.environ.get("KYRA_MATCH_DIMS", "256"))
+MATCH_TOP_K = 5
+MATCH_REFRESH_FRACTION = 0.1
+MATCH_CATCH_UP_ROWS = 50000
+OPEN_PROJECT_PAGE_SIZE = 10
+MATCH_STOPWORDS = frozenset(
+    "a an and are as at be by for from has have i in is it my of on or our the this to we with you your".split())
+
+class _HashedRows:
+    """Growable float32 matrix of hashed term counts, one row per id."""
+
+    def __init__(self, dims):
+        import numpy as np
+        self.tf = np.zeros((0, dims), dtype=np.float32)
+        self.scale = np.zeros(0, dtype=np.float32)
+        self.ids = np.zeros(0, dtype=np.int64)
+        self.row_of = {}
+
+    def __len__(self):
+        return len(self.row_of)
+
+    def rows(self, ids):
+        import numpy as np
+        rows = np.empty(len(ids), dtype=np.int64)
+        for i, id_ in enumerate(ids):
+            row = self.row_of.get(id_)
+            if row is None:
+                row = self.row_of[id_] = len(self.row_of)
+                if row >= len(self.ids):
+                    capacity = max(1024, 2 * len(self.ids))
+                    self.tf = np.resize(self.tf, (capacity, self.tf.shape[1]))
+                    self.tf[row:] = 0
+                    self.scale = np.resize(self.scale, capacity)
+                    self.scale[row:] = 0
+                    self.ids = np.resize(self.ids, capacity)
+                self.ids[row] = id_
+            rows[i] = row
+        return rows
+
+    def add(self, ids, hashed):
+        """Add hashed texts (see MatchIndex._hash) to the rows of ``ids``; returns the touched rows."""
+        import numpy as np
+        text_rows, buckets, signs = hashed
+        rows = self.rows(ids)
+        np.add.at(self.tf, (rows[text_rows], buckets), signs)
+        return np.unique(rows)
+
+    def remove(self, id_):
+        row = self.row_of.get(id_)
+        if row is not None:
+            self.tf[row] = 0
+            self.scale[row] = 0
+
+    def rescale(self, idf, rows=None):
+        """Recompute 1 / ||tf * idf|| for ``rows`` (default: all)."""
+        import numpy as np
+        rows = slice(0, len(self)) if rows is None else rows
+        norms = np.sqrt(np.square(self.tf[rows] * idf).sum(axis=1))
+        self.scale[rows] = np.divide(1.0, norms, out=np.zeros_like(norms), where=norms > 0)
+
+    def top_k(self, queries, k):
+        """Top-k rows by ``tf @ query * scale`` for each query row; returns (rows, scores) per query."""
+        import numpy as np
+        n = len(self)
+        if not n:
+            return [(np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float32))] * len(queries)
+        scores = self.tf[:n] @ queries.T
+        scores *= self.scale[:n, None]
+        k = min(k, n)
+        best = np.argpartition(-scores, k - 1, axis=0)[:k]
+        results = []
+        for j in range(len(queries)):
+            rows = best[:, j][np.argsort(-scores[best[:, j], j])]
+            rows = rows[scores[rows, j] > 0]
+            results.append((rows, scores[rows, j]))
+        return results
+
+class MatchIndex:
+    """Hashed TF-IDF vectors for student histories and open projects.
+
+    Words are feature-hashed into ``dims`` signed buckets and summed per
+    student (internships and assigned projects) and per open project in
+    NumPy arrays. IDF is folded into the query side plus a per-row scale,
+    so ranking a batch of projects against every student is one matrix
+    product and an argpartition. Before each query, rows added since the
+    last one are read by id high-water mark; nothing is rescanned.
+    """
+
+    def __init__(self, dims=MATCH_DIMS):
+        self.dims = dims
+        self.students = _HashedRows(dims)
+        self.projects = _HashedRows(dims)
+        self.idf = None
+        self._buckets = {}
+        self._marks = {"internships": 0, "projects": 0}
+        self._changed = 0
+        self._lock = threading.RLock()
+
+    def _hash(self, texts):
+        """Tokenize ``texts`` into parallel (text index, bucket, sign) arrays."""
+        import numpy as np
+        text_rows, buckets, signs = [], [], []
+        for i, text in enumerate(texts):
+            for word in re.findall(r"[a-z][a-z0-9]+", (text or "").lower()):
+                if word in MATCH_STOPWORDS:
+                    continue
+                hashed = self._buckets.get(word)
+                if hashed is None:
+                    h = zlib.crc32(word.encode())
+                    hashed = self._buckets[word] = (h % self.dims, 1.0 if h & 0x80000000 else -1.0)
+                text_rows.append(i)
+                buckets.append(hashed[0])
+                signs.append(hashed[1])
+        return (np.array(text_rows, dtype=np.int64), np.array(buckets, dtype=np.int64),
+                np.array(signs, dtype=np.float32))
+
+    def _add(self, target, ids, texts):
+        rows = target.add(ids, self._hash(texts))
+        if self.idf is not None:
+            target.rescale(self.idf, rows)
+        self._changed += len(rows)
+
+    def _refresh_idf(self):
+        import numpy as np
+        total = len(self.students) + len(self.projects)
+        df = ((self.students.tf[:len(self.students)] != 0).sum(axis=0)
+              + (self.projects.tf[:len(self.projects)] != 0).sum(axis=0))
+        self.idf = (np.log((1 + total) / (1 + df)) + 1).astype(np.float32)
+        self.students.rescale(self.idf)
+        self.projects.rescale(self.idf)
+        self._changed = 0
+
+    def catch_up(self, conn):
+        """Index internships and projects inserted since the last call."""
+        with self._lock:
+            cur = conn.execute("""
+                SELECT internship_id, student_id, company_name || ' ' || COALESCE(feedback, '')
+                FROM internships WHERE internship_id > ? ORDER BY internship_id
+            """, (self._marks["internships"],))
+            while rows := cur.fetchmany(MATCH_CATCH_UP_ROWS):
+                owned = [r for r in rows if r[1] is not None]
+                self._add(self.students, [r[1] for r in owned], [r[2] for r in owned])
+                self._marks["internships"] = rows[-1][0]
+            cur = conn.execute("""
+                SELECT project_id, student_id, status, title || ' ' || COALESCE(description, '')
+                FROM projects WHERE project_id > ? ORDER BY project_id
+            """, (self._marks["projects"],))
+            while rows := cur.fetchmany(MATCH_CATCH_UP_ROWS):
+                owned = [r for r in rows if r[1] is not None]
+                open_ = [r for r in rows if r[1] is None and r[2] == "Open"]
+                self._add(self.students, [r[1] for r in owned], [r[3] for r in owned])
+                self._add(self.projects, [r[0] for r in open_], [r[3] for r in open_])
+                self._marks["projects"] = rows[-1][0]
+            if self.idf is None or self._changed > MATCH_REFRESH_FRACTION * (len(self.students) + len(self.projects)):
+                self._refresh_idf()
+
+    def _queries(self, source, ids):
+        import numpy as np
+        # Stored rows hold raw counts, so both sides' idf weights go on the query.
+        rows = [source.row_of[i] for i in ids if i in source.row_of]
+        queries = source.tf[rows] * np.square(self.idf) * source.scale[rows, None]
+        return [i for i in ids if i in source.row_of], queries
+
+    def students_for(self, project_ids, k):
+        """{project_id: [(student_id, score), ...]} for the indexed open projects among ``project_ids``."""
+        with self._lock:
+            ids, queries = self._queries(self.projects, project_ids)
+            ranked = self.students.top_k(queries, k)
+            return {pid: list(zip(self.students.ids[rows].tolist(), scores.tolist()))
+                    for pid, (rows, scores) in zip(ids, ranked)}
+
+    def projects_for(self, student_id, k):
+        """[(project_id, score), ...] of open projects for one student."""
+        with self._lock:
+            ids, queries = self._queries(self.students, [student_id])
+            if not ids:
+                return []
+            rows, scores = self.projects.top_k(queries, k)[0]
+            return list(zip(self.projects.ids[rows].tolist(), scores.tolist()))
+
+    def close_project(self, project_id, student_id=None, text=""):
+        """Drop a project from the open set, crediting its text to ``student_id`` if given."""
+        with self._lock:
+            self.projects.remove(project_id)
+            # Projects past the high-water mark are credited when catch_up reads them.
+            if student_id is not None and project_id <= self._marks["projects"]:
+                self._add(self.students, [student_id], [text])
+
+@process_resource
+def get_match_index():
+    return MatchIndex()
+
+def _caught_up_index(conn):
+    index = get_match_index()
+    index.catch_up(conn)
+    return index
+
+@instrumented
+def match_students(project_ids, k=MATCH_TOP_K):
+    """Top-``k`` students for each open project, ranked in one batched matrix product.
+
+    Returns ``{project_id: [{"student_id", "name", "email", "org", "score"}, ...]}``.
+    """
+    try:
+        with db_connection(readonly=True) as conn:
+            matches = _caught_up_index(conn).students_for(list(project_ids), k)
+            student_ids = sorted({sid for ranked in matches.values() for sid, _ in ranked})
+            users = {row[0]: row for row in conn.execute(
+                f"SELECT id, name, email, org FROM users WHERE id IN ({', '.join('?' * len(student_ids))})", student_ids)}
+    except sqlite3.Error:
+        return {}
+    return {pid: [dict(zip(("student_id", "name", "email", "org"), users[sid]), score=score)
+                  for sid, score in ranked if sid in users]
+            for pid, ranked in matches.items()}
+
+@instrumented
+def match_projects(student_id, k=MATCH_TOP_K):
+    """Top-``k`` open projects for a student's history as dicts with ``project_id``, ``title``, ``description``, ``score``."""
+    try:
+        with db_connection(readonly=True) as conn:
+            index = _caught_up_index(conn)
+            # Over-fetch: projects closed by another process are only dropped when seen here.
+            ranked = index.projects_for(student_id, 2 * k)
+            ids = [pid for pid, _ in ranked]
+            projects = {row[0]: row for row in conn.execute(f"""
+                SELECT project_id, title, description FROM projects
+                WHERE project_id IN ({', '.join('?' * len(ids))}) AND student_id IS NULL AND status = 'Open'
+            """, ids)}
+    except sqlite3.Error:
+        return []
+    for pid in set(ids) - set(projects):
+        index.close_project(pid)
+    return [dict(zip(("project_id", "title", "description"), projects[pid]), score=score)
+            for pid, score in ranked if pid in projects][:k]
+
+def fetch_open_projects_page(after_id=0, page_size=OPEN_PROJECT_PAGE_SIZE):
+    """One keyset page of unassigned open projects as ``(rows, next_after_id)``; rows are ``(id, title, description)``."""
+    try:
+        with db_connection(readonly=True) as conn:
+            rows = conn.execute("""
+                SELECT project_id, title, description FROM projects
+                WHERE student_id IS NULL AND status = 'Open' AND project_id > ?
+                ORDER BY project_id LIMIT ?
+            """, (after_id, page_size + 1)).fetchall()
+    except sqlite3.Error:
+        return [], None
+    return rows[:page_size], rows[page_size - 1][0] if len(rows) > page_size else None
+
+@instrumented
+def assign_project(project_id, student_id):
+    """Assign an open project to a student; False if it was already taken."""
+    try:
+        with db_connection() as conn:
+            cur = conn.execute("UPDATE projects SET student_id = ?, status = 'Assigned' WHERE project_id = ? AND student_id IS NULL",
+                               (student_id, project_id))
+            if not cur.rowcount:
+                return False
+            text = conn.execute("SELECT title || ' ' || COALESCE(description, '') FROM projects WHERE project_id = ?",
+                                (project_id,)).fetchone()[0]
+    except sqlite3.Error:
+        return False
+    get_match_index().close_project(project_id, student_id, text)
+    invalidate_user_cache(student_id)
+    _metrics_cache().clear()
+    return True
+
+# --- Query Retention ---
+QUERY_RETENTION_DAYS = int(os.environ.get("KYRA_QUERY_RETENTION_DAYS", "90"))
+ARCHIVE_DIR = os.environ.get("KYRA_ARCHIVE_DIR", os.path.splitext(DB_PATH)[0] + "_archive")
+ARCHIVE_BATCH_ROWS = 5000
+ARCHIVE_COMPRESS_LEVEL = 6
+QUERY_HISTORY_PAGE_SIZE = 20
+QUERY_COLUMNS = ("query_id", "user_id", "prompt", "response", "timestamp", "latency_ms", "cache_hit")
+
+# Archive files hold the same columns with ``response`` as a zlib-compressed BLOB.
+ARCHIVE_SCHEMA = [
+    """CREATE TABLE IF NOT EXISTS archive.queries (
+        query_id INTEGER PRIMARY KEY, user_id INTEGER, prompt TEXT, response BLOB,
+        timestamp TEXT, latency_ms REAL, cache_hit INTEGER
+    )""",
+    "CREATE INDEX IF NOT EXISTS archive.idx_queries_user_timestamp ON queries (user_id, timestamp)",
+    "CREATE INDEX IF NOT EXISTS archive.idx_queries_timestamp ON queries (timestamp)",
+]
+
+def archive_path(month):
+    return os.path.join(ARCHIVE_DIR, f"queries_{month}.db")
+
+def archived_months():
+    """Months (``YYYY-MM``) that have an archive file, newest first."""
+    try:
+        names = os.listdir(ARCHIVE_DIR)
+    except FileNotFoundError:
+        return []
+    return sorted((m.group(1) for m in map(re.compile(r"queries_(\d{4}-\d{2})\.db").fullmatch, names) if m),
+                  reverse=True)
+
+def _next_month(month):
+    year, mon = map(int, month.split("-"))
+    return f"{year + mon // 12:04d}-{mon % 12 + 1:02d}"
+
+def _compress(text):
+    return None if text is None else zlib.compress(text.encode(), ARCHIVE_COMPRESS_LEVEL)
+
+def _decompress(blob):
+    return None if blob is None else zlib.decompress(blob).decode()
+
+@contextmanager
+def _attached(conn, path):
+    """ATTACH ``path`` as ``archive`` for the duration of the block."""
+    conn.execute("ATTACH DATABASE ? AS archive", (path,))
+    try:
+        yield conn
+    finally:
+        if conn.in_transaction:
+            conn.rollback()
+        conn.execute("DETACH DATABASE archive")
+
+@instrumented
+def archive_queries(older_than_days=None, batch_rows=ARCHIVE_BATCH_ROWS, vacuum=False):
+    """Move queries older than ``older_than_days`` (default QUERY_RETENTION_DAYS) to monthly archives.
+
+    Rows go to ``ARCHIVE_DIR/queries_YYYY-MM.db`` by timestamp month with
+    responses zlib-compressed, ``batch_rows`` per transaction so live
+    writers are never blocked for long. Copies use INSERT OR IGNORE, so a
+    run interrupted between the archive and hot-file commits is finished
+    by the next one. ``vacuum`` shrinks the hot file afterwards. Returns
+    ``{month: rows moved}``.
+    """
+    days = QUERY_RETENTION_DAYS if older_than_days is None else older_than_days
+    cutoff = (datetime.utcnow() - timedelta(days=days)).isoformat()
+    # Rows without a YYYY-MM timestamp stay hot rather than land in a bogus archive.
+    dated = "timestamp GLOB '[0-9][0-9][0-9][0-9]-[0-9][0-9]*'"
+    moved = {}
+    os.makedirs(ARCHIVE_DIR, exist_ok=True)
+    with db_connection() as conn:
+        conn.create_function("kyra_compress", 1, _compress, deterministic=True)
+        while True:
+            oldest = conn.execute(f"SELECT MIN(timestamp) FROM queries WHERE timestamp < ? AND {dated}",
+                                  (cutoff,)).fetchone()[0]
+            if oldest is None:
+                break
+            month = oldest[:7]
+            end = min(cutoff, _next_month(month))
+            with _attached(conn, archive_path(month)):
+                for statement in ARCHIVE_SCHEMA:
+                    conn.execute(statement)
+                while True:
+                    conn.execute("BEGIN IMMEDIATE")
+                    ids = [row[0] for row in conn.execute(
+                        f"SELECT query_id FROM main.queries WHERE timestamp < ? AND {dated} LIMIT ?", (end, batch_rows))]
+                    if not ids:
+                        conn.rollback()
+                        break
+                    marks = ", ".join("?" * len(ids))
+                    conn.execute(f"""
+                        INSERT OR IGNORE INTO archive.queries ({', '.join(QUERY_COLUMNS)})
+                        SELECT query_id, user_id, prompt, kyra_compress(response), timestamp, latency_ms, cache_hit
+                        FROM main.queries WHERE query_id IN ({marks})
+                    """, ids)
+                    conn.execute(f"DELETE FROM main.queries WHERE query_id IN ({marks})", ids)
+                    conn.commit()
+                    moved[month] = moved.get(month, 0) + len(ids)
+        if vacuum:
+            conn.execute("VACUUM")
+    return moved
+
+@instrumented
+def fetch_query_history(user_id=None, start=None, end=None, before=None, page_size=QUERY_HISTORY_PAGE_SIZE):
+    """Newest-first page of Ky'ra queries spanning the hot table and the monthly archives.
+
+    Returns ``(rows, next_before)``: rows are dicts of QUERY_COLUMNS plus
+    ``archived``, and ``next_before`` is the ``(timestamp, query_id)``
+    cursor of the next page, or None. ``start`` (inclusive) and ``end``
+    (exclusive) are ISO dates. Archives are attached one month at a time,
+    newest first, only until the page is full.
+    """
+    where, params = ["timestamp IS NOT NULL"], []
+    if user_id is not None:
+        where.append("user_id = ?")
+        params.append(user_id)
+    if start:
+        where.append("timestamp >= ?")
+        params.append(str(start))
+    if end:
+        where.append("timestamp < ?")
+        params.append(str(end))
+    if before:
+        where.append("(timestamp, query_id) < (?, ?)")
+        params += list(before)
+    sql = (f"SELECT {', '.join(QUERY_COLUMNS)} FROM {{db}}.queries WHERE {' AND '.join(where)} "
+           f"ORDER BY timestamp DESC, query_id DESC LIMIT ?")
+    try:
+        with db_connection(readonly=True) as conn:
+            rows = [(row, False) for row in conn.execute(sql.format(db="main"), params + [page_size + 1])]
+            for month in archived_months():
+                if len(rows) > page_size or (start and month < str(start)[:7]):
+                    break
+                if (end and month > str(end)[:7]) or (before and month > before[0][:7]):
+                    continue
+                with _attached(conn, archive_path(month)):
+                    rows += [(row, True) for row in conn.execute(sql.format(db="archive"),
+                                                                 params + [page_size + 1 - len(rows)])]
+    except sqlite3.Error:
+        return [], None
+    history = []
+    for row, archived in rows[:page_size]:
+        entry = dict(zip(QUERY_COLUMNS, row), archived=archived)
+        if archived:
+            entry["response"] = _decompress(entry["response"])
+        history.append(entry)
+    next_before = (rows[page_size - 1][0][4], rows[page_size - 1][0][0]) if len(rows) > page_size else None
+    return history, next_before
+
+# --- Ky'ra API Client ---
+KYRA_API_URL = os.environ.get("KYRA_API_URL", "").rstrip("/")
+KYRA_API_KEY = os.environ.get("KYRA_API_KEY", "")
+KYRA_API_CONNECT_TIMEOUT = float(os.environ.get("KYRA_API_CONNECT_TIMEOUT", "3.05"))
+KYRA_API_READ_TIMEOUT = float(os.environ.get("KYRA_API_READ_TIMEOUT", "60"))
+KYRA_API_RETRIES = int(os.environ.get("KYRA_API_RETRIES", "2"))
+KYRA_API_POOL_SIZE = int(os.environ.get("KYRA_API_POOL_SIZE", "16"))
+KYRA_CACHE_TTL = float(os.environ.get("KYRA_CACHE_TTL", "3600"))
+KYRA_CACHE_SIZE = int(os.environ.get("KYRA_CACHE_SIZE", "2048"))
+
+class KyraAPIError(RuntimeError):
+    pass
+
+class KyraClient:
+    """Streaming client for the Ky'ra generation endpoint.
+
+    ``POST {base_url}/v1/generate`` with ``{"prompt", "role", "stream": true}``
+    answers with newline-delimited JSON events: ``{"token": ...}`` fragments
+    followed by ``{"done": true}``, or ``{"error": ...}``. One pooled session
+    is shared by all Streamlit sessions; connect failures and 429/5xx answers
+    are retried with backoff before any token has been read.
+    """
+
+    def __init__(self, base_url, api_key="", connect_timeout=KYRA_API_CONNECT_TIMEOUT,
+                 read_timeout=KYRA_API_READ_TIMEOUT, retries=KYRA_API_RETRIES, pool_size=KYRA_API_POOL_SIZE):
+        import requests
+        from requests.adapters import HTTPAdapter
+        from urllib3.util.retry import Retry
+
+        self.url = f"{base_url}/v1/generate"
+        self.timeout = (connect_timeout, read_timeout)
+        self.session = requests.Session()
+        if api_key:
+            self.session.headers["Authorization"] = f"Bearer {api_key}"
+        retry = Retry(total=retries, read=0, backoff_factor=0.3, status_forcelist=(429, 502, 503, 504),
+                      allowed_methods=frozenset({"POST"}), raise_on_status=False)
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=retry)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    def stream(self, prompt, role=None):
+        """Yield response text fragments as the server produces them."""
+        import requests
+
+        try:
+            with self.session.post(self.url, json={"prompt": prompt, "role": role, "stream": True},
+                                   stream=True, timeout=self.timeout) as resp:
+                resp.raise_for_status()
+                for line in resp.iter_lines(decode_unicode=True):
+                    if not line:
+                        continue
+                    event = json.loads(line)
+                    if "error" in event:
+                        raise KyraAPIError(event["error"])
+                    if "token" in event:
+                        yield event["token"]
+                    if event.get("done"):
+                        return
+        except (requests.RequestException, ValueError) as e:
+            raise KyraAPIError(str(e)) from e
+
+@process_resource
+def get_kyra_client():
+    """Return the shared API client, or None to use the built-in echo stand-in."""
+    if not KYRA_API_URL:
+        return None
+    return KyraClient(KYRA_API_URL, KYRA_API_KEY)
+
+def _kyra_response_cache():
+    return get_cache("kyra_responses", KYRA_CACHE_TTL, maxsize=KYRA_CACHE_SIZE)
+
+def normalize_prompt(prompt):
+    return " ".join(prompt.lower().split())
+
+def stream_kyra_api(prompt, role=None, stats=None):
+    """Yield Ky'ra's answer to ``prompt`` in fragments, from the response cache when possible.
+
+    Once exhausted, ``stats`` (if given) holds ``latency_ms`` and ``cache_hit``.
+    Only complete answers are cached.
+    """
+    stats = {} if stats is None else stats
+    start = time.perf_counter()
+    key = (normalize_prompt(prompt), role)
+    cache = _kyra_response_cache()
+    response = cache.get(key)
+    if response is not None:
+        stats.update(cache_hit=True, latency_ms=(time.perf_counter() - start) * 1000)
+        yield response
+        return
+    client = get_kyra_client()
+    parts = []
+    fragments = client.stream(prompt, role) if client else iter([f"Ky'ra response to: {prompt}"])
+    for fragment in fragments:
+        parts.append(fragment)
+        yield fragment
+    cache.set(key, "".join(parts))
+    stats.update(cache_hit=False, latency_ms=(time.perf_counter() - start) * 1000)
+
+def query_kyra_api(prompt, role=None, stats=None):
+    return "".join(stream_kyra_api(prompt, role, stats))
+
+# --- Data Export ---
+EXPORT_CHUNK_ROWS = int(os.environ.get("KYRA_EXPORT_CHUNK_ROWS", "10000"))
+EXPORT_FORMATS = {"csv": ".csv", "csv.gz": ".csv.gz", "parquet": ".parquet"}
+
+# Each column is (SQL expression, output name, "int" | "real" | "text"); u is the owning user.
+EXPORT_SPECS = {
+    "queries": {
+        "from": "queries q LEFT JOIN users u ON u.id = q.user_id",
+        "columns": [("q.query_id", "query_id", "int"), ("q.user_id", "user_id", "int"),
+                    ("u.email", "email", "text"), ("u.role", "role", "text"), ("u.org", "org", "text"),
+                    ("q.prompt", "prompt", "text"), ("q.response", "response", "text"),
+                    ("q.timestamp", "timestamp", "text"), ("q.latency_ms", "latency_ms", "real"),
+                    ("q.cache_hit", "cache_hit", "int")],
+        "order_by": "q.query_id",
+        "time_column": "q.timestamp",
+    },
+    "internships": {
+        "from": "internships i LEFT JOIN users u ON u.id = i.student_id",
+        "columns": [("i.internship_id", "internship_id", "int"), ("i.student_id", "student_id", "int"),
+                    ("u.email", "email", "text"), ("u.role", "role", "text"), ("u.org", "org", "text"),
+                    ("i.company_name", "company_name", "text"), ("i.duration", "duration", "text"),
+                    ("i.feedback", "feedback", "text"), ("i.msme_digitalized", "msme_digitalized", "int"),
+                    ("i.region", "region", "text"), ("i.created_at", "created_at", "text")],
+        "order_by": "i.internship_id",
+        "time_column": "i.created_at",
+    },
+    "projects": {
+        "from": "projects p LEFT JOIN users u ON u.id = p.student_id",
+        "columns": [("p.project_id", "project_id", "int"), ("p.student_id", "student_id", "int"),
+                    ("u.email", "email", "text"), ("u.role", "role", "text"), ("u.org", "org", "text"),
+                    ("p.title", "title", "text"), ("p.description", "description", "text"),
+                    ("p.status", "status", "text"), ("p.region", "region", "text"),
+                    ("p.created_at", "created_at", "text")],
+        "order_by": "p.project_id",
+        "time_column": "p.created_at",
+    },
+    "feedback": {
+        "from": "feedback f LEFT JOIN users u ON u.id = f.student_id",
+        "columns": [("f.feedback_id", "feedback_id", "int"), ("f.student_id", "student_id", "int"),
+                    ("u.email", "email", "text"), ("u.role", "role", "text"), ("u.org", "org", "text"),
+                    ("f.rating", "rating", "int"), ("f.comments", "comments", "text"),
+                    ("f.region", "region", "text"), ("f.created_at", "created_at", "text")],
+        "order_by": "f.feedback_id",
+        "time_column": "f.created_at",
+    },
+}
+
+def iter_export_chunks(table, role=None, org=None, start=None, end=None, chunk_rows=EXPORT_CHUNK_ROWS):
+    """Yield lists of row tuples from ``table``, at most ``chunk_rows`` at a time.
+
+    ``role`` and ``org`` filter on the owning user; ``start`` (inclusive) and
+    ``end`` (exclusive) are ISO dates or datetimes and need a timestamped table.
+    """
+    spec = EXPORT_SPECS[table]
+    where, params = [], []
+    if role:
+        where.append("u.role = ?")
+        params.append(role)
+    if org:
+        where.append("u.org = ?")
+        params.append(org)
+    if (start or end) and not spec["time_column"]:
+        raise ValueError(f"{table} has no timestamp column to filter on")
+    if start:
+        where.append(f"{spec['time_column']} >= ?")
+        params.append(str(start))
+    if end:
+        where.append(f"{spec['time_column']} < ?")
+        params.append(str(end))
+    sql = f"SELECT {', '.join(expr for expr, _, _ in spec['columns'])} FROM {spec['from']}"
+    if where:
+        sql += " WHERE " + " AND ".join(where)
+    sql += f" ORDER BY {spec['order_by']}"
+    with db_connection(readonly=True) as conn:
+        cur = conn.execute(sql, params)
+        while True:
+            rows = cur.fetchmany(chunk_rows)
+            if not rows:
+                break
+            yield rows
+        cur.close()
+
+@instrumented
+def export_table(table, dest, fmt="csv", chunk_rows=EXPORT_CHUNK_ROWS, **filters):
+    """Write ``table`` to ``dest`` (a path or binary file) one chunk at a time.
+
+    Memory use is bounded by ``chunk_rows`` regardless of table size. Returns
+    the number of rows written.
+    """
+    if table not in EXPORT_SPECS:
+        raise ValueError(f"Unknown export table: {table}")
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f"Unknown export format: {fmt}")
+    columns = EXPORT_SPECS[table]["columns"]
+    names = [name for _, name, _ in columns]
+    written = 0
+    with ExitStack() as stack:
+        out = stack.enter_context(open(dest, "wb")) if isinstance(dest, (str, os.PathLike)) else dest
+        chunks = stack.enter_context(closing(iter_export_chunks(table, chunk_rows=chunk_rows, **filters)))
+        if fmt == "parquet":
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+            types = {"int": pa.int64(), "real": pa.float64(), "text": pa.string()}
+            schema = pa.schema([(name, types[kind]) for _, name, kind in columns])
+            writer = stack.enter_context(pq.ParquetWriter(out, schema))
+            for rows in chunks:
+                arrays = [pa.array(values, type=field.type) for values, field in zip(zip(*rows), schema)]
+                writer.write_table(pa.Table.from_arrays(arrays, schema=schema))
+                written += len(rows)
+        else:
+            if fmt == "csv.gz":
+                out = stack.enter_context(gzip.GzipFile(fileobj=out, mode="wb"))
+            text = io.TextIOWrapper(out, encoding="utf-8", newline="")
+            stack.callback(text.detach)
+            stack.callback(text.flush)
+            writer = csv.writer(text)
+            writer.writerow(names)
+            for rows in chunks:
+                writer.writerows(rows)
+                written += len(rows)
+    return written
+
+# --- Admin ---
+# Login identifies users by their email alone, so an admin email must also
+# present KYRA_ADMIN_TOKEN; with no token set the admin pages are off.
+ADMIN_EMAILS = {e.strip().lower() for e in os.environ.get("KYRA_ADMIN_EMAILS", "").split(",") if e.strip()}
+ADMIN_TOKEN = os.environ.get("KYRA_ADMIN_TOKEN", "")
+ADMIN_LOGIN_ENABLED = bool(ADMIN_TOKEN and ADMIN_EMAILS)
+
+def check_admin_token(email, token):
+    """True if ``email`` is listed in KYRA_ADMIN_EMAILS and ``token`` is KYRA_ADMIN_TOKEN."""
+    return (ADMIN_LOGIN_ENABLED and email.strip().lower() in ADMIN_EMAILS
+            and hmac.compare_digest(token.encode(), ADMIN_TOKEN.encode()))
+
+def is_admin(user):
+    """True for a signed-in user whose login passed check_admin_token."""
+    return bool(user) and user.get("admin") is True
+
+# --- Bulk Import ---
+IMPORT_CHUNK_ROWS = int(os.environ.get("KYRA_IMPORT_CHUNK_ROWS", "50000"))
+IMPORT_MAX_REJECT_DETAILS = 10000
+VALID_ROLES = ("student", "college", "mentor", "msme", "government")
+IMPORT_OFFSET_RE = r"[T ]\d.*(?:Z|[+-]\d{2}(?::?\d{2})?)$"
+
+# Required columns, and optional columns with the default used when absent or blank.
+# Blank user columns (name, role, org, region) keep an existing user's value and
+# fall back to a derived name, "student" and UNKNOWN_TAG for new users.
+IMPORT_SPECS = {
+    "users": {
+        "required": ["email"],
+        "optional": {"name": "", "role": "", "org": "", "region": ""},
+    },
+    "internships": {
+        "required": ["email", "company_name", "duration"],
+        "optional": {"feedback": "", "msme_digitalized": "0", "created_at": "",
+                     "name": "", "org": "", "region": ""},
+    },
+    "projects": {
+        "required": ["title"],
+        "optional": {"email": "", "description": "", "status": "Open", "created_at": "",
+                     "name": "", "org": "", "region": ""},
+    },
+}
+
+def _read_import_chunks(source, chunk_rows):
+    name = str(getattr(source, "name", source)).lower()
+    if name.endswith(".parquet"):
+        import pyarrow.parquet as pq
+        for batch in pq.ParquetFile(source).iter_batches(batch_size=chunk_rows):
+            yield batch.to_pandas()
+    else:
+        import pandas as pd
+        yield from pd.read_csv(source, chunksize=chunk_rows, dtype=str, keep_default_na=False)
+
+def _normalize_import_chunk(df, spec):
+    df.columns = [str(c).strip().lower() for c in df.columns]
+    missing = [c for c in spec["required"] if c not in df.columns]
+    if missing:
+        raise ValueError(f"Missing required column(s): {', '.join(missing)}")
+    columns = spec["required"] + list(spec["optional"])
+    for col in spec["optional"]:
+        if col not in df.columns:
+            df[col] = ""
+    df = df[columns].astype("string").fillna("")
+    for col in columns:
+        df[col] = df[col].str.strip()
+    for col, default in spec["optional"].items():
+        if default:
+            df[col] = df[col].mask(df[col] == "", default)
+    return df
+
+def _import_rejections(table, df, spec):
+    """Return a Series holding the rejection reason for each row ('' if valid)."""
+    import pandas as pd
+    reason = pd.Series("", index=df.index, dtype="string")
+
+    def reject(mask, message):
+        nonlocal reason
+        reason = reason.mask((reason == "") & mask, message)
+
+    for col in spec["required"]:
+        reject(df[col] == "", f"missing {col}")
+    if "email" in df:
+        reject((df["email"] != "") & ~df["email"].str.contains("@", regex=False), "invalid email")
+    if table == "users":
+        df["role"] = df["role"].str.lower()
+        reject((df["role"] != "") & ~df["role"].isin(VALID_ROLES), "invalid role")
+    if table == "internships":
+        msmes = pd.to_numeric(df["msme_digitalized"], errors="coerce")
+        reject(msmes.isna() | (msmes < 0) | (msmes % 1 != 0), "invalid msme_digitalized")
+    if "created_at" in df:
+        # Offset and naive stamps are parsed apart (pandas carries one row's offset over to the
+        # next naive row) and both converted to naive UTC; naive stamps are taken as UTC.
+        stamps = df["created_at"].mask(df["created_at"] == "")
+        aware = stamps.str.contains(IMPORT_OFFSET_RE, na=False)
+        stamps = pd.concat([pd.to_datetime(stamps[rows], errors="coerce", format="ISO8601", utc=True)
+                            for rows in (aware, ~aware)]).reindex(df.index).dt.tz_convert(None)
+        reject((df["created_at"] != "") & stamps.isna(), "invalid created_at")
+        df["created_at"] = stamps.dt.strftime("%Y-%m-%dT%H:%M:%S.%f").str[:-3]
+    return reason
+
+IMPORT_USER_FIELDS = ("name", "role", "org", "region")
+
+def _resolve_import_users(conn, df, role="student"):
+    """Upsert the chunk's users in two statements; return ({email: id}, created, updated).
+
+    Existing users take the non-blank name, role, org and region given in
+    the chunk (the first row wins for a repeated email); unknown emails are
+    created with ``role`` and UNKNOWN_TAG filling the blanks.
+    """
+    users = df[df["email"] != ""].drop_duplicates("email")
+    fields = [field for field in IMPORT_USER_FIELDS if field in users]
+    default_names = users["email"].str.split("@").str[0].str.capitalize()
+    conn.execute("CREATE TEMP TABLE IF NOT EXISTS import_users "
+                 "(email TEXT PRIMARY KEY, default_name TEXT, name TEXT, role TEXT, org TEXT, region TEXT)")
+    conn.execute("DELETE FROM import_users")
+    conn.executemany(f"INSERT INTO import_users (email, default_name, {', '.join(fields)}) "
+                     f"VALUES ({', '.join('?' * (len(fields) + 2))})",
+                     zip(users["email"].tolist(), default_names.tolist(),
+                         *(_nullable(users[field].mask(users[field] == "")) for field in fields)))
+    updated = conn.execute(f"""
+        UPDATE users SET {', '.join(f'{f} = COALESCE(i.{f}, users.{f})' for f in IMPORT_USER_FIELDS)}
+        FROM import_users i
+        WHERE i.email = users.email
+          AND ({' OR '.join(f'COALESCE(i.{f}, users.{f}) IS NOT users.{f}' for f in IMPORT_USER_FIELDS)})
+    """).rowcount
+    created = conn.execute(f"""
+        INSERT INTO users (name, email, role, org, region)
+        SELECT COALESCE(name, default_name), email, COALESCE(role, ?),
+               COALESCE(org, '{UNKNOWN_TAG}'), COALESCE(region, '{UNKNOWN_TAG}') FROM import_users i
+        WHERE NOT EXISTS (SELECT 1 FROM users u WHERE u.email = i.email)
+    """, (role,)).rowcount
+    ids = dict(conn.execute("SELECT u.email, u.id FROM users u JOIN import_users i ON i.email = u.email"))
+    return ids, created, updated
+
+def _nullable(column):
+    return column.astype(object).where(column.notna(), None).tolist()
+
+def _load_import_chunk(conn, table, df):
+    """Load a validated chunk; return (rows loaded, users created, users updated)."""
+    import pandas as pd
+    ids, created, updated = _resolve_import_users(conn, df)
+    if table == "users":
+        return created + updated, created, updated
+    if table == "internships":
+        conn.executemany("""
+            INSERT INTO internships (student_id, company_name, duration, feedback, msme_digitalized, created_at)
+            VALUES (?, ?, ?, ?, ?, ?)
+        """, zip([ids[e] for e in df["email"]], df["company_name"].tolist(), df["duration"].tolist(),
+                 df["feedback"].tolist(), pd.to_numeric(df["msme_digitalized"]).astype(int).tolist(),
+                 _nullable(df["created_at"])))
+    elif table == "projects":
+        conn.executemany("""
+            INSERT INTO projects (student_id, title, description, status, created_at) VALUES (?, ?, ?, ?, ?)
+        """, zip([ids.get(e) for e in df["email"]], df["title"].tolist(), df["description"].tolist(),
+                 df["status"].tolist(), _nullable(df["created_at"])))
+    return len(df), created, updated
+
+@instrumented
+def bulk_import(table, source, chunk_rows=IMPORT_CHUNK_ROWS):
+    """Stream a CSV or Parquet file into ``users``, ``internships`` or ``projects``.
+
+    Each chunk is validated with vectorized pandas checks, its unknown emails
+    are created as users in one statement, and its rows are loaded with
+    ``executemany`` in a single transaction. Raises ValueError if the file
+    lacks a required column; bad rows are skipped and listed in the report.
+    Known emails update their user's non-blank columns; a ``users`` row that
+    neither creates nor changes a user counts as skipped, not loaded.
+    """
+    if table not in IMPORT_SPECS:
+        raise ValueError(f"Unknown import table: {table}")
+    spec = IMPORT_SPECS[table]
+    report = {"table": table, "rows_read": 0, "rows_loaded": 0, "rows_rejected": 0, "rows_skipped": 0,
+              "users_created": 0, "users_updated": 0, "rejected": []}
+    start = time.perf_counter()
+    for chunk in _read_import_chunks(source, chunk_rows):
+        df = _normalize_import_chunk(chunk, spec)
+        df.index = range(report["rows_read"] + 1, report["rows_read"] + 1 + len(df))
+        report["rows_read"] += len(df)
+        reason = _import_rejections(table, df, spec)
+        bad = reason != ""
+        if bad.any():
+            report["rows_rejected"] += int(bad.sum())
+            room = IMPORT_MAX_REJECT_DETAILS - len(report["rejected"])
+            report["rejected"] += [{"row": row, "reason": why} for row, why in reason[bad].head(room).items()]
+        df = df[~bad]
+        if df.empty:
+            continue
+        with db_connection() as conn:
+            loaded, created, updated = _load_import_chunk(conn, table, df)
+        report["rows_loaded"] += loaded
+        report["rows_skipped"] += len(df) - loaded
+        report["users_created"] += created
+        report["users_updated"] += updated
+    report["seconds"] = time.perf_counter() - start
+    report["rows_per_second"] = report["rows_read"] / report["seconds"] if report["seconds"] else 0.0
+    _metrics_cache().clear()
+    _student_page_cache().clear()
+    return report
@@ -2,16 +2,35 @@
 """kyra_internship_dashboard.py
 
 Ky'ra Internship Dashboard with enhanced UI and role-based dashboards.
+
+The schema and data-access helpers live in kyra_data; this module is
+only the Streamlit UI.
+
+Login trusts the typed email and role; there is no password, so every
+role page must be safe to show to anyone claiming that role. The admin
+pages (bulk import, data export, performance) additionally require the
+KYRA_ADMIN_TOKEN shared secret at login and are off when it is unset.
 """
 
 # --- Imports ---
 import streamlit as st
 import pandas as pd
-import sqlite3
+import functools
 import os
-from datetime import datetime
+import sqlite3
+import tempfile
+from datetime import date, timedelta
 import uuid
 
+from kyra_data import (
+    ADMIN_LOGIN_ENABLED, EXPORT_FORMATS, EXPORT_SPECS, IMPORT_SPECS, INSTRUMENT, LEADERBOARD_METRICS, VALID_ROLES,
+    KyraAPIError, assign_project, bulk_import, check_admin_token, current_session_id, export_table, fetch_leaderboard,
+    fetch_leaderboard_percentiles, fetch_metrics, fetch_open_projects_page, fetch_query_history, fetch_rollups,
+    fetch_students_page, fetch_user_internships, fetch_user_projects, get_instrumentation, get_read_snapshot,
+    get_writer, initialize_database, is_admin, log_feedback, log_internship, log_project, log_query, match_projects,
+    match_students, perf_section, resolve_user, search_text, stream_kyra_api, summarize_rollups,
+)
+
 # --- Streamlit Config ---
 st.set_page_config(
     page_title="Ky'ra Internship Dashboard",
@@ -21,7 +40,7 @@ st.set_page_config(
 )
 
 # Custom CSS for Ky'ra branding
-st.markdown("""
+KYRA_CSS = """
     <style>
     /* General Styling */
     body {
@@ -77,269 +96,571 @@ st.markdown("""
         background-color: #FFFFFF;
     }
     </style>
-""", unsafe_allow_html=True)
-
-# --- Database Connection (SQLite) ---
-@st.cache_resource
-def get_connection():
-    db_path = os.path.join(os.getcwd(), "internship_tracking.db")
-    conn = sqlite3.connect(db_path, check_same_thread=False)
-    return conn
-
-# --- Database Initialization ---
-@st.cache_data
-def initialize_database():
-    conn = get_connection()
-    cur = conn.cursor()
-    cur.execute("""
-        CREATE TABLE IF NOT EXISTS users (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            name TEXT NOT NULL,
-            email TEXT UNIQUE NOT NULL,
-            role TEXT NOT NULL,
-            org TEXT
-        )
-    """)
-    cur.execute("""
-        CREATE TABLE IF NOT EXISTS projects (
-            project_id INTEGER PRIMARY KEY AUTOINCREMENT,
-            student_id INTEGER,
-            title TEXT NOT NULL,
-            description TEXT,
-            status TEXT,
-            FOREIGN KEY (student_id) REFERENCES users (id)
-        )
-    """)
-    cur.execute("""
-        CREATE TABLE IF NOT EXISTS queries (
-            query_id INTEGER PRIMARY KEY AUTOINCREMENT,
-            user_id INTEGER,
-            prompt TEXT,
-            response TEXT,
-            timestamp TEXT,
-            FOREIGN KEY (user_id) REFERENCES users (id)
-        )
-    """)
-    cur.execute("""
-        CREATE TABLE IF NOT EXISTS metrics (
-            metric_id INTEGER PRIMARY KEY AUTOINCREMENT,
-            role TEXT,
-            metric_name TEXT,
-            value INTEGER
-        )
-    """)
-    cur.execute("""
-        CREATE TABLE IF NOT EXISTS internships (
-            internship_id INTEGER PRIMARY KEY AUTOINCREMENT,
-            student_id INTEGER,
-            company_name TEXT NOT NULL,
-            duration TEXT NOT NULL,
-            feedback TEXT,
-            msme_digitalized INTEGER DEFAULT 0,
-            FOREIGN KEY (student_id) REFERENCES users (id)
+"""
+
+def inject_css():
+    st.markdown(KYRA_CSS, unsafe_allow_html=True)
+
+# --- Fragments ---
+# Streamlit 1.37 renamed st.experimental_fragment to st.fragment.
+fragment = getattr(st, "fragment", None) or st.experimental_fragment
+METRICS_REFRESH_SECONDS = float(os.environ.get("KYRA_METRICS_REFRESH_SECONDS", "30"))
+
+def dashboard_fragment(func=None, *, run_every=None):
+    """Render ``func`` as a fragment, timed as ``fragment:<name>``.
+
+    Widget changes inside a fragment rerun only that function, not main().
+    """
+    if func is None:
+        return functools.partial(dashboard_fragment, run_every=run_every)
+
+    @functools.wraps(func)
+    def timed(*args, **kwargs):
+        with perf_section(f"fragment:{func.__name__}"):
+            return func(*args, **kwargs)
+    return fragment(timed, run_every=run_every)
+
+# --- Pagination Controls ---
+def page_cursor(key):
+    """Keyset cursor of the current page for the listing ``key``."""
+    return st.session_state.setdefault(f"{key}_cursors", [0])[-1]
+
+def reset_pages(key):
+    st.session_state[f"{key}_cursors"] = [0]
+
+def page_controls(key, next_after_id):
+    # Callbacks run before the rerun, so paging inside a fragment reruns only that fragment.
+    cursors = st.session_state.setdefault(f"{key}_cursors", [0])
+    prev_col, page_col, next_col = st.columns([1, 2, 1])
+    with prev_col:
+        st.button("◀ Previous", key=f"{key}_prev", disabled=len(cursors) == 1, on_click=cursors.pop)
+    with page_col:
+        st.markdown(f"Page {len(cursors)}")
+    with next_col:
+        st.button("Next ▶", key=f"{key}_next", disabled=next_after_id is None,
+                  on_click=cursors.append, args=(next_after_id,))
+
+# --- Dashboard Sections ---
+@dashboard_fragment(run_every=METRICS_REFRESH_SECONDS or None)
+def metrics_strip(role):
+    metrics = fetch_metrics(role)
+    cols = st.columns(3)
+    for i, (key, value) in enumerate(metrics.items()):
+        with cols[i % 3]:
+            st.markdown(f"""
+                <div class="metric-card">
+                    <h3>{key.replace('_', ' ').title()}</h3>
+                    <p style="font-size: 24px; color: #50C878;">{value}</p>
+                </div>
+            """, unsafe_allow_html=True)
+
+LEADERBOARD_COLUMNS = {"rank": "Rank", "name": "Name", "org": "Org", "avg_rating": "Avg Rating", "ratings": "Ratings",
+                       "internships": "Internships", "msmes_digitalized": "MSMEs Digitalized"}
+
+def leaderboard(key, org=None):
+    """Students ranked by a chosen metric, one page at a time, with its percentile cut-offs."""
+    st.subheader("🏆 Leaderboard")
+    metrics = {label: metric for metric, (label, _) in LEADERBOARD_METRICS.items()}
+    metric = metrics[st.selectbox("Rank by", list(metrics), key=f"{key}_metric")]
+    if st.session_state.get(f"{key}_metric_applied") != metric:
+        st.session_state[f"{key}_metric_applied"] = metric
+        reset_pages(key)
+    rows, next_after = fetch_leaderboard(metric, org, page_cursor(key) or None)
+    if rows:
+        board = pd.DataFrame(rows)[list(LEADERBOARD_COLUMNS)].rename(columns=LEADERBOARD_COLUMNS)
+        st.dataframe(board.round(2), hide_index=True, use_container_width=True)
+        percentiles = fetch_leaderboard_percentiles(metric, org)
+        cutoffs = " · ".join(f"p{pct} {value:.3g}" for pct, value in percentiles.items() if pct != "students")
+        st.caption(f"{cutoffs} across {percentiles.get('students', 0)} students")
+    else:
+        st.info("No students to rank yet.")
+    page_controls(key, next_after)
+
+@dashboard_fragment
+def chatbot(user):
+    st.markdown("### Ask Ky'ra")
+    prompt = st.text_input("Your question or task", key="kyra_prompt")
+    if st.button("Submit to Ky'ra 🤖"):
+        stats = {}
+        try:
+            response = st.write_stream(stream_kyra_api(prompt, user["role"], stats))
+        except KyraAPIError as e:
+            st.error(f"Ky'ra is unavailable right now ({e}). Please try again.")
+        else:
+            log_query(user["id"], prompt, response, stats["latency_ms"], stats["cache_hit"])
+    if st.checkbox("Show my past questions"):
+        history, next_before = fetch_query_history(user["id"], before=page_cursor("query_history") or None)
+        for q in history:
+            st.markdown(f"**{q['prompt']}** · {q['timestamp'][:10]}  \n{q['response'] or ''}")
+        if not history:
+            st.info("No questions yet.")
+        page_controls("query_history", next_before)
+
+# --- Admin Pages ---
+@dashboard_fragment
+def bulk_import_page(user):
+    st.header("📥 Bulk Import")
+    table = st.selectbox("Import into", list(IMPORT_SPECS))
+    spec = IMPORT_SPECS[table]
+    st.caption(f"Required columns: {', '.join(spec['required'])}. Optional: {', '.join(spec['optional'])}.")
+    upload = st.file_uploader("CSV or Parquet file", type=["csv", "parquet"])
+    if st.button("Run Import") and upload is not None:
+        with st.spinner("Importing..."):
+            try:
+                report = bulk_import(table, upload)
+            except ValueError as e:
+                report = None
+                st.error(str(e))
+        if report:
+            st.success(f"Loaded {report['rows_loaded']} of {report['rows_read']} rows "
+                       f"({report['rows_per_second']:.0f} rows/s); created {report['users_created']} "
+                       f"and updated {report['users_updated']} users.")
+            if report["rows_skipped"]:
+                st.info(f"{report['rows_skipped']} rows skipped: their users already exist unchanged.")
+            if report["rows_rejected"]:
+                st.warning(f"{report['rows_rejected']} rows rejected.")
+                st.dataframe(pd.DataFrame(report["rejected"]), hide_index=True, use_container_width=True)
+
+def discard_export():
+    """Delete the prepared export file; runs once its download has been served."""
+    export = st.session_state.pop("export_file", None)
+    if export and os.path.exists(export[0]):
+        os.remove(export[0])
+
+@dashboard_fragment
+def data_export_page(user):
+    st.header("📤 Data Export")
+    table = st.selectbox("Table", list(EXPORT_SPECS))
+    fmt = st.selectbox("Format", list(EXPORT_FORMATS))
+    filter_col1, filter_col2 = st.columns(2)
+    with filter_col1:
+        role_filter = st.selectbox("Role", ["All"] + list(VALID_ROLES))
+        org_filter = st.text_input("Org")
+    with filter_col2:
+        dates = ()
+        if EXPORT_SPECS[table]["time_column"]:
+            dates = st.date_input("Date range", value=())
+    if st.button("Prepare Export"):
+        discard_export()
+        fd, path = tempfile.mkstemp(suffix=EXPORT_FORMATS[fmt])
+        os.close(fd)
+        try:
+            with st.spinner("Exporting..."):
+                rows = export_table(
+                    table, path, fmt,
+                    role=None if role_filter == "All" else role_filter,
+                    org=org_filter.strip() or None,
+                    start=dates[0].isoformat() if len(dates) > 0 else None,
+                    end=(dates[1] + timedelta(days=1)).isoformat() if len(dates) > 1 else None,
+                )
+        except (sqlite3.Error, OSError) as e:
+            if os.path.exists(path):
+                os.remove(path)
+            st.error(f"Export failed: {e}")
+        else:
+            st.session_state.export_file = (path, f"{table}{EXPORT_FORMATS[fmt]}", rows)
+    if st.session_state.get("export_file"):
+        path, filename, rows = st.session_state.export_file
+        if os.path.exists(path):
+            with open(path, "rb") as f:
+                st.download_button(f"Download {filename} ({rows} rows)", f, file_name=filename,
+                                   on_click=discard_export)
+
+@dashboard_fragment
+def performance_page(user):
+    st.header("⏱️ Performance")
+    if not INSTRUMENT:
+        st.info("Instrumentation is off. Set KYRA_INSTRUMENT=1 and restart to collect timings.")
+    else:
+        instrumentation = get_instrumentation()
+        st.subheader("All Sessions")
+        st.dataframe(pd.DataFrame(instrumentation.summary()), hide_index=True, use_container_width=True)
+        st.subheader("This Session")
+        st.dataframe(pd.DataFrame(instrumentation.summary(current_session_id())),
+                     hide_index=True, use_container_width=True)
+        writer = get_writer()
+        if writer is not None:
+            st.subheader("Write-Behind Queue")
+            st.json(writer.stats())
+        snapshot = get_read_snapshot()
+        if snapshot is not None:
+            st.subheader("Read Snapshot")
+            st.json(snapshot.stats())
+        st.subheader("Recent Events")
+        recent = pd.DataFrame(list(instrumentation.recent)[-200:][::-1],
+                              columns=["time", "session", "section", "seconds", "statements"])
+        recent["time"] = pd.to_datetime(recent["time"], unit="s")
+        st.dataframe(recent, hide_index=True, use_container_width=True)
+        st.download_button("Download Prometheus metrics", instrumentation.prometheus(),
+                           file_name="kyra_metrics.prom")
+
+# --- Search ---
+SEARCH_KINDS = {"Projects": "projects", "Internship Feedback": "internships", "Ky'ra Questions": "queries"}
+
+@dashboard_fragment
+def search_page(user):
+    st.header("🔎 Search")
+    query_col, kind_col = st.columns([2, 1])
+    with query_col:
+        text = st.text_input("Keywords", key="search_text")
+    with kind_col:
+        labels = st.multiselect("In", list(SEARCH_KINDS), default=list(SEARCH_KINDS))
+    if "Ky'ra Questions" in labels and not is_admin(user):
+        st.caption("Ky'ra Questions covers only the questions you asked.")
+    filters = (text, tuple(labels))
+    if st.session_state.get("search_applied") != filters:
+        st.session_state.search_applied = filters
+        reset_pages("search")
+    if not text.strip() or not labels:
+        return
+    # Ky'ra questions are private: only admins search everyone's.
+    owner_id = None if is_admin(user) else user["id"]
+    results, next_offset = search_text(text, [SEARCH_KINDS[label] for label in labels], page_cursor("search"),
+                                       owner_id=owner_id)
+    if not results:
+        st.info("No matches found.")
+        return
+    kind_labels = {kind: label for label, kind in SEARCH_KINDS.items()}
+    for r in results:
+        st.markdown(f"**{r['title'] or '(untitled)'}** · {kind_labels[r['kind']]} #{r['id']}  \n{r['snippet']}")
+    page_controls("search", next_offset)
+
+# --- Student Pages ---
+def progress_page(user):
+    st.header("Your Progress")
+    st.markdown("You're doing great! Let's continue.")
+    internship_listing(user)
+    st.subheader("Your Projects")
+    project_listing(user)
+
+@dashboard_fragment
+def internship_listing(user):
+    internships, next_after_id = fetch_user_internships(user["id"], page_cursor("internships"))
+    for internship in internships:
+        st.markdown(f"""
+            <div class="metric-card">
+                <h3>{internship['company_name']}</h3>
+                <p>Duration: {internship['duration']}</p>
+                <p>Feedback: {internship['feedback'] or 'N/A'}</p>
+                <p>MSMEs Digitalized: {internship['msme_digitalized']}</p>
+            </div>
+        """, unsafe_allow_html=True)
+    page_controls("internships", next_after_id)
+
+@dashboard_fragment
+def project_listing(user):
+    projects, next_after_id = fetch_user_projects(user["id"], page_cursor("projects"))
+    if projects:
+        st.dataframe(
+            pd.DataFrame(projects, columns=["title", "description", "status"]),
+            hide_index=True,
+            use_container_width=True,
         )
-    """)
-    cur.execute("""
-        CREATE TABLE IF NOT EXISTS feedback (
-            feedback_id INTEGER PRIMARY KEY AUTOINCREMENT,
-            student_id INTEGER,
-            rating INTEGER,
-            comments TEXT,
-            FOREIGN KEY (student_id) REFERENCES users (id)
+    else:
+        st.info("No projects yet.")
+    page_controls("projects", next_after_id)
+
+@dashboard_fragment
+def log_internship_page(user):
+    st.header("🛠️ Log Internship")
+    company = st.text_input("Company Name")
+    duration = st.text_input("Duration (e.g., 3 months)")
+    feedback = st.text_area("Feedback")
+    msme_digitalized = st.number_input("MSMEs Digitalized", min_value=0)
+    if st.button("Submit Internship"):
+        if company and duration:
+            with st.spinner("Saving your internship..."):
+                success = log_internship(user["email"], company, duration, feedback, msme_digitalized)
+            if success:
+                st.success("Internship logged successfully! 🎉")
+                st.balloons()
+            else:
+                st.error("Could not save your internship right now. Please try again.")
+        else:
+            st.error("Please fill in all required fields.")
+
+@dashboard_fragment
+def upskilling_page(user):
+    st.header("📚 Upskilling Journey")
+    st.markdown("This small step brings you closer to your purpose.")
+    course = st.text_input("Enrolled Course")
+    hours = st.number_input("Learning Hours Completed", min_value=0)
+    project_title = st.text_input("Project Title")
+    project_desc = st.text_area("Project Description")
+    if st.button("Submit Project"):
+        if course and project_title:
+            if log_project(user["id"], project_title, project_desc, "Submitted", sync=True):
+                st.success("Project submitted successfully!")
+            else:
+                st.error("Could not save your project right now. Please try again.")
+
+@dashboard_fragment
+def opportunities_page(user):
+    st.header("🚀 Opportunities")
+    matches = match_projects(user["id"])
+    if not matches:
+        st.info("Log internships to get project recommendations!")
+    for m in matches:
+        st.markdown(f"**{m['title']}** · match {m['score']:.2f}  \n{m['description'] or ''}")
+
+@dashboard_fragment
+def student_feedback_page(user):
+    st.header("🗣️ Share Your Feedback")
+    rating = st.slider("Rate your experience", 1, 5, 3)
+    comments = st.text_area("Comments")
+    if st.button("Submit Feedback"):
+        with st.spinner("Submitting feedback..."):
+            received = log_feedback(user["id"], rating, comments)
+        if received:
+            st.success("Thanks for your feedback! 🌟 It has been received.")
+        else:
+            st.error("Could not send your feedback right now. Please try again.")
+
+# --- College Pages ---
+@dashboard_fragment
+def student_performance_page(user):
+    st.header("Student Performance")
+    search = st.text_input("Search by name, email or org", key="student_search")
+    if st.session_state.get("student_search_applied") != search:
+        st.session_state.student_search_applied = search
+        reset_pages("students")
+    students, next_after_id = fetch_students_page(search, page_cursor("students"))
+    if students:
+        st.dataframe(
+            pd.DataFrame([s[1:] for s in students], columns=["Name", "Email", "Org"]),
+            hide_index=True,
+            use_container_width=True,
         )
-    """)
-    conn.commit()
-    cur.close()
-
-# --- Helper Functions ---
-def fetch_user_data(email):
-    conn = get_connection()
-    cur = conn.cursor()
-    cur.execute("SELECT id, name, email, role, org FROM users WHERE email = ?", (email,))
-    user = cur.fetchone()
-    if user:
-        user_id, name, email, role, org = user
-        cur.execute("SELECT company_name, duration, feedback, msme_digitalized FROM internships WHERE student_id = ?", (user_id,))
-        internships = cur.fetchall()
-        cur.execute("SELECT project_id, title, description, status FROM projects WHERE student_id = ?", (user_id,))
-        projects = cur.fetchall()
-        cur.close()
-        return {
-            "id": user_id,
-            "name": name,
-            "email": email,
-            "role": role,
-            "org": org,
-            "internships": [{"company_name": i[0], "duration": i[1], "feedback": i[2], "msme_digitalized": i[3]} for i in internships],
-            "projects": [{"project_id": p[0], "title": p[1], "description": p[2], "status": p[3]} for p in projects]
-        }
-    cur.close()
-    return None
-
-def log_internship(email, company, duration, feedback, msme_digitalized):
-    conn = get_connection()
-    cur = conn.cursor()
-    try:
-        cur.execute("SELECT id FROM users WHERE email = ?", (email,))
-        user = cur.fetchone()
-        if not user:
-            name = email.split("@")[0].capitalize()
-            cur.execute("INSERT INTO users (name, email, role, org) VALUES (?, ?, ?, ?)", (name, email, "student", "Unknown"))
-            conn.commit()
-            cur.execute("SELECT id FROM users WHERE email = ?", (email,))
-            user = cur.fetchone()
-        user_id = user[0]
-        cur.execute("""
-            INSERT INTO internships (student_id, company_name, duration, feedback, msme_digitalized)
-            VALUES (?, ?, ?, ?, ?)
-        """, (user_id, company, duration, feedback, msme_digitalized))
-        conn.commit()
-        cur.close()
-        return True
-    except sqlite3.Error:
-        cur.close()
-        return False
-
-def log_project(student_id, title, description, status):
-    conn = get_connection()
-    cur = conn.cursor()
-    try:
-        cur.execute("INSERT INTO projects (student_id, title, description, status) VALUES (?, ?, ?, ?)",
-                    (student_id, title, description, status))
-        conn.commit()
-        cur.close()
-        return True
-    except sqlite3.Error:
-        cur.close()
-        return False
-
-def log_query(user_id, prompt, response):
-    conn = get_connection()
-    cur = conn.cursor()
-    try:
-        cur.execute("INSERT INTO queries (user_id, prompt, response, timestamp) VALUES (?, ?, ?, ?)",
-                    (user_id, prompt, response, datetime.utcnow().isoformat()))
-        conn.commit()
-        cur.close()
-        return True
-    except sqlite3.Error:
-        cur.close()
-        return False
-
-def fetch_metrics(role):
-    conn = get_connection()
-    cur = conn.cursor()
-    try:
-        if role == "student":
-            cur.execute("SELECT COUNT(*) FROM internships")
-            total_internships = cur.fetchone()[0]
-            cur.execute("SELECT SUM(msme_digitalized) FROM internships")
-            total_msmes = cur.fetchone()[0] or 0
-            cur.close()
-            return {
-                "total_internships": total_internships,
-                "total_msmes": total_msmes,
-                "certifications_issued": total_internships
-            }
-        elif role == "college":
-            cur.execute("SELECT COUNT(*) FROM users WHERE role = ?", ("student",))
-            students = cur.fetchone()[0]
-            cur.execute("SELECT COUNT(*) FROM projects")
-            projects = cur.fetchone()[0]
-            cur.close()
-            return {
-                "students_participating": students,
-                "projects_submitted": projects
-            }
-        elif role == "mentor":
-            cur.execute("SELECT COUNT(*) FROM feedback")
-            feedback_count = cur.fetchone()[0]
-            cur.close()
-            return {
-                "sessions_conducted": feedback_count,
-                "feedback_logged": feedback_count
-            }
-        elif role == "msme":
-            cur.execute("SELECT COUNT(*) FROM projects")
-            projects = cur.fetchone()[0]
-            cur.execute("SELECT COUNT(DISTINCT student_id) FROM projects WHERE student_id IS NOT NULL")
-            students_matched = cur.fetchone()[0]
-            cur.close()
-            return {
-                "projects_received": projects,
-                "students_matched": students_matched
-            }
-        elif role == "government":
-            cur.execute("SELECT COUNT(*) FROM users WHERE role = ?", ("college",))
-            colleges = cur.fetchone()[0]
-            cur.execute("SELECT COUNT(*) FROM internships")
-            total_engagement = cur.fetchone()[0]
-            cur.close()
-            return {
-                "colleges_onboarded": colleges,
-                "total_engagement": total_engagement
-            }
-    except sqlite3.Error:
-        cur.close()
-        return {}
-    cur.close()
-    return {}
-
-def log_feedback(student_id, rating, comments):
-    conn = get_connection()
-    cur = conn.cursor()
-    try:
-        cur.execute("INSERT INTO feedback (student_id, rating, comments) VALUES (?, ?, ?)",
-                    (student_id, rating, comments))
-        conn.commit()
-        cur.close()
-        return True
-    except sqlite3.Error:
-        cur.close()
-        return False
-
-def query_kyra_api(prompt):
-    return f"Ky'ra response to: {prompt}"
+    else:
+        st.info("No students found.")
+    page_controls("students", next_after_id)
+    leaderboard("college_leaderboard", user["org"])
+
+@dashboard_fragment
+def upload_projects_page(user):
+    st.header("Upload Projects")
+    title = st.text_input("Project Title")
+    desc = st.text_area("Project Description")
+    if st.button("Upload Project"):
+        if log_project(None, title, desc, "Open", sync=True):
+            st.success("Project uploaded successfully!")
+        else:
+            st.error("Could not upload the project right now. Please try again.")
+
+# --- Mentor Pages ---
+@dashboard_fragment
+def guide_students_page(user):
+    st.header("Guide Students")
+    st.info("Assign tasks and provide feedback soon!")
+    leaderboard("mentor_leaderboard")
+
+@dashboard_fragment
+def assign_tasks_page(user):
+    st.header("Assign Tasks")
+    student_email = st.text_input("Student Email")
+    task = st.text_area("Task Description")
+    if st.button("Assign Task"):
+        st.success("Task assigned successfully!")
+
+@dashboard_fragment
+def mentor_feedback_page(user):
+    st.header("Provide Feedback")
+    student_email = st.text_input("Student Email")
+    rating = st.slider("Rating", 1, 5, 3)
+    comments = st.text_area("Comments")
+    if st.button("Submit Feedback"):
+        student = resolve_user(student_email, create=False)
+        if student:
+            if log_feedback(student["id"], rating, comments):
+                st.success("Feedback received!")
+            else:
+                st.error("Could not send the feedback right now. Please try again.")
+        else:
+            st.error("Student not found.")
+
+# --- MSME Pages ---
+@dashboard_fragment
+def project_needs_page(user):
+    st.header("Submit Project Need")
+    title = st.text_input("Project Title")
+    desc = st.text_area("Project Description")
+    if st.button("Submit Need"):
+        if log_project(None, title, desc, "Open", sync=True):
+            st.success("Project need submitted!")
+        else:
+            st.error("Could not submit the project need right now. Please try again.")
+
+@dashboard_fragment
+def review_interns_page(user):
+    st.header("Review Interns")
+    projects, next_after_id = fetch_open_projects_page(page_cursor("open_projects"))
+    if not projects:
+        st.info("No open projects to staff.")
+    matches = match_students([p[0] for p in projects])
+    for project_id, title, desc in projects:
+        with st.expander(title):
+            st.caption(desc or "")
+            candidates = matches.get(project_id, [])
+            if not candidates:
+                st.info("No matching interns yet.")
+            for c in candidates:
+                info_col, assign_col = st.columns([4, 1])
+                with info_col:
+                    st.markdown(f"**{c['name']}** ({c['email']}, {c['org'] or '—'}) · match {c['score']:.2f}")
+                with assign_col:
+                    if st.button("Assign", key=f"assign_{project_id}_{c['student_id']}"):
+                        if assign_project(project_id, c["student_id"]):
+                            st.success(f"Assigned {title} to {c['name']}!")
+                        else:
+                            st.error("This project was already assigned.")
+    page_controls("open_projects", next_after_id)
+
+@dashboard_fragment
+def digitalization_page(user):
+    st.header("Digitalization Dashboard")
+    st.markdown("Track your digital transformation progress.")
+    website_live = st.checkbox("Website Live")
+    crm_setup = st.checkbox("CRM Setup")
+    satisfaction = st.slider("Satisfaction Score", 1, 5, 3)
+    if st.button("Submit Progress"):
+        st.success("Progress updated!")
+
+# --- Regional Impact ---
+# Chart label -> rollup summary column
+REGIONAL_MEASURES = {
+    "Internships": "internships",
+    "MSMEs Digitalized": "msmes_digitalized",
+    "Projects": "projects",
+    "Feedback Sessions": "feedback",
+    "Average Rating": "avg_rating",
+}
+
+def regional_trend(rollups, measure, top_n):
+    """Bucket x region table of ``measure`` for the ``top_n`` busiest regions."""
+    by_region = summarize_rollups(rollups, ["bucket", "region"])
+    leaders = summarize_rollups(rollups, "region").nlargest(top_n, measure)["region"]
+    by_region = by_region[by_region["region"].isin(leaders)]
+    return by_region.pivot(index="bucket", columns="region", values=measure).sort_index()
+
+@dashboard_fragment
+def regional_impact_page(user):
+    st.header("Regional Impact")
+    st.markdown("View the impact of internships across regions.")
+    metrics = fetch_metrics(user["role"])
+    metrics_data = {"Colleges": metrics.get("colleges_onboarded", 0), "Engagement": metrics.get("total_engagement", 0)}
+    st.bar_chart(metrics_data)
+
+    grain_col, range_col = st.columns([1, 2])
+    with grain_col:
+        grain = st.radio("Granularity", ["monthly", "daily"], format_func=str.capitalize, horizontal=True)
+    with range_col:
+        today = date.today()
+        dates = st.date_input("Date range", value=(today - timedelta(days=365), today))
+    rollups = fetch_rollups(
+        grain,
+        start=dates[0].isoformat() if len(dates) > 0 else None,
+        end=(dates[1] + timedelta(days=1)).isoformat() if len(dates) > 1 else None,
+    )
+    if rollups.empty:
+        st.info("No activity recorded in this period.")
+    else:
+        measure_col, region_col, top_col = st.columns([1, 2, 1])
+        with measure_col:
+            label = st.selectbox("Measure", list(REGIONAL_MEASURES))
+            measure = REGIONAL_MEASURES[label]
+        with region_col:
+            regions = st.multiselect("Regions", sorted(rollups["region"].unique()))
+        with top_col:
+            top_n = st.number_input("Top N", min_value=1, max_value=50, value=10)
+        if regions:
+            rollups = rollups[rollups["region"].isin(regions)]
+        st.subheader(f"{label} by Region")
+        st.line_chart(regional_trend(rollups, measure, top_n))
+        table_col1, table_col2 = st.columns(2)
+        with table_col1:
+            st.subheader("Top Regions")
+            st.dataframe(summarize_rollups(rollups, "region").nlargest(top_n, measure),
+                         hide_index=True, use_container_width=True)
+        with table_col2:
+            st.subheader("Top Organisations")
+            st.dataframe(summarize_rollups(rollups, ["org", "region"]).nlargest(top_n, measure),
+                         hide_index=True, use_container_width=True)
+
+# --- Navigation ---
+# Sidebar label -> page function; admins also get ADMIN_PAGES.
+ADMIN_PAGES = {
+    "Bulk Import": bulk_import_page,
+    "Data Export": data_export_page,
+    "Performance": performance_page,
+}
+ROLE_PAGES = {
+    "student": {
+        "Your Progress": progress_page,
+        "Log Internship": log_internship_page,
+        "Upskilling": upskilling_page,
+        "Opportunities": opportunities_page,
+        "Feedback": student_feedback_page,
+    },
+    "college": {"Student Performance": student_performance_page, "Upload Projects": upload_projects_page},
+    "mentor": {
+        "Guide Students": guide_students_page,
+        "Assign Tasks": assign_tasks_page,
+        "Feedback": mentor_feedback_page,
+        "Search": search_page,
+    },
+    "msme": {
+        "Project Needs": project_needs_page,
+        "Review Interns": review_interns_page,
+        "Digitalization Dashboard": digitalization_page,
+        "Search": search_page,
+    },
+    "government": {"Regional Impact": regional_impact_page},
+}
 
 def main():
+    with perf_section("css"):
+        inject_css()
+
     # Initialize database
-    initialize_database()
+    with perf_section("initialize_database"):
+        initialize_database()
 
     # --- Login Page ---
-    st.title("🌟 Welcome to Ky'ra")
-    st.markdown("Ky'ra is here to guide your internship journey. Let's begin.")
-    
-    col1, col2 = st.columns([2, 1])
-    with col1:
-        email = st.text_input("Enter your email", key="login_email")
-        role = st.selectbox("Select your role", ["Student", "College", "Mentor", "MSME", "Government"])
-        if st.button("Login 🚀"):
-            with st.spinner("Verifying your profile..."):
-                user_data = fetch_user_data(email)
-                if not user_data:
-                    name = email.split("@")[0].capitalize()
-                    conn = get_connection()
-                    cur = conn.cursor()
-                    cur.execute("INSERT INTO users (name, email, role, org) VALUES (?, ?, ?, ?)",
-                                (name, email, role.lower(), "Unknown"))
-                    conn.commit()
-                    cur.close()
-                    user_data = fetch_user_data(email)
-                st.session_state.user = user_data
-                st.session_state.page = "Dashboard"
-                st.rerun()
-    
-    with col2:
-        st.markdown("### Choose Your Journey")
-        roles = {
-            "Student": "Track your learning and internships.",
-            "College": "Monitor student progress.",
-            "Mentor": "Guide your mentees.",
-            "MSME": "Digitalize your business.",
-            "Government": "View regional impact."
-        }
-        for r, desc in roles.items():
-            st.markdown(f"**{r}**: {desc}")
+    with perf_section("login"):
+        st.title("🌟 Welcome to Ky'ra")
+        st.markdown("Ky'ra is here to guide your internship journey. Let's begin.")
+
+        col1, col2 = st.columns([2, 1])
+        with col1:
+            email = st.text_input("Enter your email", key="login_email")
+            role = st.selectbox("Select your role", ["Student", "College", "Mentor", "MSME", "Government"])
+            admin_token = ""
+            if ADMIN_LOGIN_ENABLED:
+                admin_token = st.text_input("Admin token (admins only)", type="password")
+            if st.button("Login 🚀"):
+                if admin_token and not check_admin_token(email, admin_token):
+                    st.error("That admin token is not valid for this email.")
+                    st.stop()
+                with st.spinner("Verifying your profile..."):
+                    user_data = resolve_user(email, role.lower())
+                if user_data:
+                    st.session_state.user = dict(user_data, admin=bool(admin_token))
+                    st.session_state.page = "Dashboard"
+                    st.rerun()
+                else:
+                    st.error("Could not sign you in right now. Please try again.")
+
+        with col2:
+            st.markdown("### Choose Your Journey")
+            roles = {
+                "Student": "Track your learning and internships.",
+                "College": "Monitor student progress.",
+                "Mentor": "Guide your mentees.",
+                "MSME": "Digitalize your business.",
+                "Government": "View regional impact."
+            }
+            for r, desc in roles.items():
+                st.markdown(f"**{r}**: {desc}")
 
     # --- Dashboard ---
     if hasattr(st.session_state, 'page') and st.session_state.page == "Dashboard" and hasattr(st.session_state, 'user') and st.session_state.user:
@@ -347,180 +668,26 @@ def main():
         role = user["role"]
         
         # Sidebar
-        st.sidebar.image("https://via.placeholder.com/150x50?text=Ky'ra+Logo", use_column_width=True)
-        st.sidebar.markdown(f"### Hi, {user['name']}!")
-        st.sidebar.markdown(f"Role: {role.capitalize()}")
-        menu_options = {
-            "student": ["Your Progress", "Log Internship", "Upskilling", "Opportunities", "Feedback"],
-            "college": ["Student Performance", "Upload Projects"],
-            "mentor": ["Guide Students", "Assign Tasks", "Feedback"],
-            "msme": ["Project Needs", "Review Interns", "Digitalization Dashboard"],
-            "government": ["Regional Impact"]
-        }
-        choice = st.sidebar.selectbox("Navigate", menu_options.get(role, ["Your Progress"]))
+        with perf_section("sidebar"):
+            st.sidebar.image("https://via.placeholder.com/150x50?text=Ky'ra+Logo", use_column_width=True)
+            st.sidebar.markdown(f"### Hi, {user['name']}!")
+            st.sidebar.markdown(f"Role: {role.capitalize()}")
+            role_pages = ROLE_PAGES.get(role, {})
+            pages = list(role_pages)
+            if is_admin(user):
+                pages = pages + [p for p in ADMIN_PAGES if p not in pages]
+            choice = st.sidebar.selectbox("Navigate", pages)
         
         # Main Content
         st.title(f"🌟 Ky'ra: Your {role.capitalize()} Journey")
         st.markdown(f"How can Ky'ra help you today, {user['name']}?")
         
-        # Metrics
-        metrics = fetch_metrics(role)
-        cols = st.columns(3)
-        for i, (key, value) in enumerate(metrics.items()):
-            with cols[i % 3]:
-                st.markdown(f"""
-                    <div class="metric-card">
-                        <h3>{key.replace('_', ' ').title()}</h3>
-                        <p style="font-size: 24px; color: #50C878;">{value}</p>
-                    </div>
-                """, unsafe_allow_html=True)
-        
-        # Ky'ra Chatbot
-        st.markdown("### Ask Ky'ra")
-        prompt = st.text_input("Your question or task", key="kyra_prompt")
-        if st.button("Submit to Ky'ra 🤖"):
-            with st.spinner("Ky'ra is thinking..."):
-                response = query_kyra_api(prompt)
-                log_query(user["id"], prompt, response)
-                st.success(response)
-        
-        # Role-Specific Dashboards
-        if role == "student":
-            if choice == "Your Progress":
-                st.header("Your Progress")
-                st.markdown("You're doing great! Let's continue.")
-                for internship in user["internships"]:
-                    st.markdown(f"""
-                        <div class="metric-card">
-                            <h3>{internship['company_name']}</h3>
-                            <p>Duration: {internship['duration']}</p>
-                            <p>Feedback: {internship['feedback'] or 'N/A'}</p>
-                            <p>MSMEs Digitalized: {internship['msme_digitalized']}</p>
-                        </div>
-                    """, unsafe_allow_html=True)
-            
-            elif choice == "Log Internship":
-                st.header("🛠️ Log Internship")
-                company = st.text_input("Company Name")
-                duration = st.text_input("Duration (e.g., 3 months)")
-                feedback = st.text_area("Feedback")
-                msme_digitalized = st.number_input("MSMEs Digitalized", min_value=0)
-                if st.button("Submit Internship"):
-                    if company and duration:
-                        with st.spinner("Saving your internship..."):
-                            success = log_internship(user["email"], company, duration, feedback, msme_digitalized)
-                        if success:
-                            st.success("Internship logged successfully! 🎉")
-                            st.balloons()
-                    else:
-                        st.error("Please fill in all required fields.")
-            
-            elif choice == "Upskilling":
-                st.header("📚 Upskilling Journey")
-                st.markdown("This small step brings you closer to your purpose.")
-                course = st.text_input("Enrolled Course")
-                hours = st.number_input("Learning Hours Completed", min_value=0)
-                project_title = st.text_input("Project Title")
-                project_desc = st.text_area("Project Description")
-                if st.button("Submit Project"):
-                    if course and project_title:
-                        log_project(user["id"], project_title, project_desc, "Submitted")
-                        st.success("Project submitted successfully!")
-            
-            elif choice == "Opportunities":
-                st.header("🚀 Opportunities")
-                st.info("Explore new internships soon!")
-            
-            elif choice == "Feedback":
-                st.header("🗣️ Share Your Feedback")
-                rating = st.slider("Rate your experience", 1, 5, 3)
-                comments = st.text_area("Comments")
-                if st.button("Submit Feedback"):
-                    with st.spinner("Submitting feedback..."):
-                        if log_feedback(user["id"], rating, comments):
-                            st.success("Thanks for your feedback! 🌟")
-        
-        elif role == "college":
-            if choice == "Student Performance":
-                st.header("Student Performance")
-                conn = get_connection()
-                cur = conn.cursor()
-                cur.execute("SELECT name, email FROM users WHERE role = ?", ("student",))
-                students = cur.fetchall()
-                cur.close()
-                for student in students:
-                    st.markdown(f"""
-                        <div class="metric-card">
-                            <h3>{student[0]}</h3>
-                            <p>Email: {student[1]}</p>
-                        </div>
-                    """, unsafe_allow_html=True)
-            
-            elif choice == "Upload Projects":
-                st.header("Upload Projects")
-                title = st.text_input("Project Title")
-                desc = st.text_area("Project Description")
-                if st.button("Upload Project"):
-                    log_project(None, title, desc, "Open")
-                    st.success("Project uploaded successfully!")
-        
-        elif role == "mentor":
-            if choice == "Guide Students":
-                st.header("Guide Students")
-                st.info("Assign tasks and provide feedback soon!")
-            
-            elif choice == "Assign Tasks":
-                st.header("Assign Tasks")
-                student_email = st.text_input("Student Email")
-                task = st.text_area("Task Description")
-                if st.button("Assign Task"):
-                    st.success("Task assigned successfully!")
-            
-            elif choice == "Feedback":
-                st.header("Provide Feedback")
-                student_email = st.text_input("Student Email")
-                rating = st.slider("Rating", 1, 5, 3)
-                comments = st.text_area("Comments")
-                if st.button("Submit Feedback"):
-                    conn = get_connection()
-                    cur = conn.cursor()
-                    cur.execute("SELECT id FROM users WHERE email = ?", (student_email,))
-                    student = cur.fetchone()
-                    if student:
-                        log_feedback(student[0], rating, comments)
-                        st.success("Feedback submitted!")
-                    else:
-                        st.error("Student not found.")
-                    cur.close()
-        
-        elif role == "msme":
-            if choice == "Project Needs":
-                st.header("Submit Project Need")
-                title = st.text_input("Project Title")
-                desc = st.text_area("Project Description")
-                if st.button("Submit Need"):
-                    log_project(None, title, desc, "Open")
-                    st.success("Project need submitted!")
-            
-            elif choice == "Review Interns":
-                st.header("Review Interns")
-                st.info("Review matched interns soon!")
-            
-            elif choice == "Digitalization Dashboard":
-                st.header("Digitalization Dashboard")
-                st.markdown("Track your digital transformation progress.")
-                website_live = st.checkbox("Website Live")
-                crm_setup = st.checkbox("CRM Setup")
-                satisfaction = st.slider("Satisfaction Score", 1, 5, 3)
-                if st.button("Submit Progress"):
-                    st.success("Progress updated!")
-        
-        elif role == "government":
-            if choice == "Regional Impact":
-                st.header("Regional Impact")
-                st.markdown("View the impact of internships across regions.")
-                metrics_data = {"Colleges": metrics.get("colleges_onboarded", 0), "Engagement": metrics.get("total_engagement", 0)}
-                st.bar_chart(metrics_data)
+        # Each section is a fragment, so its widgets rerun only that section.
+        metrics_strip(role)
+        chatbot(user)
+        page = role_pages.get(choice) or ADMIN_PAGES.get(choice)
+        if page is not None:
+            page(user)
 
 if __name__ == "__main__":
     # Initialize session state
@@ -528,4 +695,5 @@ if __name__ == "__main__":
         st.session_state.page = "Login"
     if not hasattr(st.session_state, 'user'):
         st.session_state.user = None
-    main()
\ No newline at end of file
+    with perf_section("rerun"):
+        main()
\ No newline at end of file
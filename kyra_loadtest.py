@@ -0,0 +1,400 @@
+# -*- coding: utf-8 -*-
+"""kyra_loadtest.py
+
+Concurrent-session load test for the dashboard, driven through Streamlit's AppTest.
+
+Usage:
+    python kyra_loadtest.py --scale 20000 --sessions 1 10 50 200 --output load_results.json
+    python kyra_loadtest.py --db bench.db --sessions 50 --flows 5 --max-error-rate 0.01
+
+Every session is an AppTest instance on its own thread, all in one
+process, so they share kyra_data's connection pools, caches and
+write-behind queue the way browser sessions share a Streamlit server.
+A session logs in as a seeded user of its role (a share of sessions log
+in with brand-new emails, two sessions per email, to race first logins),
+lands on the dashboard and submits that role's forms. Each
+``AppTest.run()`` is timed as one rerun. AppTest always reruns the whole
+script, even for widgets inside fragments, so rerun latencies are an
+upper bound on what a browser session sees.
+
+The Ky'ra API is served by kyra_stub_server, and the database errors
+reported come from kyra_data's instrumentation, which is switched on.
+
+Running AppTest sessions side by side patches Streamlit internals (see
+``concurrent_apptest``), so the load test only runs on the Streamlit
+version it was written against, STREAMLIT_VERSION, and refuses to start
+on any other.
+"""
+
+import argparse
+import json
+import os
+import platform
+import random
+import sqlite3
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+
+from kyra_bench import _percentile, generate_dataset
+
+APP_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "kyra_internship_dashboard.py")
+
+# Session role mix; every role gets enough sessions to exercise its flow.
+LOAD_ROLE_WEIGHTS = {"student": 0.6, "mentor": 0.1, "msme": 0.1, "college": 0.1, "government": 0.1}
+LOGIN_ROLES = {"student": "Student", "college": "College", "mentor": "Mentor", "msme": "MSME",
+               "government": "Government"}
+RERUN_TIMEOUT = 60
+# The Streamlit release whose internals concurrent_apptest patches; keep in step with requirements.txt.
+STREAMLIT_VERSION = "1.36.0"
+
+# Database error messages by the category they are reported under.
+ERROR_CATEGORIES = {
+    "lock_timeout": ("database is locked", "database table is locked", "pool exhausted"),
+    "integrity_error": ("IntegrityError", "constraint failed"),
+}
+
+
+def classify_error(message):
+    for category, needles in ERROR_CATEGORIES.items():
+        if any(needle in message for needle in needles):
+            return category
+    return "other_error"
+
+
+def check_streamlit_version():
+    """Raise RuntimeError unless the installed Streamlit is STREAMLIT_VERSION."""
+    import streamlit
+    if streamlit.__version__ != STREAMLIT_VERSION:
+        raise RuntimeError(f"the load test patches Streamlit {STREAMLIT_VERSION} internals, "
+                           f"but Streamlit {streamlit.__version__} is installed")
+
+
+@contextmanager
+def concurrent_apptest():
+    """Let AppTest sessions run on many threads at once.
+
+    AppTest assumes one test at a time: every run installs a mock
+    Runtime in a process global, clears it when done, patches a config
+    option around itself and compiles the script afresh (and CPython's
+    parser is not safe to run on several threads at once). While this is
+    active a cleared global falls back to one shared mock runtime, the
+    option stays set and each script is compiled once per process, as a
+    Streamlit server does.
+
+    Runtime.instance, Runtime.exists and ScriptCache.get_bytecode are
+    private, so this checks the installed version first.
+    """
+    from unittest import mock
+
+    check_streamlit_version()
+
+    from streamlit.runtime import Runtime
+    from streamlit.runtime.caching.storage.dummy_cache_storage import MemoryCacheStorageManager
+    from streamlit.runtime.media_file_manager import MediaFileManager
+    from streamlit.runtime.memory_media_file_storage import MemoryMediaFileStorage
+    from streamlit.runtime.scriptrunner.script_cache import ScriptCache
+    from streamlit.testing.v1.util import patch_config_options
+
+    shared = mock.MagicMock(spec=Runtime)
+    shared.media_file_mgr = MediaFileManager(MemoryMediaFileStorage("/mock/media"))
+    shared.cache_storage_manager = MemoryCacheStorageManager()
+    compile_script = ScriptCache.get_bytecode
+    compiled = {}
+    compile_lock = threading.Lock()
+
+    def get_bytecode(self, script_path):
+        with compile_lock:
+            if script_path not in compiled:
+                compiled[script_path] = compile_script(self, script_path)
+            return compiled[script_path]
+
+    with mock.patch.object(Runtime, "instance", classmethod(lambda cls: cls._instance or shared)), \
+            mock.patch.object(Runtime, "exists", classmethod(lambda cls: True)), \
+            mock.patch.object(ScriptCache, "get_bytecode", get_bytecode), \
+            patch_config_options({"global.appTest": True}):
+        yield
+
+
+class FlowFailed(Exception):
+    """A scripted step did not produce the element or message it expects."""
+
+
+class Session:
+    """One AppTest session; ``rerun`` times each script run and records what went wrong."""
+
+    def __init__(self, app_path, stats, timeout=RERUN_TIMEOUT):
+        from streamlit.testing.v1 import AppTest
+        self.at = AppTest.from_file(app_path, default_timeout=timeout)
+        self.stats = stats
+
+    def rerun(self, element=None):
+        start = time.perf_counter()
+        try:
+            (element or self.at).run()
+        except RuntimeError as e:
+            self.stats.error("rerun_timeout", str(e))
+            raise FlowFailed(str(e))
+        finally:
+            self.stats.rerun(time.perf_counter() - start)
+        for exc in self.at.exception:
+            self.stats.error(classify_error(exc.value), exc.value)
+        if self.at.exception:
+            raise FlowFailed(self.at.exception[0].value)
+
+    def widget(self, kind, label, sidebar=False):
+        root = self.at.sidebar if sidebar else self.at
+        for element in getattr(root, kind):
+            if element.label == label:
+                return element
+        raise FlowFailed(f"no {kind} labelled {label!r}")
+
+    def fill(self, kind, label, value):
+        self.widget(kind, label).set_value(value)
+
+    def click(self, label, expect=None):
+        self.rerun(self.widget("button", label).click())
+        if expect and not any(expect in s.value for s in self.at.success):
+            errors = [e.value for e in self.at.error]
+            self.stats.error("submit_failed", f"{label}: {errors[0] if errors else 'no confirmation'}")
+            raise FlowFailed(label)
+
+    def open_page(self, page):
+        self.rerun(self.widget("selectbox", "Navigate", sidebar=True).select(page))
+
+    def login(self, email, role):
+        self.rerun()
+        self.at.text_input(key="login_email").input(email)
+        self.widget("selectbox", "Select your role").select(LOGIN_ROLES[role])
+        self.rerun(self.widget("button", "Login 🚀").click())
+        if not self.at.session_state["user"]:
+            self.stats.error("submit_failed", f"login: {email}")
+            raise FlowFailed(f"login as {email}")
+
+    def ask_kyra(self, prompt):
+        self.fill("text_input", "Your question or task", prompt)
+        self.click("Submit to Ky'ra 🤖")
+
+
+def student_flow(session, rng, ctx):
+    session.open_page("Log Internship")
+    session.fill("text_input", "Company Name", rng.choice(ctx["msmes"]))
+    session.fill("text_input", "Duration (e.g., 3 months)", "3 months")
+    session.fill("text_area", "Feedback", "Load test internship")
+    session.click("Submit Internship", expect="Internship logged")
+    session.open_page("Feedback")
+    session.fill("text_area", "Comments", "Load test feedback")
+    session.click("Submit Feedback", expect="Thanks for your feedback")
+    session.ask_kyra("How can I improve my CRM setup skills?")
+    session.open_page("Your Progress")
+
+
+def mentor_flow(session, rng, ctx):
+    session.open_page("Feedback")
+    session.fill("text_input", "Student Email", rng.choice(ctx["emails"]["student"]))
+    session.fill("text_area", "Comments", "Load test mentor feedback")
+    session.click("Submit Feedback", expect="Feedback received")
+
+
+def msme_flow(session, rng, ctx):
+    session.fill("text_input", "Project Title", "Load test inventory tracking")
+    session.fill("text_area", "Project Description", "Help needed with inventory tracking")
+    session.click("Submit Need", expect="Project need submitted")
+    session.open_page("Review Interns")
+
+
+def college_flow(session, rng, ctx):
+    session.fill("text_input", "Search by name, email or org", "Sharma")
+    session.rerun()
+    session.open_page("Upload Projects")
+    session.fill("text_input", "Project Title", "Load test web design")
+    session.fill("text_area", "Project Description", "Student project on web design")
+    session.click("Upload Project", expect="Project uploaded")
+
+
+def government_flow(session, rng, ctx):
+    session.ask_kyra("Which MSMEs need help with digital payments?")
+    session.open_page("Regional Impact")
+
+
+ROLE_FLOWS = {"student": student_flow, "mentor": mentor_flow, "msme": msme_flow, "college": college_flow,
+              "government": government_flow}
+
+
+class LoadStats:
+    """Rerun latencies, errors and completed flows shared by every session thread."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.samples = []
+        self.errors = {}
+        self.examples = {}
+        self.flows = 0
+        self.failed_flows = 0
+
+    def rerun(self, seconds):
+        with self._lock:
+            self.samples.append(seconds)
+
+    def error(self, category, message):
+        with self._lock:
+            self.errors[category] = self.errors.get(category, 0) + 1
+            self.examples.setdefault(category, message)
+
+    def flow(self, ok):
+        with self._lock:
+            self.flows += 1
+            self.failed_flows += not ok
+
+
+def run_session(index, n_flows, ctx, stats, barrier):
+    # Sessions 2k and 2k+1 draw their role and new-user decisions from the same
+    # seed, so every brand-new email is logged in by both at once.
+    pair_rng = random.Random(ctx["seed"] * 100003 + index // 2)
+    rng = random.Random(ctx["seed"] * 100019 + index)
+    role = pair_rng.choices(list(LOAD_ROLE_WEIGHTS), weights=list(LOAD_ROLE_WEIGHTS.values()))[0]
+    barrier.wait()
+    for flow in range(n_flows):
+        if pair_rng.random() < ctx["new_user_share"]:
+            email = f"load-{ctx['run_tag']}-{index // 2}-{flow}@example.com"
+        else:
+            email = rng.choice(ctx["emails"][role])
+        session = Session(ctx["app_path"], stats, ctx["rerun_timeout"])
+        try:
+            session.login(email, role)
+            ROLE_FLOWS[role](session, rng, ctx)
+        except FlowFailed:
+            stats.flow(False)
+        else:
+            stats.flow(True)
+
+
+def run_level(n_sessions, n_flows, ctx, kyra):
+    """Run ``n_sessions`` concurrent sessions of ``n_flows`` flows each and summarize them."""
+    stats = LoadStats()
+    db_errors_before = kyra.get_instrumentation().errors()
+    barrier = threading.Barrier(n_sessions + 1)
+    threads = [threading.Thread(target=run_session, name=f"kyra-load-{i}", daemon=True,
+                                args=(i, n_flows, ctx, stats, barrier)) for i in range(n_sessions)]
+    for t in threads:
+        t.start()
+    barrier.wait()
+    start = time.perf_counter()
+    for t in threads:
+        t.join()
+    seconds = time.perf_counter() - start
+    db_errors = {error: count - db_errors_before.get(error, 0)
+                 for error, count in kyra.get_instrumentation().errors().items()
+                 if count > db_errors_before.get(error, 0)}
+    for error, count in db_errors.items():
+        category = f"db_{classify_error(error)}"
+        stats.errors[category] = stats.errors.get(category, 0) + count
+        stats.examples.setdefault(category, error)
+    samples = sorted(stats.samples) or [0.0]
+    return {
+        "sessions": n_sessions,
+        "flows": stats.flows,
+        "failed_flows": stats.failed_flows,
+        "reruns": len(stats.samples),
+        "seconds": seconds,
+        "p50_ms": _percentile(samples, 50) * 1000,
+        "p95_ms": _percentile(samples, 95) * 1000,
+        "p99_ms": _percentile(samples, 99) * 1000,
+        "max_ms": samples[-1] * 1000,
+        "reruns_per_sec": len(stats.samples) / seconds,
+        "flows_per_sec": stats.flows / seconds,
+        "error_rate": stats.failed_flows / stats.flows if stats.flows else 0.0,
+        "errors": stats.errors,
+        "error_examples": stats.examples,
+        "db_errors": db_errors,
+    }
+
+
+def run_load_test(args, db_path):
+    from kyra_stub_server import start_stub_server
+
+    server, api_url = start_stub_server(token_delay=args.token_delay)
+    os.environ["KYRA_DB_PATH"] = db_path
+    os.environ["KYRA_API_URL"] = api_url
+    os.environ["KYRA_INSTRUMENT"] = "1"
+    import kyra_data as kyra
+    kyra.initialize_database()
+    if args.scale:
+        print(f"Seeding scale {args.scale}...", flush=True)
+        try:
+            generate_dataset(kyra, args.scale, args.seed)
+        except ValueError as e:
+            raise SystemExit(f"Seed failed: {e}")
+    with kyra.db_connection(readonly=True) as conn:
+        emails = {role: [row[0] for row in conn.execute("SELECT email FROM users WHERE role = ? LIMIT 5000", (role,))]
+                  for role in LOAD_ROLE_WEIGHTS}
+        msmes = [row[0] for row in conn.execute("SELECT org FROM users WHERE role = 'msme' LIMIT 1000")]
+    missing = [role for role, found in emails.items() if not found]
+    if missing:
+        raise SystemExit(f"No seeded users for {', '.join(missing)}; seed with kyra_bench.py first")
+    ctx = {"app_path": args.app, "emails": emails, "msmes": msmes or ["MSME 00000"], "seed": args.seed,
+           "new_user_share": args.new_user_share, "rerun_timeout": args.rerun_timeout, "run_tag": time.time_ns()}
+
+    report = {
+        "meta": {
+            "created": datetime.utcnow().isoformat(),
+            "python": platform.python_version(),
+            "sqlite": sqlite3.sqlite_version,
+            "streamlit": STREAMLIT_VERSION,
+            "seed": args.seed,
+            "flows_per_session": args.flows,
+            "new_user_share": args.new_user_share,
+            "write_behind": kyra.WRITE_BEHIND,
+            "read_snapshot": kyra.READ_SNAPSHOT,
+        },
+        "levels": [],
+    }
+    with concurrent_apptest():
+        run_level(1, 1, dict(ctx, new_user_share=0.0), kyra)  # warm-up: imports, caches, indexes
+        for n_sessions in args.sessions:
+            level = run_level(n_sessions, args.flows, ctx, kyra)
+            report["levels"].append(level)
+            errors = ", ".join(f"{k} {v}" for k, v in sorted(level["errors"].items())) or "none"
+            print(f"{n_sessions:>5} sessions  p50 {level['p50_ms']:8.1f} ms  p95 {level['p95_ms']:8.1f} ms  "
+                  f"p99 {level['p99_ms']:8.1f} ms  {level['reruns_per_sec']:7.1f} reruns/s  "
+                  f"{level['flows_per_sec']:6.2f} flows/s  errors: {errors}", flush=True)
+    server.shutdown()
+    return report
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="kyra_loadtest", description="Concurrent-session dashboard load test")
+    parser.add_argument("--db", help="seeded database to run against (default: a fresh temporary one)")
+    parser.add_argument("--scale", type=int, default=0, help="seed this many internships first (needs an empty db)")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--sessions", type=int, nargs="+", default=[1, 10, 50], help="concurrent session counts")
+    parser.add_argument("--flows", type=int, default=3, help="login-to-submit flows per session")
+    parser.add_argument("--new-user-share", type=float, default=0.2, help="share of logins with brand-new emails")
+    parser.add_argument("--token-delay", type=float, default=0.0, help="stub Ky'ra API delay between tokens")
+    parser.add_argument("--rerun-timeout", type=float, default=RERUN_TIMEOUT, help="seconds before a rerun fails")
+    parser.add_argument("--app", default=APP_PATH, help="dashboard script to drive")
+    parser.add_argument("--output", help="write the report as JSON to this file")
+    parser.add_argument("--max-error-rate", type=float, help="fail if any level's failed-flow share is higher")
+    args = parser.parse_args(argv)
+    if not args.db and not args.scale:
+        args.scale = 10000
+    try:
+        check_streamlit_version()
+    except RuntimeError as e:
+        raise SystemExit(f"Load test unavailable: {e}")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        report = run_load_test(args, os.path.abspath(args.db) if args.db else os.path.join(tmp, "load.db"))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"Wrote {args.output}")
+    worst = max(level["error_rate"] for level in report["levels"])
+    if args.max_error_rate is not None and worst > args.max_error_rate:
+        raise SystemExit(f"Failed-flow rate {worst:.1%} exceeds the {args.max_error_rate:.1%} budget")
+
+
+if __name__ == "__main__":
+    main()
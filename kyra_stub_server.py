@@ -0,0 +1,93 @@
+# -*- coding: utf-8 -*-
+"""kyra_stub_server.py
+
+Local stand-in for the Ky'ra generation API, for tests and benchmarks.
+
+Speaks the same protocol as KyraClient: ``POST /v1/generate`` with
+``{"prompt", "role", "stream"}`` streams newline-delimited JSON token
+events followed by ``{"done": true}``.
+
+Usage:
+    python kyra_stub_server.py --port 8765 --token-delay 0.02
+    KYRA_API_URL=http://127.0.0.1:8765 streamlit run kyra_internship_dashboard.py
+"""
+
+import argparse
+import json
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_POST(self):
+        if self.path != "/v1/generate":
+            self.send_error(404)
+            return
+        try:
+            body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))))
+            prompt = body["prompt"]
+        except (ValueError, KeyError):
+            self.send_error(400, "expected a JSON body with a prompt")
+            return
+        self.server.requests_served += 1
+        text = f"Ky'ra response to: {prompt}"
+        if not body.get("stream"):
+            payload = json.dumps({"response": text}).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", "application/x-ndjson")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        for token in re.findall(r"\S+\s*", text):
+            self._write_chunk({"token": token})
+            time.sleep(self.server.token_delay)
+        self._write_chunk({"done": True})
+        self.wfile.write(b"0\r\n\r\n")
+
+    def _write_chunk(self, event):
+        data = (json.dumps(event) + "\n").encode()
+        self.wfile.write(f"{len(data):x}\r\n".encode() + data + b"\r\n")
+        self.wfile.flush()
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_stub_server(host="127.0.0.1", port=0, token_delay=0.0):
+    """Serve the stub API on a daemon thread; returns ``(server, base_url)``.
+
+    Call ``server.shutdown()`` to stop it. ``port=0`` picks a free port.
+    """
+    server = ThreadingHTTPServer((host, port), StubHandler)
+    server.daemon_threads = True
+    server.token_delay = token_delay
+    server.requests_served = 0
+    threading.Thread(target=server.serve_forever, name="kyra-stub-server", daemon=True).start()
+    return server, f"http://{host}:{server.server_address[1]}"
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="kyra_stub_server", description="Local stand-in for the Ky'ra API")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--token-delay", type=float, default=0.02, help="seconds to wait between tokens")
+    args = parser.parse_args(argv)
+    server, url = start_stub_server(args.host, args.port, args.token_delay)
+    print(f"Ky'ra stub API listening on {url}")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,435 @@
+# -*- coding: utf-8 -*-
+"""test_kyra_data.py
+
+Tests for the kyra_data layer. Each test imports a fresh kyra_data bound
+to its own database file; the trigger-maintained stores (metric counters,
+daily/monthly rollups and student summaries) are checked against a full
+rebuild from the base tables.
+"""
+
+import csv
+import gzip
+import io
+import sqlite3
+import sys
+import threading
+import time
+from datetime import datetime, timedelta
+
+import pytest
+
+# --- Fixtures ---
+def import_kyra(monkeypatch, **env):
+    """Import a fresh ``kyra_data`` after setting ``env``; it reads its configuration at import."""
+    for name, value in env.items():
+        monkeypatch.setenv(name, value)
+    monkeypatch.delitem(sys.modules, "kyra_data", raising=False)
+    import kyra_data
+    return kyra_data
+
+@pytest.fixture
+def kyra(tmp_path, monkeypatch):
+    """A fresh ``kyra_data`` module bound to an empty database under ``tmp_path``."""
+    return import_kyra(monkeypatch, KYRA_DB_PATH=str(tmp_path / "kyra.db"), KYRA_WRITE_BEHIND="0")
+
+def seed_baseline(kyra):
+    """Create the version-1 schema and fill it the way the original app did."""
+    kyra.migrate_database(target=1)
+    with kyra.db_connection() as conn:
+        conn.executemany("INSERT INTO users (name, email, role, org) VALUES (?, ?, ?, ?)", [
+            ("Asha", "asha@example.com", "student", "College A"),
+            ("Ben", "ben@example.com", "student", "College B"),
+            ("Chen", "chen@example.com", "student", None),
+            ("Mira", "mira@example.com", "mentor", "Mentor Org"),
+            ("College A", "college@example.com", "college", "College A"),
+        ])
+        conn.executemany("INSERT INTO internships (student_id, company_name, duration, feedback, msme_digitalized) "
+                         "VALUES (?, ?, ?, ?, ?)", [
+            (1, "Acme", "3 months", "", 2), (1, "Globex", "1 month", "", None),
+            (2, "Initech", "2 months", "", 1), (4, "Umbrella", "1 month", "", 5),
+        ])
+        conn.executemany("INSERT INTO feedback (student_id, rating, comments) VALUES (?, ?, ?)", [
+            (1, 5, ""), (1, 3, ""), (2, 4, ""), (2, None, ""), (4, 2, ""), (5, 1, ""),
+        ])
+        conn.executemany("INSERT INTO projects (student_id, title, description, status) VALUES (?, ?, ?, ?)", [
+            (None, "Inventory app", "", "Open"), (1, "Website", "", "Assigned"), (1, "Billing", "", "Assigned"),
+        ])
+
+def maintained_stores(conn, kyra):
+    nonzero = " OR ".join(f"{column} != 0" for column in kyra.ROLLUP_COLUMNS)
+    stores = {"metrics": sorted(conn.execute("SELECT role, metric_name, value FROM metrics"))}
+    for table, _, _ in kyra.ROLLUP_GRAINS.values():
+        # Deletes leave emptied buckets behind; a rebuild never creates them.
+        stores[table] = sorted(conn.execute(f"SELECT * FROM {table} WHERE {nonzero}"))
+    stores["student_summaries"] = sorted(conn.execute("SELECT * FROM student_summaries"))
+    return stores
+
+def assert_matches_rebuild(kyra):
+    with kyra.db_connection() as conn:
+        maintained = maintained_stores(conn, kyra)
+        kyra.rebuild_metrics(conn)
+        kyra.rebuild_rollups(conn)
+        kyra.rebuild_student_summaries(conn)
+        assert maintained_stores(conn, kyra) == maintained
+
+def summary(kyra, student_id):
+    with kyra.db_connection(readonly=True) as conn:
+        return conn.execute("SELECT org, ratings, rating_sum, internships, msmes_digitalized "
+                            "FROM student_summaries WHERE student_id = ?", (student_id,)).fetchone()
+
+# --- Metrics Store and Rollups ---
+def test_migrating_baseline_data_matches_rebuild(kyra):
+    seed_baseline(kyra)
+    assert kyra.migrate_database() == (1, len(kyra.MIGRATIONS))
+    assert_matches_rebuild(kyra)
+    assert summary(kyra, 1) == ("College A", 2, 8, 2, 2)
+    assert summary(kyra, 3) == ("Unknown", 0, 0, 0, 0)
+
+def test_writes_keep_stores_consistent(kyra):
+    seed_baseline(kyra)
+    kyra.migrate_database()
+    assert kyra.log_internship("chen@example.com", "Hooli", "2 months", "", 3)
+    assert kyra.log_internship("new@example.com", "Pied Piper", "1 month", "", 1)
+    assert kyra.log_feedback(3, 4, "", sync=True)
+    assert kyra.log_project(None, "Catalogue", "", "Open", sync=True)
+    with kyra.db_connection() as conn:
+        conn.execute("UPDATE projects SET student_id = 2, status = 'Assigned' WHERE project_id = 1")
+        conn.execute("UPDATE projects SET student_id = NULL WHERE project_id = 3")
+        conn.execute("UPDATE feedback SET rating = 1 WHERE feedback_id = 1")
+        conn.execute("UPDATE feedback SET rating = 5 WHERE rating IS NULL")
+        conn.execute("UPDATE internships SET msme_digitalized = 4 WHERE msme_digitalized IS NULL")
+        conn.execute("UPDATE internships SET student_id = 2 WHERE internship_id = 1")
+        conn.execute("UPDATE users SET org = 'College C' WHERE id = 3")
+        conn.execute("DELETE FROM feedback WHERE feedback_id = 2")
+        conn.execute("DELETE FROM internships WHERE internship_id = 3")
+        conn.execute("DELETE FROM projects WHERE project_id = 2")
+    assert_matches_rebuild(kyra)
+    with kyra.db_connection() as conn:
+        conn.execute("DELETE FROM users WHERE id = 2")
+        conn.execute("DELETE FROM internships WHERE student_id = 2")
+    assert_matches_rebuild(kyra)
+    assert summary(kyra, 2) is None
+
+# --- Student Summaries ---
+def test_role_changes_move_users_in_and_out_of_summaries(kyra):
+    seed_baseline(kyra)
+    kyra.migrate_database()
+    assert summary(kyra, 4) is None
+    assert kyra.log_feedback(4, 5, "", sync=True)
+    assert summary(kyra, 4) is None
+    assert_matches_rebuild(kyra)
+
+    with kyra.db_connection() as conn:
+        conn.execute("UPDATE users SET role = 'student' WHERE id = 4")
+    assert summary(kyra, 4) == ("Mentor Org", 2, 7, 1, 5)
+    assert_matches_rebuild(kyra)
+
+    with kyra.db_connection() as conn:
+        conn.execute("UPDATE users SET role = 'mentor', org = 'Mentor Org 2' WHERE id = 1")
+        conn.execute("INSERT INTO feedback (student_id, rating, comments) VALUES (1, 4, '')")
+        conn.execute("UPDATE internships SET student_id = 1 WHERE internship_id = 3")
+    assert summary(kyra, 1) is None
+    assert summary(kyra, 2) == ("College B", 1, 4, 0, 0)
+    assert_matches_rebuild(kyra)
+
+def test_leaderboard_pages_rank_ties_and_percentiles(kyra):
+    kyra.initialize_database()
+    internships = {1: 3, 2: 1, 3: 3, 4: 0, 5: 2, 6: 1}
+    ratings = {1: [5, 5, 4], 2: [5, 5], 3: [4, 4, 4]}
+    with kyra.db_connection() as conn:
+        conn.executemany("INSERT INTO users (name, email, role, org) VALUES (?, ?, ?, ?)", [
+            (f"Student {i}", f"s{i}@example.com", "student", "College A" if i % 2 else "College B")
+            for i in internships
+        ] + [("Mira", "mira@example.com", "mentor", "College A")])
+        conn.executemany("INSERT INTO internships (student_id, company_name, duration, feedback) VALUES (?, ?, ?, '')",
+                         [(i, f"Company {i}", "1 month") for i, n in internships.items() for _ in range(n)]
+                         + [(7, "Company 7", "1 month")] * 5)
+        conn.executemany("INSERT INTO feedback (student_id, rating, comments) VALUES (?, ?, '')",
+                         [(i, rating) for i, given in ratings.items() for rating in given])
+
+    def walk(metric, org=None):
+        pages, after = [], None
+        while True:
+            rows, after = kyra.fetch_leaderboard(metric, org, after, page_size=2)
+            pages.append([(row["rank"], row["id"]) for row in rows])
+            if after is None:
+                return pages
+
+    assert walk("internships") == [[(1, 3), (2, 1)], [(3, 5), (4, 6)], [(5, 2), (6, 4)]]
+    assert walk("internships", "College A") == [[(1, 3), (2, 1)], [(3, 5)]]
+    assert walk("avg_rating") == [[(1, 1), (2, 3)]]  # Student 2 has too few ratings
+    assert kyra.fetch_leaderboard_percentiles("internships", percentiles=(0, 50, 100)) == \
+        {"students": 6, 0: 0, 50: 1, 100: 3}
+    assert kyra.fetch_leaderboard_percentiles("avg_rating", org="College B") == {}
+    with pytest.raises(ValueError):
+        kyra.fetch_leaderboard("age")
+
+# --- Full-Text Search ---
+@pytest.mark.parametrize("text, expected", [
+    ("inventory app", '"inventory" "app"*'),
+    ('NEAR(a b) OR "x', '"near" "a" "b" "or" "x"*'),
+    ("title:web* -excluded", '"title" "web" "excluded"*'),
+    ("?!  --", ""),
+])
+def test_fts_query_quotes_user_input(kyra, text, expected):
+    assert kyra.fts_query(text) == expected
+
+def test_search_text_ranks_pages_and_hides_other_users_queries(kyra):
+    kyra.migrate_database()
+    asha = kyra.resolve_user("asha@example.com")["id"]
+    ben = kyra.resolve_user("ben@example.com")["id"]
+    for i in range(5):
+        assert kyra.log_project(None, f"Inventory tracker {i}", "stock counts", "Open", sync=True)
+    assert kyra.log_project(None, "Website", "inventory mentioned once", "Open", sync=True)
+    assert kyra.log_query(asha, "How do I track inventory?", "Use a ledger", sync=True)
+    assert kyra.log_query(ben, "Inventory for a bakery", "Count daily", sync=True)
+
+    results, next_offset = kyra.search_text("invent", kinds=["projects"], page_size=4)
+    assert next_offset == 4 and len(results) == 4
+    assert all(r["title"].startswith("Inventory tracker") and "**" in r["snippet"] for r in results)
+    rest, next_offset = kyra.search_text("invent", kinds=["projects"], offset=4, page_size=4)
+    assert next_offset is None and [r["title"] for r in rest][-1] == "Website"
+
+    mine, _ = kyra.search_text("inventory", kinds=["queries"], owner_id=asha)
+    assert [r["title"] for r in mine] == ["How do I track inventory?"]
+    everyone, _ = kyra.search_text("inventory", kinds=["queries"])
+    assert len(everyone) == 2
+    assert kyra.search_text('" OR *', kinds=["queries"]) == ([], None)
+
+# --- User Resolution ---
+def test_concurrent_first_logins_create_one_user(kyra):
+    kyra.initialize_database()
+    start = threading.Barrier(8)
+    users = []
+
+    def login():
+        start.wait()
+        users.append(kyra.resolve_user("new@example.com", org="College A"))
+
+    threads = [threading.Thread(target=login) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(users) == 8 and None not in users
+    assert len({user["id"] for user in users}) == 1
+    with kyra.db_connection(readonly=True) as conn:
+        assert conn.execute("SELECT COUNT(*) FROM users WHERE email = 'new@example.com'").fetchone()[0] == 1
+
+def test_resolve_users_creates_only_unknown_emails(kyra):
+    seed_baseline(kyra)
+    kyra.initialize_database()
+    users = kyra.resolve_users(["asha@example.com", "zed@example.com", "asha@example.com"], role="mentor")
+    assert users["asha@example.com"]["id"] == 1 and users["asha@example.com"]["role"] == "student"
+    assert users["zed@example.com"] == dict(users["zed@example.com"], name="Zed", role="mentor", org=kyra.UNKNOWN_TAG)
+    assert kyra.resolve_user("nobody@example.com", create=False) is None
+    assert kyra.fetch_user_data("zed@example.com")["id"] == users["zed@example.com"]["id"]
+
+# --- Student Directory ---
+def test_students_page_walks_keyset_pages_and_escapes_search(kyra):
+    kyra.initialize_database()
+    with kyra.db_connection() as conn:
+        conn.executemany("INSERT INTO users (name, email, role, org) VALUES (?, ?, ?, ?)", [
+            (f"Student {i}", f"s{i}@example.com", "student", "Top 10% College" if i % 2 else "College_B")
+            for i in range(7)
+        ] + [("Mira", "mira@example.com", "mentor", "Top 10% College")])
+
+    def walk(search=""):
+        pages, after = [], 0
+        while after is not None:
+            rows, after = kyra.fetch_students_page(search, after, page_size=3)
+            pages.append([row[0] for row in rows])
+        return pages
+
+    assert walk() == [[1, 2, 3], [4, 5, 6], [7]]
+    assert walk("10%") == [[2, 4, 6]]
+    assert walk(" COLLEGE_b ") == [[1, 3, 5], [7]]
+    assert walk("s1@") == [[2]]
+    assert kyra.fetch_students_page("_B%") == ([], None)
+
+# --- Matching Engine ---
+def test_matching_ranks_by_history_and_tracks_assignments(kyra):
+    kyra.initialize_database()
+    with kyra.db_connection() as conn:
+        conn.executemany("INSERT INTO users (name, email, role, org) VALUES (?, ?, ?, ?)", [
+            ("Asha", "asha@example.com", "student", "College A"),
+            ("Ben", "ben@example.com", "student", "College B"),
+        ])
+        conn.executemany("INSERT INTO internships (student_id, company_name, duration, feedback) VALUES (?, ?, ?, ?)", [
+            (1, "Acme", "3 months", "Built inventory dashboards in python"),
+            (2, "Globex", "2 months", "Designed pottery glazes for retail"),
+        ])
+        conn.executemany("INSERT INTO projects (student_id, title, description, status) VALUES (?, ?, ?, ?)", [
+            (None, "Inventory dashboard", "python reporting", "Open"),
+            (None, "Glaze catalogue", "pottery retail photos", "Open"),
+        ])
+    matches = kyra.match_students([1, 2, 99])
+    assert set(matches) == {1, 2}
+    assert [m["student_id"] for m in matches[1]][:1] == [1]
+    assert [m["email"] for m in matches[2]][:1] == ["ben@example.com"]
+    assert [p["project_id"] for p in kyra.match_projects(1)][:1] == [1]
+
+    # Rows written after the first query are picked up by the next one.
+    kyra.log_project(None, "Python inventory audit", "dashboards", "Open", sync=True)
+    assert 3 in [p["project_id"] for p in kyra.match_projects(1)]
+
+    assert kyra.assign_project(1, 1) and not kyra.assign_project(1, 2)
+    with kyra.db_connection() as conn:  # closed behind the index's back
+        conn.execute("UPDATE projects SET status = 'Closed' WHERE project_id = 3")
+    assert kyra.match_projects(1) == []  # nothing left that shares a word with Asha's history
+    assert [p["project_id"] for p in kyra.match_projects(2)] == [2]
+    assert not kyra.match_students([1]).get(1)
+    assert kyra.match_projects(99) == []
+
+# --- Query Retention ---
+def test_archive_moves_old_queries_and_history_pages_across_archives(kyra):
+    kyra.initialize_database()
+    recent = (datetime.utcnow() - timedelta(days=1)).isoformat()
+    stamps = ["2024-01-05T10:00:00", "2024-01-20T10:00:00", "2024-01-20T10:00:00", "2024-02-11T09:30:00",
+              "2024-04-01T00:00:00", recent, recent]
+    with kyra.db_connection() as conn:
+        conn.executemany("INSERT INTO users (name, email, role, org) VALUES (?, ?, ?, ?)", [
+            ("Asha", "asha@example.com", "student", "College A"), ("Ben", "ben@example.com", "student", "College B"),
+        ])
+        conn.executemany("INSERT INTO queries (user_id, prompt, response, timestamp) VALUES (?, ?, ?, ?)",
+                         [(1, f"prompt {i}", f"answer {i}", stamp) for i, stamp in enumerate(stamps)]
+                         + [(2, "other", "not yours", "2024-01-06T00:00:00")])
+    assert kyra.archive_queries(older_than_days=30, batch_rows=2) == {"2024-01": 4, "2024-02": 1, "2024-04": 1}
+    assert kyra.archive_queries(older_than_days=30) == {}
+    assert kyra.archived_months() == ["2024-04", "2024-02", "2024-01"]
+    with kyra.db_connection(readonly=True) as conn:
+        assert conn.execute("SELECT COUNT(*) FROM queries").fetchone()[0] == 2
+
+    pages, before = [], None
+    while True:
+        rows, before = kyra.fetch_query_history(user_id=1, before=before, page_size=2)
+        pages.append([(row["query_id"], row["response"], row["archived"]) for row in rows])
+        if before is None:
+            break
+    assert pages == [
+        [(7, "answer 6", False), (6, "answer 5", False)],
+        [(5, "answer 4", True), (4, "answer 3", True)],
+        [(3, "answer 2", True), (2, "answer 1", True)],
+        [(1, "answer 0", True)],
+    ]
+    rows, before = kyra.fetch_query_history(start="2024-01-10", end="2024-03-01")
+    assert [row["query_id"] for row in rows] == [4, 3, 2] and before is None
+
+# --- Write-Behind Group Commit ---
+@pytest.fixture
+def writer_kyra(kyra, monkeypatch):
+    """``kyra`` with write-behind on and a short busy timeout, migrated."""
+    kyra = import_kyra(monkeypatch, KYRA_WRITE_BEHIND="1", KYRA_DB_BUSY_TIMEOUT_MS="50")
+    kyra.migrate_database()
+    yield kyra
+    kyra.get_writer().close()
+
+def feedback_count(kyra):
+    with kyra.db_connection(readonly=True) as conn:
+        return conn.execute("SELECT COUNT(*) FROM feedback").fetchone()[0]
+
+def wait_for(condition, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.01)
+
+def test_write_behind_flush_commits_queued_rows(writer_kyra):
+    for i in range(20):
+        assert writer_kyra.log_feedback(1, i % 5 + 1, "queued")
+    writer_kyra.get_writer().flush()
+    assert feedback_count(writer_kyra) == 20
+    stats = writer_kyra.get_writer().stats()
+    assert (stats["rows"], stats["failed_rows"], stats["queue_depth"]) == (20, 0, 0)
+    assert stats["batches"] < 20
+
+def test_write_behind_requeues_rows_blocked_by_a_lock(writer_kyra):
+    blocker = sqlite3.connect(writer_kyra.DB_PATH, isolation_level=None)
+    blocker.execute("BEGIN IMMEDIATE")
+    assert writer_kyra.log_feedback(1, 5, "blocked")
+    wait_for(lambda: writer_kyra.get_writer().stats()["requeued_rows"] >= 1)
+    blocker.execute("COMMIT")
+    writer_kyra.get_writer().flush()
+    assert feedback_count(writer_kyra) == 1
+    assert writer_kyra.get_writer().stats()["failed_rows"] == 0
+
+def test_write_behind_logs_dropped_rows(writer_kyra, caplog):
+    writer = writer_kyra.get_writer()
+    assert writer.submit("INSERT INTO no_such_table VALUES (?)", (1,))
+    blocker = sqlite3.connect(writer_kyra.DB_PATH, isolation_level=None)
+    blocker.execute("BEGIN IMMEDIATE")
+    assert writer_kyra.log_feedback(1, 5, "lost")
+    writer.flush()
+    blocker.execute("COMMIT")
+    stats = writer.stats()
+    assert (stats["failed_rows"], stats["requeued_rows"]) == (2, writer_kyra.WRITE_BEHIND_RETRIES)
+    dropped = [r.getMessage() for r in caplog.records if "Dropped write-behind row" in r.getMessage()]
+    assert len(dropped) == 2
+    assert any("no_such_table" in message for message in dropped)
+    assert any("database is locked" in message and "'lost'" in message for message in dropped)
+
+# --- Bulk Import ---
+def test_import_mixed_timestamps_and_existing_users(kyra):
+    kyra.migrate_database()
+    kyra.resolve_user("old@example.com", "mentor", "Old Org")
+    report = kyra.bulk_import("internships", io.StringIO(
+        "email,org,region,company_name,duration,created_at\n"
+        "old@example.com,New Org,North,Acme,1 month,2024-01-02T10:00:00+05:30\n"
+        "new@example.com,,,Globex,2 months,2024-01-02 10:00:00\n"
+        "bad@example.com,,,Initech,2 months,2024-02-30\n"))
+    assert (report["rows_loaded"], report["rows_rejected"]) == (2, 1)
+    assert (report["users_created"], report["users_updated"]) == (1, 1)
+    assert report["rejected"] == [{"row": 3, "reason": "invalid created_at"}]
+    with kyra.db_connection(readonly=True) as conn:
+        assert conn.execute("SELECT created_at, org, region FROM internships ORDER BY internship_id").fetchall() == [
+            ("2024-01-02T04:30:00.000", "New Org", "North"), ("2024-01-02T10:00:00.000", "Unknown", "Unknown")]
+        assert conn.execute("SELECT role FROM users WHERE email = 'old@example.com'").fetchone() == ("mentor",)
+
+    report = kyra.bulk_import("users", io.StringIO(
+        "email,name,role\nold@example.com,,\nnew@example.com,Newton,\nnew@example.com,Other,\n"))
+    assert (report["rows_loaded"], report["rows_skipped"], report["users_updated"]) == (1, 2, 1)
+    assert_matches_rebuild(kyra)
+
+# --- Data Export ---
+def exported(kyra, table, tmp_path, fmt="csv", **filters):
+    path = tmp_path / f"{table}.{fmt}"
+    written = kyra.export_table(table, str(path), fmt, chunk_rows=2, **filters)
+    opener = gzip.open if fmt == "csv.gz" else open
+    with opener(path, "rt", newline="") as f:
+        rows = list(csv.DictReader(f))
+    assert written == len(rows)
+    return rows
+
+def test_export_filters(kyra, tmp_path):
+    seed_baseline(kyra)
+    kyra.migrate_database()
+    with kyra.db_connection() as conn:
+        conn.execute("UPDATE internships SET created_at = '2024-0' || internship_id || '-15T09:00:00.000'")
+    assert [r["internship_id"] for r in exported(kyra, "internships", tmp_path)] == ["1", "2", "3", "4"]
+    assert [r["internship_id"] for r in exported(kyra, "internships", tmp_path, role="student")] == ["1", "2", "3"]
+    assert [r["email"] for r in exported(kyra, "internships", tmp_path, org="College B")] == ["ben@example.com"]
+    rows = exported(kyra, "internships", tmp_path, "csv.gz", role="student", start="2024-02-01", end="2024-03-15")
+    assert [r["internship_id"] for r in rows] == ["2"]
+    assert [r["rating"] for r in exported(kyra, "feedback", tmp_path, role="mentor")] == ["2"]
+    with pytest.raises(ValueError):
+        kyra.export_table("users", str(tmp_path / "users.csv"))
+
+def test_export_parquet_matches_csv(kyra, tmp_path):
+    pq = pytest.importorskip("pyarrow.parquet")
+    seed_baseline(kyra)
+    kyra.migrate_database()
+    path = tmp_path / "feedback.parquet"
+    assert kyra.export_table("feedback", str(path), "parquet", chunk_rows=4) == 6
+    table = pq.read_table(path)
+    assert table.column("rating").to_pylist() == [5, 3, 4, None, 2, 1]
+
+# --- Admin ---
+def test_admin_needs_listed_email_and_token(kyra, monkeypatch):
+    assert not kyra.ADMIN_LOGIN_ENABLED
+    assert not kyra.check_admin_token("boss@example.com", "")
+    kyra = import_kyra(monkeypatch, KYRA_ADMIN_EMAILS="Boss@example.com", KYRA_ADMIN_TOKEN="s3cret")
+    assert kyra.check_admin_token(" boss@EXAMPLE.com", "s3cret")
+    assert not kyra.check_admin_token("boss@example.com", "guess")
+    assert not kyra.check_admin_token("other@example.com", "s3cret")
+    assert not kyra.is_admin({"email": "boss@example.com"})
+    assert kyra.is_admin({"email": "boss@example.com", "admin": True})